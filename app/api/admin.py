@@ -0,0 +1,79 @@
+import os
+from datetime import datetime
+from typing import Dict
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from service import BusTrackingService
+from app.schemas.admin import ProfilingStart
+from app.utils.constants import TRACE_DIR
+from . import auth
+from .deps import get_tracking_service
+
+router = APIRouter()
+
+
+@router.get("/api/metrics", tags=["Monitoring"])
+async def get_metrics(service: BusTrackingService = Depends(get_tracking_service)):
+    return service.metrics.snapshot()
+
+
+
+@router.post("/api/admin/trace/start", tags=["Admin"])
+async def start_trace_recording(
+    admin: Dict = Depends(auth.require_admin),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    path = os.path.join(TRACE_DIR, f"trace-{datetime.now():%Y%m%d-%H%M%S}.jsonl.gz")
+    service.start_recording(path)
+    return {"message": "Recording started", "path": path}
+
+
+@router.post("/api/admin/trace/stop", tags=["Admin"])
+async def stop_trace_recording(
+    admin: Dict = Depends(auth.require_admin),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    recorder = service.stop_recording()
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="No trace is being recorded")
+    return {"message": "Recording stopped", "path": recorder.path, "events": recorder.events}
+
+
+
+@router.post("/api/admin/profiling/start", tags=["Admin"])
+async def start_profiling(request: Request, data: ProfilingStart, admin: Dict = Depends(auth.require_admin)):
+    profiler = request.app.state.profiler
+    invalid = sorted(route for route in data.routes if not route.startswith("/"))
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Routes must be path templates: {invalid}")
+    profiler.enable(data.routes, data.sample_rate)
+    if data.slow_threshold_ms is not None:
+        profiler.slow_threshold_ms = data.slow_threshold_ms
+    return {"message": "Profiling started", "routes": sorted(profiler.routes), "sample_rate": profiler.sample_rate}
+
+
+@router.post("/api/admin/profiling/stop", tags=["Admin"])
+async def stop_profiling(request: Request, admin: Dict = Depends(auth.require_admin)):
+    request.app.state.profiler.disable()
+    return {"message": "Profiling stopped"}
+
+
+@router.get("/api/admin/profiling/profiles", tags=["Admin"])
+async def get_profiles(request: Request, admin: Dict = Depends(auth.require_admin)):
+    profiler = request.app.state.profiler
+    return {"enabled": profiler.enabled, "routes": sorted(profiler.routes), "profiles": profiler.profiles()}
+
+
+@router.get("/api/admin/profiling/profiles/{profile_id}", tags=["Admin"])
+async def get_profile(request: Request, profile_id: int, admin: Dict = Depends(auth.require_admin)):
+    profile = request.app.state.profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+@router.get("/api/admin/slow-requests", tags=["Admin"])
+async def get_slow_requests(request: Request, admin: Dict = Depends(auth.require_admin)):
+    profiler = request.app.state.profiler
+    return {"threshold_ms": profiler.slow_threshold_ms, "requests": list(profiler.slow_requests)}
@@ -0,0 +1,81 @@
+from typing import Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app import database
+from app.schemas.admin import AdminLogin
+from app.schemas.driver import DriverLogin
+from app.services.auth_service import AuthService, authenticator, ROLE_ADMIN, ROLE_DRIVER
+from app.utils.exceptions import BRTLiveException, InvalidCredentialsException
+
+router = APIRouter(prefix="/api/auth", tags=["Auth"])
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+_auth_service: Optional[AuthService] = None
+
+
+def get_auth_service() -> AuthService:
+    global _auth_service
+    if not database.is_configured():
+        raise HTTPException(status_code=503, detail="Login requires DATABASE_URL")
+    if _auth_service is None:
+        _auth_service = AuthService(database.get_session_factory())
+    return _auth_service
+
+
+def _verify(credentials: Optional[HTTPAuthorizationCredentials]) -> Dict:
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return authenticator.verify(credentials.credentials)
+    except InvalidCredentialsException:
+        raise HTTPException(status_code=401, detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+async def get_current_driver(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> Dict:
+    claims = _verify(credentials)
+    if claims.get("role") != ROLE_DRIVER:
+        raise HTTPException(status_code=403, detail="Driver token required")
+    return claims
+
+
+async def require_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> Dict:
+    claims = _verify(credentials)
+    if claims.get("role") != ROLE_ADMIN:
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return claims
+
+
+async def driver_ping_auth(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> Optional[Dict]:
+    """
+    Auth for location pings. Only enforced when the authenticator requires it,
+    so existing phone apps keep working until tokens are rolled out.
+    """
+    if not authenticator.require_driver_auth and credentials is None:
+        return None
+    return await get_current_driver(credentials)
+
+
+@router.post("/driver/login")
+async def driver_login(data: DriverLogin):
+    service = get_auth_service()
+    try:
+        token = await service.login_driver(data.employee_id, data.password)
+    except InvalidCredentialsException as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    except BRTLiveException as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    return {"access_token": token, "token_type": "bearer"}
+
+
+@router.post("/admin/login")
+async def admin_login(data: AdminLogin):
+    service = get_auth_service()
+    try:
+        token = await service.login_admin(data.username, data.password)
+    except InvalidCredentialsException as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    return {"access_token": token, "token_type": "bearer"}
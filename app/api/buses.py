@@ -0,0 +1,143 @@
+import math
+import time
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+
+from service import Bus, BusLocation, BusTrackingService
+from app.utils.constants import MAX_LOOKUP_IDS
+from app.utils.exceptions import BRTLiveException, IngestQueueFullException, ReadOnlyReplicaException
+from . import auth
+from .deps import get_tracking_service
+
+router = APIRouter(prefix="/api/buses", tags=["Buses"])
+
+
+@router.post("/register")
+async def register_bus(bus: Bus, service: BusTrackingService = Depends(get_tracking_service)):
+    result = service.register_bus(bus)
+    return result
+
+
+@router.get("")
+async def get_all_buses(
+    status: Optional[str] = Query(None, description="Filter by status: available, in_transit, maintenance"),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    buses = service.get_all_buses(status)
+    return {"buses": buses, "count": len(buses)}
+
+
+@router.post("/lookup")
+async def lookup_buses(
+    ids: List[str] = Body(..., embed=True, description="Bus ids to fetch"),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    if len(ids) > MAX_LOOKUP_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_LOOKUP_IDS} ids per lookup")
+    return service.lookup_buses(ids)
+
+
+@router.get("/{bus_id}")
+async def get_bus(bus_id: str, service: BusTrackingService = Depends(get_tracking_service)):
+
+    if bus_id not in service.buses:
+        raise HTTPException(status_code=404, detail="Bus not found")
+    return service.buses[bus_id]
+
+
+@router.get("/track/phone/{phone_number}")
+async def track_bus_by_phone(phone_number: str, service: BusTrackingService = Depends(get_tracking_service)):
+
+    bus = service.get_bus_by_phone(phone_number)
+    if not bus:
+        raise HTTPException(status_code=404, detail="No bus found with this phone number")
+    
+    return {
+        "bus": bus,
+        "last_location": bus.last_location,
+        "current_terminal": bus.current_terminal,
+        "status": bus.status
+    }
+
+
+@router.post("/{bus_id}/location")
+async def update_bus_location(
+    bus_id: str,
+    location: BusLocation,
+    driver: Optional[Dict] = Depends(auth.driver_ping_auth),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    if driver is not None:
+        shift = service.shifts.for_bus(bus_id)
+        if shift is not None and shift.driver_id != driver.get("driver_id"):
+            raise HTTPException(status_code=403, detail="Token does not belong to this bus's driver")
+
+    # Authorized before rate-limiting, so spoofed pings can't use up the real driver's budget.
+    try:
+        error = service.authorize_ping(bus_id, location)
+    except ReadOnlyReplicaException as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except BRTLiveException as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    if error:
+        raise HTTPException(status_code=404, detail=error["error"])
+    retry_after = service.admit_ping(bus_id, location.driver_phone,
+                                     driver.get("driver_id") if driver is not None else None)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many location updates",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    start = time.perf_counter()
+    try:
+        if service.pipeline_enabled:
+            result = service.submit_location(bus_id, location)
+        else:
+            result = service.update_bus_location(bus_id, location)
+    except IngestQueueFullException as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ReadOnlyReplicaException as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except BRTLiveException as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    finally:
+        service.overload.record_ingest((time.perf_counter() - start) * 1000)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
+
+@router.get("/{bus_id}/location/history")
+async def get_location_history(
+    bus_id: str,
+    limit: int = Query(50, description="Number of recent locations to return"),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    
+    if bus_id not in service.location_history:
+        raise HTTPException(status_code=404, detail="Bus not found")
+    
+    history = service.location_history[bus_id]
+    return {
+        "bus_id": bus_id,
+        "history": history[-limit:],
+        "count": len(history)
+    }
+
+
+@router.patch("/{bus_id}/status")
+async def update_bus_status(
+    bus_id: str,
+    status: str = Body(..., embed=True, description="Status: available, in_transit, maintenance"),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    if bus_id not in service.buses:
+        raise HTTPException(status_code=404, detail="Bus not found")
+    
+    valid_statuses = ["available", "in_transit", "maintenance"]
+    if status not in valid_statuses:
+        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
+    
+    return service.set_bus_status(bus_id, status)
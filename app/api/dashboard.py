@@ -0,0 +1,63 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+
+from service import BusTrackingService
+from .deps import get_tracking_service
+
+router = APIRouter()
+
+
+@router.get("/api/dashboard/overview", tags=["Dashboard"])
+async def get_system_overview(service: BusTrackingService = Depends(get_tracking_service)):
+    dashboards = service.get_all_terminals_dashboard()
+    counts = service.fleet_counts()
+    
+    return {
+        "timestamp": datetime.now(),
+        "total_terminals": len(service.terminals),
+        "total_buses": counts["total"],
+        "available_buses": counts["available"],
+        "buses_in_transit": counts["in_transit"],
+        "stale_buses": counts["stale"],
+        "terminals": dashboards
+    }
+
+
+@router.get("/api/dashboard/wait-times", tags=["Dashboard"])
+async def get_all_wait_times(service: BusTrackingService = Depends(get_tracking_service)):
+    wait_times = []
+    for estimate in service.wait_times(list(service.terminals))["wait_times"]:
+        terminal = service.terminals[estimate.terminal_id]
+        wait_times.append({
+            "terminal_name": terminal.name,
+            "terminal_id": estimate.terminal_id,
+            "wait_estimate": estimate
+        })
+    
+    return {"wait_times": wait_times, "timestamp": datetime.now()}
+
+
+@router.get("/api/analytics/terminal/{terminal_id}", tags=["Analytics"])
+async def get_terminal_analytics(terminal_id: str, service: BusTrackingService = Depends(get_tracking_service)):
+    if terminal_id not in service.terminals:
+        raise HTTPException(status_code=404, detail="Terminal not found")
+    
+    terminal = service.terminals[terminal_id]
+    dashboard = service.get_terminal_dashboard(terminal_id)
+    
+    return {
+        "terminal_id": terminal_id,
+        "terminal_name": terminal.name,
+        "current_buses": dashboard["buses_available"],
+        "capacity": terminal.total_capacity,
+        "utilization_percentage": dashboard["capacity_utilization"],
+        "wait_estimate_minutes": dashboard["wait_estimate"].estimated_wait_minutes,
+        "timestamp": datetime.now()
+    }
+
+
+@router.get("/api/dashboard/rebalance", tags=["Dashboard"])
+async def get_rebalance_plan(service: BusTrackingService = Depends(get_tracking_service)):
+    from service.rebalance import plan_rebalance
+
+    return plan_rebalance(service)
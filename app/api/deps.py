@@ -0,0 +1,17 @@
+from fastapi import HTTPException, Request
+
+from service import BusTrackingService
+
+
+def get_tracking_service(request: Request) -> BusTrackingService:
+    return request.app.state.tracking_service
+
+
+def get_app_component(request: Request, name: str, detail: str):
+    """
+    Return a subsystem created at startup, or 503 if it isn't running
+    """
+    component = getattr(request.app.state, name, None)
+    if component is None:
+        raise HTTPException(status_code=503, detail=detail)
+    return component
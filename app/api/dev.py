@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends
+
+from service import ActiveShift, Bus, BusTrackingService, Terminal
+from app.utils.exceptions import BusNotAvailableException, DriverAlreadyOnShiftException
+from .deps import get_tracking_service
+
+router = APIRouter()
+
+
+@router.post("/api/dev/populate-sample-data", tags=["Development"], include_in_schema=False)
+async def populate_sample_data(service: BusTrackingService = Depends(get_tracking_service)):
+    
+    terminals = [
+        Terminal(
+            terminal_id="TRM001",
+            name="CMS Terminal",
+            latitude=6.4541,
+            longitude=3.3947,
+            total_capacity=20
+        ),
+        Terminal(
+            terminal_id="TRM002",
+            name="Mile 12 Terminal",
+            latitude=6.5493,
+            longitude=3.3844,
+            total_capacity=15
+        ),
+        Terminal(
+            terminal_id="TRM003",
+            name="Ikorodu Terminal",
+            latitude=6.6186,
+            longitude=3.5064,
+            total_capacity=18
+        )
+    ]
+    
+    for terminal in terminals:
+        service.register_terminal(terminal)
+    
+    
+    buses = [
+        Bus(bus_id="BUS001", driver_phone="+2348012345601", driver_name="John Adebayo", 
+            plate_number="LAG-123AA", capacity=50, current_terminal="TRM001", status="available"),
+        Bus(bus_id="BUS002", driver_phone="+2348012345602", driver_name="Mary Okafor", 
+            plate_number="LAG-456BB", capacity=50, status="in_transit"),
+        Bus(bus_id="BUS003", driver_phone="+2348012345603", driver_name="Ahmed Bello", 
+            plate_number="LAG-789CC", capacity=50, current_terminal="TRM001", status="available"),
+        Bus(bus_id="BUS004", driver_phone="+2348012345604", driver_name="Grace Nwosu", 
+            plate_number="LAG-012DD", capacity=50, current_terminal="TRM002", status="available"),
+    ]
+    
+    shifts = 0
+    for driver_id, bus in enumerate(buses, start=1):
+        service.register_bus(bus)
+        # Buses or drivers already on a shift (an earlier call, or a real one) keep it.
+        try:
+            service.shifts.start(
+                ActiveShift(bus_id=bus.bus_id, driver_id=driver_id, driver_phone=bus.driver_phone)
+            )
+        except (BusNotAvailableException, DriverAlreadyOnShiftException):
+            continue
+        shifts += 1
+    
+    return {
+        "message": "Sample data populated successfully",
+        "terminals": len(terminals),
+        "buses": len(buses),
+        "shifts_started": shifts
+    }
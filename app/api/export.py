@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from service import BusTrackingService
+from app.utils.constants import TRACE_DIR
+from . import auth
+from .deps import get_tracking_service
+
+router = APIRouter(prefix="/api/export", tags=["Export"])
+
+FORMAT = Query("arrow", pattern="^(arrow|parquet)$", description="arrow (IPC stream) or parquet")
+COLUMNS = Query(None, description="Comma-separated columns; all when omitted")
+
+
+def _exporter():
+    # pyarrow is optional and slow to import, so it is only loaded here.
+    from service import export
+    if not export.available():
+        raise HTTPException(status_code=503, detail="Export requires pyarrow")
+    return export
+
+
+def _response(export, dataset: str, fmt: str, make_chunks):
+    try:
+        chunks = make_chunks()
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    filename = f"{dataset}-{datetime.now():%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(chunks, media_type=export.MEDIA_TYPES[fmt],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+def _columns(columns: Optional[str]):
+    return columns.split(",") if columns else None
+
+
+@router.get("/buses")
+async def export_buses(
+    format: str = FORMAT,
+    columns: Optional[str] = COLUMNS,
+    admin: Dict = Depends(auth.require_admin),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    export = _exporter()
+    return _response(export, "buses", format, lambda: export.export_fleet(service, _columns(columns), format))
+
+
+@router.get("/occupancy")
+async def export_occupancy(
+    format: str = FORMAT,
+    columns: Optional[str] = COLUMNS,
+    admin: Dict = Depends(auth.require_admin),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    export = _exporter()
+    return _response(export, "occupancy", format,
+                     lambda: export.export_occupancy(service, _columns(columns), format))
+
+
+@router.get("/history")
+async def export_history(
+    since: Optional[datetime] = Query(None, description="Pings at or after this time"),
+    until: Optional[datetime] = Query(None, description="Pings before this time"),
+    format: str = FORMAT,
+    columns: Optional[str] = COLUMNS,
+    admin: Dict = Depends(auth.require_admin)
+):
+    if since is not None and until is not None and since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    export = _exporter()
+    paths = export.trace_paths(TRACE_DIR, since, until)
+    return _response(export, "history", format,
+                     lambda: export.export_history(paths, _columns(columns), format, since, until))
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from service import BusTrackingService
+from .deps import get_tracking_service
+
+router = APIRouter(prefix="/api/map", tags=["Map"])
+
+
+@router.get("/clusters")
+async def get_map_clusters(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    zoom: int = Query(..., ge=0, le=22),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not (-180 <= min_lon <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+        raise HTTPException(status_code=400, detail="bbox is out of range or inverted")
+
+    return service.map_clusters((min_lon, min_lat, max_lon, max_lat), zoom)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from service import BusTrackingService
+from app.schemas.notification import SubscriptionCreate
+from .deps import get_tracking_service
+
+router = APIRouter(prefix="/api/notifications", tags=["Notifications"])
+
+
+@router.post("/subscriptions")
+async def subscribe(request: SubscriptionCreate, service: BusTrackingService = Depends(get_tracking_service)):
+    result = service.subscribe_arrivals(request.terminal_id, request.route_id, request.threshold_minutes)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
+
+@router.get("/subscriptions/{subscription_id}")
+async def get_subscription(subscription_id: int, service: BusTrackingService = Depends(get_tracking_service)):
+    subscription = service.notifier.subscriptions.get(subscription_id)
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    return subscription
+
+
+@router.delete("/subscriptions/{subscription_id}")
+async def unsubscribe(subscription_id: int, service: BusTrackingService = Depends(get_tracking_service)):
+    if service.notifier.unsubscribe(subscription_id) is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    return {"message": "Unsubscribed", "subscription_id": subscription_id}
@@ -0,0 +1,42 @@
+from typing import Dict
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from app.schemas.report import ReportRequest
+from service import BusTrackingService
+from . import auth
+from .deps import get_tracking_service
+
+router = APIRouter(prefix="/api/reports", tags=["Reports"])
+
+
+def get_report_engine(request: Request):
+    # Created on first use: the engine pulls in the process pool machinery.
+    engine = request.app.state.report_engine
+    if engine is None:
+        from service.reports import ReportEngine
+        engine = request.app.state.report_engine = ReportEngine()
+    return engine
+
+
+@router.post("", status_code=202)
+async def request_report(
+    data: ReportRequest,
+    admin: Dict = Depends(auth.require_admin),
+    engine=Depends(get_report_engine),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    recording = service.recorder.path if service.recorder else None
+    return engine.submit(data.day, recording=recording)
+
+
+@router.get("")
+async def list_reports(admin: Dict = Depends(auth.require_admin), engine=Depends(get_report_engine)):
+    return {"jobs": sorted(engine.jobs.values(), key=lambda job: job["submitted_at"], reverse=True)}
+
+
+@router.get("/{job_id}")
+async def get_report(job_id: str, admin: Dict = Depends(auth.require_admin), engine=Depends(get_report_engine)):
+    job = await engine.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job
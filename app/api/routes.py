@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from service import BusTrackingService
+from app.schemas.route import RouteCreate
+from .deps import get_tracking_service
+
+router = APIRouter(prefix="/api/routes", tags=["Routes"])
+
+
+@router.post("/register")
+async def register_route(route: RouteCreate, service: BusTrackingService = Depends(get_tracking_service)):
+    result = service.register_route(route.route_id, route.terminal_ids)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
+
+@router.get("/{route_id}/headways")
+async def get_route_headways(route_id: str, service: BusTrackingService = Depends(get_tracking_service)):
+    summary = service.headways.summary(route_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Route not found")
+    return summary
+
+
+@router.get("/{route_id}/bunching")
+async def get_route_bunching(route_id: str, service: BusTrackingService = Depends(get_tracking_service)):
+    if route_id not in service.headways.routes:
+        raise HTTPException(status_code=404, detail="Route not found")
+    return {"route_id": route_id, "bunched": service.headways.bunched(route_id)}
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from service import BusTrackingService
+from app.schemas.driver import DriverStartShift
+from app.utils.exceptions import (
+    BRTLiveException, BusNotAvailableException, DriverAlreadyOnShiftException,
+    NoActiveShiftException, ValidationError
+)
+from .deps import get_app_component, get_tracking_service
+
+router = APIRouter(prefix="/api/shifts", tags=["Shifts"])
+
+
+def get_shift_service(request: Request):
+    return get_app_component(request, "shift_service", "Shift management requires DATABASE_URL")
+
+
+@router.post("/start")
+async def start_shift(data: DriverStartShift, shift_service=Depends(get_shift_service)):
+    try:
+        shift = await shift_service.start_shift(data)
+    except (DriverAlreadyOnShiftException, BusNotAvailableException) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BRTLiveException as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    return {"message": "Shift started", "shift": shift}
+
+
+@router.post("/{bus_id}/end")
+async def end_shift(bus_id: str, shift_service=Depends(get_shift_service)):
+    try:
+        shift = await shift_service.end_shift(bus_id)
+    except NoActiveShiftException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": "Shift ended", "shift": shift}
+
+
+@router.get("")
+async def get_active_shifts(service: BusTrackingService = Depends(get_tracking_service)):
+    shifts = service.shifts.all()
+    return {"shifts": shifts, "count": len(shifts)}
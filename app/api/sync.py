@@ -0,0 +1,17 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from service import BusTrackingService
+from .deps import get_tracking_service
+
+router = APIRouter(prefix="/api/sync", tags=["Sync"])
+
+
+@router.get("")
+async def sync_changes(
+    since: int = Query(0, ge=0, description="Sequence number from the previous sync response"),
+    epoch: Optional[str] = Query(None, description="Epoch from the previous sync response"),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    return service.changes_since(since, epoch)
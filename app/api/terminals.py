@@ -0,0 +1,101 @@
+from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+
+from app.utils.constants import MAX_LOOKUP_IDS
+from service import BusTrackingService, Terminal, db_key
+from .deps import get_app_component, get_tracking_service
+
+router = APIRouter(prefix="/api/terminals", tags=["Terminals"])
+
+
+@router.post("/register")
+async def register_terminal(terminal: Terminal, service: BusTrackingService = Depends(get_tracking_service)):
+    result = service.register_terminal(terminal)
+    return result
+
+
+@router.get("")
+async def get_all_terminals(service: BusTrackingService = Depends(get_tracking_service)):
+    return {"terminals": service.get_all_terminals()}
+
+
+def _lookup_ids(ids: List[str]) -> List[str]:
+    if len(ids) > MAX_LOOKUP_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_LOOKUP_IDS} ids per lookup")
+    return ids
+
+
+@router.post("/lookup")
+async def lookup_terminals(
+    ids: List[str] = Body(..., embed=True, description="Terminal ids to fetch"),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    return service.lookup_terminals(_lookup_ids(ids))
+
+
+@router.get("/wait-times")
+async def get_wait_times(
+    ids: str = Query(..., description="Comma-separated terminal ids"),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    terminal_ids = _lookup_ids([tid for tid in ids.split(",") if tid])
+    return service.wait_times(terminal_ids)
+
+
+@router.get("/{terminal_id}")
+async def get_terminal(terminal_id: str, service: BusTrackingService = Depends(get_tracking_service)):
+    
+    terminal = service.get_terminal(terminal_id)
+    if terminal is None:
+        raise HTTPException(status_code=404, detail="Terminal not found")
+    return terminal
+
+
+@router.get("/{terminal_id}/dashboard")
+async def get_terminal_dashboard(terminal_id: str, service: BusTrackingService = Depends(get_tracking_service)):
+
+
+    dashboard = service.get_terminal_dashboard(terminal_id)
+    if "error" in dashboard:
+        raise HTTPException(status_code=404, detail=dashboard["error"])
+    return dashboard
+
+
+
+@router.get("/{terminal_id}/next-departure")
+async def get_next_departure(terminal_id: str, service: BusTrackingService = Depends(get_tracking_service)):
+    result = service.next_departure(terminal_id)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
+
+@router.post("/{terminal_id}/dispatch")
+async def dispatch_bus(
+    terminal_id: str,
+    bus_id: Optional[str] = Body(None, embed=True, description="Bus to send out; defaults to the next in the queue"),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    if terminal_id not in service.terminals:
+        raise HTTPException(status_code=404, detail="Terminal not found")
+    result = service.dispatch(terminal_id, bus_id)
+    if "error" in result:
+        raise HTTPException(status_code=409, detail=result["error"])
+    return result
+
+
+
+@router.get("/{terminal_id}/arrivals")
+async def get_terminal_arrivals(
+    request: Request,
+    terminal_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    service: BusTrackingService = Depends(get_tracking_service)
+):
+    if terminal_id not in service.terminals:
+        raise HTTPException(status_code=404, detail="Terminal not found")
+    materializer = get_app_component(request, "eta_materializer", "ETA table requires DATABASE_URL")
+
+    terminal = service.terminals[terminal_id]
+    arrivals = await materializer.next_arrivals(db_key(terminal_id, terminal.db_id), limit)
+    return {"terminal_id": terminal_id, "arrivals": arrivals}
@@ -0,0 +1,57 @@
+import os
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from app.utils.constants import (
+    ENFORCE_ACTIVE_SHIFTS, REQUIRE_DRIVER_AUTH, INGEST_PIPELINE_ENABLED, SLOW_REQUEST_THRESHOLD_MS
+)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class Settings(BaseModel):
+    database_url: Optional[str] = None
+    host: str = "0.0.0.0"
+    port: int = 8000
+    reload: bool = False
+    cors_origins: List[str] = Field(default_factory=lambda: ["*"])
+    # None: enforce only when a database is configured, since shifts are started there
+    enforce_shifts: Optional[bool] = None
+    require_driver_auth: bool = REQUIRE_DRIVER_AUTH
+    pipeline_enabled: bool = INGEST_PIPELINE_ENABLED
+    trace_path: Optional[str] = None
+    # Unauthenticated sample-data routes; never enable in production.
+    dev_endpoints: bool = False
+    warm_caches: bool = True
+    state_backend: str = "objects"
+    slow_request_ms: float = SLOW_REQUEST_THRESHOLD_MS
+    snapshot_role: str = "off"
+    snapshot_path: str = "fleet.snapshot"
+    workers: int = 1
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            database_url=os.getenv("DATABASE_URL"),
+            host=os.getenv("HOST", "0.0.0.0"),
+            port=int(os.getenv("PORT", "8000")),
+            reload=_env_bool("RELOAD", False),
+            cors_origins=[o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()],
+            enforce_shifts=_env_bool("ENFORCE_ACTIVE_SHIFTS", ENFORCE_ACTIVE_SHIFTS)
+            if os.getenv("ENFORCE_ACTIVE_SHIFTS") is not None else None,
+            require_driver_auth=_env_bool("REQUIRE_DRIVER_AUTH", REQUIRE_DRIVER_AUTH),
+            pipeline_enabled=_env_bool("INGEST_PIPELINE_ENABLED", INGEST_PIPELINE_ENABLED),
+            trace_path=os.getenv("TRACE_PATH"),
+            dev_endpoints=_env_bool("ENABLE_DEV_ENDPOINTS", False),
+            warm_caches=_env_bool("WARM_CACHES", True),
+            state_backend=os.getenv("STATE_BACKEND", "objects"),
+            slow_request_ms=float(os.getenv("SLOW_REQUEST_MS", SLOW_REQUEST_THRESHOLD_MS)),
+            snapshot_role=os.getenv("SNAPSHOT_ROLE", "off"),
+            snapshot_path=os.getenv("SNAPSHOT_PATH", "fleet.snapshot"),
+            workers=int(os.getenv("WORKERS", "1")),
+        )
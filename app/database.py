@@ -0,0 +1,50 @@
+import os
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+# SQLAlchemy is only imported once a database is actually used,
+# so the API starts quickly when it runs in memory only.
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+_engine: Optional["AsyncEngine"] = None
+_session_factory: Optional["async_sessionmaker"] = None
+
+
+def configure(url: Optional[str]):
+    global DATABASE_URL
+    DATABASE_URL = url
+
+
+def is_configured() -> bool:
+    return DATABASE_URL is not None
+
+
+def get_engine() -> "AsyncEngine":
+    """
+    Return the shared async engine, creating it on first use
+    """
+    global _engine
+    if _engine is None:
+        if DATABASE_URL is None:
+            raise RuntimeError("DATABASE_URL is not set")
+        from sqlalchemy.ext.asyncio import create_async_engine
+        _engine = create_async_engine(DATABASE_URL, pool_pre_ping=True)
+    return _engine
+
+
+def get_session_factory() -> "async_sessionmaker":
+    global _session_factory
+    if _session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        _session_factory = async_sessionmaker(get_engine(), expire_on_commit=False)
+    return _session_factory
+
+
+async def dispose_engine():
+    global _engine, _session_factory
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _session_factory = None
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, DateTime, Enum as SQLEnum
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime, timezone
 from enum import Enum
@@ -17,7 +17,7 @@ class Bus(Base):
     capacity = Column(Integer, default=50)
     current_passenger_count = Column( Integer, default=0)
     route_id = Column(Integer, ForeignKey("routes.id"))
-    status = Column(Enum(BusStatus), default=BusStatus.OUT_OF_SERVICE)
+    status = Column(SQLEnum(BusStatus), default=BusStatus.OUT_OF_SERVICE)
     is_available = Column(Boolean, default=True)
     current_shift_id = Column(Integer, ForeignKey("bus_assignments.id"))
     current_driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=True)
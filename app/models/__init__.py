@@ -1,28 +1,53 @@
-from .Base import Base
-from .Bus import Bus, BusStatus
-from .BusAssignment import BusAssignment
-from .driver import Driver
-from .eta import Eta
-from .admin import Admin
-from .route import Route
-from .routeStop import RouteStop
-from .terminal import Terminal
-from .tracking import Tracking
-from .indexes import all_indexes
-from .user import User
-
-__all__ = [
-    'Base'
-    'Bus'
-    'BusStatus'
-    'BusAssignment'
-    'Driver'
-    'Eta'
-    'Admin'
-    'Route'
-    'RouteStop'
-    'Terminal'
-    'Tracking'
-    'all_indexes'
-    'User'
-]
\ No newline at end of file
+import importlib
+import sys
+import types
+
+# Models are imported on first access so that importing app.models
+# doesn't pull in SQLAlchemy and every mapper up front.
+_MODEL_MODULES = {
+    'Base': '.Base',
+    'Bus': '.Bus',
+    'BusStatus': '.Bus',
+    'BusAssignment': '.BusAssignment',
+    'Driver': '.driver',
+    'Eta': '.eta',
+    'Admin': '.admin',
+    'Route': '.route',
+    'RouteStop': '.routeStop',
+    'Terminal': '.terminal',
+    'Tracking': '.tracking',
+    'all_indexes': '.indexes',
+    'User': '.user',
+}
+
+__all__ = list(_MODEL_MODULES)
+
+
+def __getattr__(name):
+    module_name = _MODEL_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+class _ModelsModule(types.ModuleType):
+    def __setattr__(self, name, value):
+        # Importing Bus.py or Base.py would otherwise bind the submodule over
+        # the class of the same name; leave it to __getattr__ instead.
+        if name in _MODEL_MODULES and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _ModelsModule
+
+
+def load_all_models():
+    """
+    Import every model so Base.metadata knows all tables (e.g. before create_all)
+    """
+    for name in __all__:
+        __getattr__(name)
+    return __getattr__('Base')
@@ -15,7 +15,7 @@ class Driver(Base):
     phone_device_info = Column(String(255), unique=True, nullable=True)
     last_location_update = Column(DateTime, nullable=True)
     is_tracking_enabled = Column(Boolean, default=False)
-    current_shift_id = Column(Integer, ForeignKey("bus_assignment.id"), nullable=True)
+    current_shift_id = Column(Integer, ForeignKey("bus_assignments.id"), nullable=True)
 
     is_active = Column(Boolean,default= True)
     is_verified = Column(Boolean, default=False)
@@ -7,8 +7,8 @@ class Route(Base):
     __tablename__ = "routes"
     id = Column(Integer,primary_key=True , index= True)
     name = Column(String(50), unique= True, nullable = False)
-    start_terminal_id = Column(Integer, ForeignKey("routes.id"))
-    end_terminal_id = Column( Integer,ForeignKey("routes.id"))
+    start_terminal_id = Column(Integer, ForeignKey("terminals.id"))
+    end_terminal_id = Column( Integer,ForeignKey("terminals.id"))
     distance_km = Column(Float, default= 0.0)
     estimated_duration_minutes = Column(Integer, default= 45)
     created_at = Column(DateTime, default = datetime.now(timezone.utc))
@@ -7,8 +7,8 @@ from .Base import Base
 class RouteStop(Base):
     __tablename__ = "route_stops"
     id = Column(Integer, index= True,primary_key= True)
-    route_id = Column(Integer, ForeignKey("route.id"))
-    terminal_id = Column(Integer, ForeignKey("terminal.id"))
+    route_id = Column(Integer, ForeignKey("routes.id"))
+    terminal_id = Column(Integer, ForeignKey("terminals.id"))
     stop_order = Column(Integer, nullable= False)
     estimated_travel_time_minutes =Column(Integer, default=5)
 
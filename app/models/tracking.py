@@ -2,7 +2,7 @@ from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, Date
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime, timezone
 from enum import Enum
-from Bus import BusStatus
+from .Bus import BusStatus
 from .Base import Base
 
 class Tracking (Base):
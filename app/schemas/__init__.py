@@ -1,31 +1,37 @@
-from .bus import BusBase, BusCreate
-from .busAssignment import BusAssignmentBase, BusAssignmentCreate
-from .driver import DriverBase, DriverLogin, DriverStartShift
-from .eta import EtaBase, ShowEta
-from .admin import AdminBase, AdminCreate,AdminLogin
-from .route import RouteBase
-from .routeStop import RouteStopBase
-from .terminal import TerminalBase
-from .tracking import TrackingBase
-from .user import UserBase
+import importlib
 
+# Schemas are imported on first access; bus.py needs the SQLAlchemy models.
+_SCHEMA_MODULES = {
+    'BusBase': '.bus',
+    'BusCreate': '.bus',
+    'BusAssignmentBase': '.busAssignment',
+    'BusAssignmentCreate': '.busAssignment',
+    'DriverBase': '.driver',
+    'DriverLogin': '.driver',
+    'DriverStartShift': '.driver',
+    'EtaBase': '.eta',
+    'ShowEta': '.eta',
+    'AdminBase': '.admin',
+    'AdminCreate': '.admin',
+    'AdminLogin': '.admin',
+    'ProfilingStart': '.admin',
+    'SubscriptionCreate': '.notification',
+    'ReportRequest': '.report',
+    'RouteBase': '.route',
+    'RouteCreate': '.route',
+    'RouteStopBase': '.routeStop',
+    'TerminalBase': '.terminal',
+    'TrackingBase': '.tracking',
+    'UserBase': '.user',
+}
 
-__all__ = [
-    'BusBase'
-    'BusCreate'
-    'BusAssignmentBase'
-    'BusAssignmentCreate'
-    'DriverBase'
-    'DriverLogin'
-    'DriverStartShift'
-    'EtaBase'
-    'ShowEta'
-    'AdminBase'
-    'AdminCreate'
-    'AdminLogin'
-    'RouteBase'
-    'RouteStopBase'
-    'TerminalBase'
-    'TrackingBase'
-    'UserBase'
-]
\ No newline at end of file
+__all__ = list(_SCHEMA_MODULES)
+
+
+def __getattr__(name):
+    module_name = _SCHEMA_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import List, Optional
 
 class AdminBase(BaseModel):
     id:int
@@ -24,4 +25,9 @@ class AdminCreate(BaseModel):
 class AdminLogin(BaseModel):
     username: str
     password:str
-    #this
\ No newline at end of file
+    #this
+
+class ProfilingStart(BaseModel):
+    routes: List[str]= Field(min_length=1)
+    sample_rate: float= Field(1.0, gt=0, le=1)
+    slow_threshold_ms: Optional[float]= Field(None, gt=0)
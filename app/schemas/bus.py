@@ -1,6 +1,6 @@
 from pydantic import BaseModel,Field
 from datetime import datetime
-from models.Bus import BusStatus
+from app.models.Bus import BusStatus
 
 class BusBase(BaseModel):
     id:int
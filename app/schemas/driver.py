@@ -19,7 +19,7 @@ class DriverRegister(BaseModel):
     last_name:str
     employee_id:str
     license_number:str
-    phone_number=str= Field(min_length=11, max_length=15)
+    phone_number:str= Field(min_length=11, max_length=15)
     password: str= Field(min_length=8)
 
 class DriverLogin(BaseModel):
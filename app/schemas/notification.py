@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+from app.utils.constants import DEFAULT_NOTIFICATION_WINDOW
+
+class SubscriptionCreate(BaseModel):
+    terminal_id: str
+    route_id: Optional[str]= None
+    threshold_minutes: int= Field(DEFAULT_NOTIFICATION_WINDOW, ge=1, le=120)
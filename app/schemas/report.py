@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import Optional
+
+class ReportRequest(BaseModel):
+    day: Optional[date]= None
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List
 from datetime import datetime,timezone
 
 class RouteBase(BaseModel):
@@ -12,3 +13,8 @@ class RouteBase(BaseModel):
 
     class Config:
         orm_mode=True
+
+
+class RouteCreate(BaseModel):
+    route_id: str
+    terminal_ids: List[str]= Field(..., min_length=2, description="Terminals in stop order")
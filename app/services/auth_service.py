@@ -0,0 +1,281 @@
+import asyncio
+import base64
+import hashlib
+import heapq
+import hmac
+import json
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.constants import (
+    TOKEN_EXPIRE_MIN, TOKEN_CACHE_SIZE, REQUIRE_DRIVER_AUTH,
+    PASSWORD_HASH_ITERATIONS, PASSWORD_HASH_WORKERS
+)
+from app.utils.exceptions import InvalidCredentialsException, DriverNotVerifiedException
+from app.utils.validators import sanitize_employee_id
+
+SECRET_KEY = os.getenv("SECRET_KEY")
+# Without SECRET_KEY tokens are signed with a per-process key, which only
+# works for a single worker with no logins; see require_secret_key.
+EPHEMERAL_SECRET_KEY = SECRET_KEY is None
+if EPHEMERAL_SECRET_KEY:
+    SECRET_KEY = secrets.token_urlsafe(32)
+
+ROLE_DRIVER = "driver"
+ROLE_ADMIN = "admin"
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="pwhash")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+_TOKEN_HEADER = _b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+
+
+def hash_password(password: str, iterations: int = PASSWORD_HASH_ITERATIONS) -> str:
+    """
+    Hash a password with PBKDF2-SHA256
+    Format: pbkdf2_sha256$<iterations>$<salt>$<hash>
+    """
+    salt = secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(password: str, password_hash: Optional[str]) -> bool:
+    """
+    Check a password against a stored hash. A missing or malformed hash
+    never matches, so it surfaces as invalid credentials rather than a 500.
+    """
+    try:
+        algorithm, iterations, salt, expected = password_hash.split("$")
+        if algorithm != "pbkdf2_sha256":
+            return False
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), _b64decode(salt), int(iterations))
+    except (AttributeError, TypeError, ValueError):
+        return False
+    return hmac.compare_digest(_b64encode(digest), expected)
+
+
+def require_secret_key():
+    """
+    Fail startup when tokens have to outlive this process (logins, several
+    workers) but no SECRET_KEY is set
+    """
+    if EPHEMERAL_SECRET_KEY:
+        raise RuntimeError("SECRET_KEY must be set when logins, driver auth or several workers are enabled")
+
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, hash_password, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, password, password_hash)
+
+
+def create_access_token(subject: str, role: str, claims: Optional[Dict] = None,
+                        expires_minutes: int = TOKEN_EXPIRE_MIN) -> str:
+    """
+    Create an HS256 JWT signed with SECRET_KEY
+    """
+    now = int(time.time())
+    payload = {"sub": subject, "role": role, "iat": now, "exp": now + expires_minutes * 60}
+    if claims:
+        payload.update(claims)
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    signing_input = f"{_TOKEN_HEADER}.{body}"
+    signature = hmac.new(SECRET_KEY.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{_b64encode(signature)}"
+
+
+def decode_access_token(token: str) -> Dict:
+    """
+    Verify the signature and expiry of a token and return its claims
+    """
+    try:
+        header, body, signature = token.split(".")
+        expected = hmac.new(SECRET_KEY.encode(), f"{header}.{body}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(_b64decode(signature), expected):
+            raise InvalidCredentialsException()
+        claims = json.loads(_b64decode(body))
+    except (ValueError, TypeError):
+        raise InvalidCredentialsException()
+
+    if claims.get("exp", 0) <= time.time():
+        raise InvalidCredentialsException()
+    return claims
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified token claims.
+    When full, entries that have already expired are evicted before live ones.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._expiries: List[Tuple[float, str]] = []
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str, now: Optional[float] = None) -> Optional[Dict]:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        now = time.time() if now is None else now
+        if entry[0] <= now:
+            del self._entries[token]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, token: str, claims: Dict, now: Optional[float] = None):
+        expires_at = float(claims.get("exp", 0))
+        if token not in self._entries and len(self._entries) >= self.max_size:
+            self._evict(time.time() if now is None else now)
+        self._entries[token] = (expires_at, claims)
+        self._entries.move_to_end(token)
+        heapq.heappush(self._expiries, (expires_at, token))
+
+    def discard(self, token: str):
+        self._entries.pop(token, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._expiries.clear()
+
+    def _evict(self, now: float):
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, token = heapq.heappop(self._expiries)
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] == expires_at:
+                del self._entries[token]
+
+        if len(self._entries) >= self.max_size:
+            self._entries.popitem(last=False)
+
+        # Drop heap entries for tokens the LRU already evicted.
+        if len(self._expiries) > 2 * self.max_size:
+            self._expiries = [(exp, tok) for tok, (exp, _) in self._entries.items()]
+            heapq.heapify(self._expiries)
+
+
+class TokenAuthenticator:
+    """
+    Verifies bearer tokens through the cache. Revoked tokens are kept, with
+    their expiry, until they would have expired anyway.
+    """
+
+    def __init__(self, cache: Optional[TokenCache] = None, require_driver_auth: bool = REQUIRE_DRIVER_AUTH):
+        self.cache = cache or TokenCache()
+        self.require_driver_auth = require_driver_auth
+        self._revoked: Dict[str, float] = {}
+
+    def verify(self, token: str) -> Dict:
+        if token in self._revoked:
+            raise InvalidCredentialsException()
+        claims = self.cache.get(token)
+        if claims is None:
+            claims = decode_access_token(token)
+            self.cache.put(token, claims)
+        return claims
+
+    def revoke(self, token: str, now: Optional[float] = None):
+        """
+        Reject the token from now on, although its signature stays valid
+        """
+        try:
+            claims = self.verify(token)
+        except InvalidCredentialsException:
+            return
+        now = time.time() if now is None else now
+        self._revoked = {revoked: expires_at for revoked, expires_at in self._revoked.items() if expires_at > now}
+        self._revoked[token] = float(claims.get("exp", 0))
+        self.cache.discard(token)
+
+
+class AuthService:
+    """
+    Database-backed login. Models are imported here rather than at module
+    level so token verification works without loading SQLAlchemy.
+    """
+    def __init__(self, session_factory):
+        from app.models.admin import Admin
+        from app.models.driver import Driver
+
+        self.session_factory = session_factory
+        self.drivers = Driver.__table__
+        self.admins = Admin.__table__
+
+    async def login_driver(self, employee_id: str, password: str) -> str:
+        from sqlalchemy import select
+
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(self.drivers.c.id, self.drivers.c.password_hash, self.drivers.c.phone_number,
+                       self.drivers.c.is_active, self.drivers.c.is_verified)
+                .where(self.drivers.c.employees_id == sanitize_employee_id(employee_id))
+            )
+            driver = result.first()
+
+        if driver is None or not await verify_password_async(password, driver.password_hash):
+            raise InvalidCredentialsException()
+        if not driver.is_active or not driver.is_verified:
+            raise DriverNotVerifiedException()
+
+        return create_access_token(
+            str(driver.id), ROLE_DRIVER,
+            {"driver_id": driver.id, "phone": driver.phone_number}
+        )
+
+    async def login_admin(self, username: str, password: str) -> str:
+        from sqlalchemy import select, update
+
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(self.admins.c.id, self.admins.c.password_hash, self.admins.c.is_active,
+                       self.admins.c.is_super_admin)
+                .where(self.admins.c.username == username)
+            )
+            admin = result.first()
+
+            if admin is None or not await verify_password_async(password, admin.password_hash):
+                raise InvalidCredentialsException()
+            if not admin.is_active:
+                raise InvalidCredentialsException()
+
+            await session.execute(
+                update(self.admins).where(self.admins.c.id == admin.id).values(last_login=datetime.now())
+            )
+            await session.commit()
+
+        return create_access_token(
+            str(admin.id), ROLE_ADMIN,
+            {"admin_id": admin.id, "super_admin": bool(admin.is_super_admin)}
+        )
+
+
+authenticator = TokenAuthenticator()
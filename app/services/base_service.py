@@ -1,8 +1,24 @@
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select
 from typing import TypeVar, Generic, Type, Optional, List
 
 ModelType = TypeVar("ModelType")
 
 class BaseService(Generic[ModelType]):
-    pass
\ No newline at end of file
+    """
+    Base for services that read and write one table.
+    Queries go through the Core table so they don't depend on mapper configuration.
+    """
+    def __init__(self, model: Type[ModelType], session_factory: async_sessionmaker):
+        self.model = model
+        self.table = model.__table__
+        self.session_factory = session_factory
+
+    async def get(self, session: AsyncSession, row_id: int) -> Optional[dict]:
+        result = await session.execute(select(self.table).where(self.table.c.id == row_id))
+        row = result.mappings().first()
+        return dict(row) if row else None
+
+    async def list(self, session: AsyncSession, limit: int = 100) -> List[dict]:
+        result = await session.execute(select(self.table).limit(limit))
+        return [dict(row) for row in result.mappings()]
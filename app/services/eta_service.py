@@ -0,0 +1,204 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import and_, bindparam, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.eta import Eta
+from app.utils.constants import (
+    CLOSE_PROXIMITY_METERS, ETA_CHANGE_THRESHOLD_MINUTES, ETA_HORIZON_MINUTES,
+    ETA_REFRESH_INTERVAL_SECONDS
+)
+from service import db_key
+from service.metrics import Metrics, metrics as default_metrics
+from .base_service import BaseService
+
+PairKey = Tuple[int, int]
+
+
+class EtaMaterializer(BaseService[Eta]):
+    """
+    Keeps the eta table in step with live bus positions.
+
+    Buses are marked dirty by location updates. Each refresh recomputes only
+    those buses and writes a row only when its ETA moved by more than
+    threshold_minutes. Rows are deactivated once the bus reaches or passes
+    the terminal or leaves the ETA horizon.
+    """
+    def __init__(self, session_factory: async_sessionmaker, tracking_service,
+                 threshold_minutes: int = ETA_CHANGE_THRESHOLD_MINUTES,
+                 interval: float = ETA_REFRESH_INTERVAL_SECONDS,
+                 horizon_minutes: int = ETA_HORIZON_MINUTES,
+                 metrics: Optional[Metrics] = None):
+        super().__init__(Eta, session_factory)
+        self.tracking_service = tracking_service
+        self.threshold_minutes = threshold_minutes
+        self.interval = interval
+        self.horizon_minutes = horizon_minutes
+        self.metrics = metrics or default_metrics
+        self._dirty: Set[str] = set()
+        # (bus, terminal) -> (minutes, distance_km) of the active row last written
+        self._written: Dict[PairKey, Tuple[int, float]] = {}
+        # (bus, terminal) -> (last, closest) distance_km seen on any refresh,
+        # whether or not a row was written for it
+        self._observed: Dict[PairKey, Tuple[float, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def mark(self, bus, location):
+        """
+        Location listener: schedule the bus for recomputation
+        """
+        self._dirty.add(bus.bus_id)
+
+    def compute_changes(self) -> Tuple[List[dict], List[dict], List[PairKey]]:
+        """
+        Returns (rows to insert, rows to update, pairs to deactivate) for the dirty buses
+        """
+        inserts, updates, deactivations = [], [], []
+        close_km = CLOSE_PROXIMITY_METERS / 1000
+        now = datetime.now()
+        service = self.tracking_service
+        dirty, self._dirty = self._dirty, set()
+
+        for bus_id in dirty:
+            bus = service.buses.get(bus_id)
+            bus_key = db_key(bus.bus_id, bus.db_id) if bus else None
+            if bus_key is None:
+                continue
+            tracking = (bus.last_location is not None and bus.status == "in_transit"
+                        and not service.stale_detector.is_stale(bus_id))
+
+            for terminal in service.terminals.values():
+                terminal_key = db_key(terminal.terminal_id, terminal.db_id)
+                if terminal_key is None:
+                    continue
+                pair = (bus_key, terminal_key)
+                previous = self._written.get(pair)
+                observed = self._observed.get(pair)
+
+                if tracking:
+                    minutes, dist_km = service.estimate_eta(bus, terminal)
+                    # Passed: it came within close range and is now moving away.
+                    passed = observed is not None and observed[1] <= close_km and dist_km > observed[0]
+                    in_horizon = minutes < self.horizon_minutes
+                else:
+                    passed, in_horizon = False, False
+
+                if passed:
+                    # Kept so no new row is started while it drives away.
+                    self._observed[pair] = (dist_km, observed[1])
+                elif not in_horizon:
+                    self._observed.pop(pair, None)
+                if passed or not in_horizon:
+                    if previous is not None:
+                        deactivations.append(pair)
+                        del self._written[pair]
+                    continue
+
+                self._observed[pair] = (dist_km, min(dist_km, observed[1]) if observed else dist_km)
+                if previous is not None and abs(minutes - previous[0]) <= self.threshold_minutes:
+                    continue
+
+                row = {
+                    "bus_id": bus_key,
+                    "terminal_id": terminal_key,
+                    "estimated_arrival_time": now + timedelta(minutes=minutes),
+                    "estimated_minutes_away": minutes,
+                    "last_phone_update_used": bus.last_location.timestamp,
+                    "calculated_at": now,
+                    "last_updated": now,
+                }
+                (updates if previous is not None else inserts).append(row)
+                self._written[pair] = (minutes, dist_km)
+
+        return inserts, updates, deactivations
+
+    async def refresh(self) -> int:
+        inserts, updates, deactivations = self.compute_changes()
+        if not (inserts or updates or deactivations):
+            return 0
+
+        table = self.table
+        active_pair = and_(
+            table.c.bus_id == bindparam("b_bus_id"),
+            table.c.terminal_id == bindparam("b_terminal_id"),
+            table.c.is_active.is_(True)
+        )
+        async with self.session_factory() as session, session.begin():
+            if inserts:
+                await session.execute(table.insert(), [dict(row, is_active=True) for row in inserts])
+            if updates:
+                await session.execute(
+                    update(table).where(active_pair).values(
+                        estimated_arrival_time=bindparam("estimated_arrival_time"),
+                        estimated_minutes_away=bindparam("estimated_minutes_away"),
+                        last_phone_update_used=bindparam("last_phone_update_used"),
+                        calculated_at=bindparam("calculated_at"),
+                        last_updated=bindparam("last_updated"),
+                    ),
+                    [dict(row, b_bus_id=row["bus_id"], b_terminal_id=row["terminal_id"]) for row in updates]
+                )
+            if deactivations:
+                await session.execute(
+                    update(table).where(active_pair).values(is_active=False, last_updated=datetime.now()),
+                    [{"b_bus_id": bus_key, "b_terminal_id": terminal_key}
+                     for bus_key, terminal_key in deactivations]
+                )
+
+        written = len(inserts) + len(updates) + len(deactivations)
+        self.metrics.incr("eta.rows_written", written)
+        return written
+
+    async def next_arrivals(self, terminal_key: int, limit: int = 10) -> List[dict]:
+        table = self.table
+        query = (
+            select(table.c.bus_id, table.c.estimated_arrival_time, table.c.estimated_minutes_away)
+            .where(table.c.terminal_id == terminal_key, table.c.is_active.is_(True),
+                   table.c.estimated_arrival_time >= datetime.now())
+            .order_by(table.c.estimated_arrival_time)
+            .limit(limit)
+        )
+        async with self.session_factory() as session:
+            return [dict(row) for row in (await session.execute(query)).mappings()]
+
+    async def reset(self):
+        """
+        Deactivate rows left over from a previous run
+        """
+        async with self.session_factory() as session, session.begin():
+            await session.execute(
+                update(self.table).where(self.table.c.is_active.is_(True)).values(is_active=False)
+            )
+        self._written.clear()
+        self._observed.clear()
+        self._dirty.update(self.tracking_service.buses.keys())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception:
+                # Drop the cache so the next refresh rewrites every pair from scratch.
+                self.metrics.incr("eta.refresh_failures")
+                await self._recover()
+
+    async def _recover(self):
+        try:
+            await self.reset()
+        except Exception:
+            pass
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
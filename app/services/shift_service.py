@@ -0,0 +1,135 @@
+from datetime import datetime
+from typing import Callable, List
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.BusAssignment import BusAssignment
+from app.models.Bus import Bus
+from app.models.driver import Driver
+from app.schemas.driver import DriverStartShift
+from app.utils.exceptions import (
+    DriverNotVerifiedException, PhoneNumberMismatchException, ValidationError
+)
+from app.utils.validators import sanitize_employee_id, sanitize_phone_number
+from service.shifts import ActiveShift, ShiftRegistry
+from .base_service import BaseService
+
+
+class ShiftService(BaseService[BusAssignment]):
+    """
+    Starts and ends driver shifts.
+    Changes are committed to bus_assignments first and then applied to the registry,
+    so the registry never holds a shift the database doesn't know about. A start
+    reserves its bus and driver in the registry before inserting and releases
+    them if the transaction fails, so concurrent starts can't both commit.
+    """
+    def __init__(self, session_factory: async_sessionmaker, registry: ShiftRegistry,
+                 resolve_bus_key: Callable[[int], str] = str):
+        super().__init__(BusAssignment, session_factory)
+        self.registry = registry
+        self.resolve_bus_key = resolve_bus_key
+        self.drivers = Driver.__table__
+        self.buses = Bus.__table__
+
+    async def load_active_shifts(self) -> int:
+        query = (
+            select(self.table.c.id, self.table.c.bus_id, self.table.c.driver_id,
+                   self.table.c.start_shift, self.drivers.c.phone_number)
+            .join(self.drivers, self.drivers.c.id == self.table.c.driver_id)
+            .where(self.table.c.is_active.is_(True))
+        )
+        async with self.session_factory() as session:
+            rows = (await session.execute(query)).all()
+
+        self.registry.load(
+            ActiveShift(
+                bus_id=self.resolve_bus_key(row.bus_id),
+                driver_id=row.driver_id,
+                driver_phone=row.phone_number,
+                assignment_id=row.id,
+                started_at=row.start_shift
+            )
+            for row in rows
+        )
+        return len(rows)
+
+    async def start_shift(self, data: DriverStartShift) -> ActiveShift:
+        bus_key = self.resolve_bus_key(data.bus_id)
+        now = datetime.now()
+
+        reserved = None
+        try:
+            async with self.session_factory() as session, session.begin():
+                result = await session.execute(
+                    select(self.drivers.c.id, self.drivers.c.phone_number,
+                           self.drivers.c.is_active, self.drivers.c.is_verified)
+                    .where(self.drivers.c.employees_id == sanitize_employee_id(data.employee_id))
+                )
+                driver = result.first()
+                if driver is None:
+                    raise ValidationError("Driver not found")
+                if not driver.is_active or not driver.is_verified:
+                    raise DriverNotVerifiedException()
+                if sanitize_phone_number(data.phone_number) != sanitize_phone_number(driver.phone_number):
+                    raise PhoneNumberMismatchException()
+
+                self.registry.reserve(bus_key, driver.id)
+                reserved = driver.id
+
+                result = await session.execute(
+                    self.table.insert().values(
+                        bus_id=data.bus_id,
+                        driver_id=driver.id,
+                        start_shift=now,
+                        tracking_started_at=now,
+                        is_active=True,
+                        assignment_status="active"
+                    )
+                )
+                assignment_id = result.inserted_primary_key[0]
+                await session.execute(
+                    update(self.drivers).where(self.drivers.c.id == driver.id)
+                    .values(is_on_shift=True, is_tracking_enabled=True, current_shift_id=assignment_id)
+                )
+                await session.execute(
+                    update(self.buses).where(self.buses.c.id == data.bus_id)
+                    .values(current_shift_id=assignment_id, current_driver_id=driver.id)
+                )
+        except BaseException:
+            if reserved is not None:
+                self.registry.release(bus_key, reserved)
+            raise
+
+        return self.registry.start(ActiveShift(
+            bus_id=bus_key,
+            driver_id=driver.id,
+            driver_phone=driver.phone_number,
+            assignment_id=assignment_id,
+            started_at=now
+        ))
+
+    async def end_shift(self, bus_key: str) -> ActiveShift:
+        shift = self.registry.for_bus(bus_key)
+        if shift is None:
+            return self.registry.end(bus_key)
+
+        now = datetime.now()
+        async with self.session_factory() as session, session.begin():
+            await session.execute(
+                update(self.table).where(self.table.c.id == shift.assignment_id)
+                .values(end_shift=now, tracking_ended_at=now, is_active=False,
+                        assignment_status="completed")
+            )
+            await session.execute(
+                update(self.drivers).where(self.drivers.c.id == shift.driver_id)
+                .values(is_on_shift=False, is_tracking_enabled=False, current_shift_id=None)
+            )
+            await session.execute(
+                update(self.buses).where(self.buses.c.current_shift_id == shift.assignment_id)
+                .values(current_shift_id=None, current_driver_id=None)
+            )
+
+        return self.registry.end(bus_key)
+
+    def active_shifts(self) -> List[ActiveShift]:
+        return self.registry.all()
@@ -0,0 +1,170 @@
+import asyncio
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.tracking import Tracking
+from app.utils.constants import (
+    TRACKING_FLUSH_INTERVAL_SECONDS, TRACKING_MAX_PENDING, TRACKING_FLUSH_MAX_BACKOFF_SECONDS
+)
+from service import db_key
+from service.metrics import Metrics, metrics as default_metrics
+from .base_service import BaseService
+
+_UPSERT_DIALECTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+# Bind parameters allowed in one statement: SQLite's default limit since 3.32, and
+# the 16-bit count in PostgreSQL's wire protocol (asyncpg).
+_MAX_PARAMETERS = {
+    "sqlite": 32766,
+    "postgresql": 32767,
+}
+
+
+class TrackingWriteBehind(BaseService[Tracking]):
+    """
+    Keeps the latest position per bus in memory and periodically writes the
+    buses that changed to the trackings table as bulk upserts, split so
+    each statement stays under the driver's bind parameter limit.
+
+    At most max_pending buses are held; pings for new buses beyond that are
+    dropped (and counted) until the next flush makes room.
+    """
+    def __init__(self, session_factory: async_sessionmaker,
+                 interval: float = TRACKING_FLUSH_INTERVAL_SECONDS,
+                 max_pending: int = TRACKING_MAX_PENDING,
+                 max_backoff: float = TRACKING_FLUSH_MAX_BACKOFF_SECONDS,
+                 driver_lookup: Optional[Callable[[str], Optional[int]]] = None,
+                 metrics: Optional[Metrics] = None):
+        super().__init__(Tracking, session_factory)
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+        self.driver_lookup = driver_lookup
+        self.metrics = metrics or default_metrics
+        self._pending: Dict[int, dict] = {}
+        self._failures = 0
+        self._flush_now: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def record(self, bus, location):
+        """
+        Location listener: remember the newest position for the bus
+        """
+        bus_key = db_key(bus.bus_id, bus.db_id)
+        if bus_key is None:
+            return
+
+        if bus_key not in self._pending and len(self._pending) >= self.max_pending:
+            self.metrics.incr("tracking.dropped")
+            if self._flush_now is not None:
+                self._flush_now.set()
+            return
+
+        self._pending[bus_key] = {
+            "bus_id": bus_key,
+            "driver_id": self.driver_lookup(bus.bus_id) if self.driver_lookup else None,
+            "driver_phone_number": location.driver_phone,
+            "longitude": location.longitude,
+            "Latitude": location.latitude,
+            "accuracy_meters": location.accuracy_meters if location.accuracy_meters is not None else 10.0,
+            "speed_km": location.speed,
+            "heading": location.heading,
+            "phone_battery_level": location.battery_level,
+            "is_charging": location.is_charging,
+            "network_type": location.network_type,
+            "signal_strength": location.signal_strength,
+            "last_phone_ping": location.timestamp,
+            "last_updated": datetime.now(),
+        }
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+
+        rows, self._pending = list(self._pending.values()), {}
+        flushed = 0
+        try:
+            async with self.session_factory() as session:
+                dialect = session.bind.dialect.name
+                size = max(1, _MAX_PARAMETERS.get(dialect, 32766) // len(rows[0]))
+                for start in range(0, len(rows), size):
+                    batch = rows[start:start + size]
+                    async with session.begin():
+                        await session.execute(self._upsert_statement(dialect, batch))
+                    flushed += len(batch)
+        except Exception:
+            self._restore(rows[flushed:])
+            self.metrics.incr("tracking.rows_flushed", flushed)
+            self.metrics.incr("tracking.flush_failures")
+            raise
+
+        self.metrics.incr("tracking.rows_flushed", flushed)
+        self.metrics.set_gauge("tracking.pending", len(self._pending))
+        return flushed
+
+    def _restore(self, rows):
+        """
+        Put unwritten rows back, unless a newer ping for the bus arrived
+        meanwhile, without going over max_pending
+        """
+        for row in rows:
+            bus_key = row["bus_id"]
+            if bus_key in self._pending:
+                continue
+            if len(self._pending) >= self.max_pending:
+                self.metrics.incr("tracking.dropped")
+                continue
+            self._pending[bus_key] = row
+
+    def _upsert_statement(self, dialect: str, rows):
+        insert = _UPSERT_DIALECTS.get(dialect)
+        if insert is None:
+            raise RuntimeError(f"Bulk upsert not supported for {dialect}")
+
+        stmt = insert(self.table).values(rows)
+        updated = {key: stmt.excluded[key] for key in rows[0] if key != "bus_id"}
+        return stmt.on_conflict_do_update(index_elements=[self.table.c.bus_id], set_=updated)
+
+    async def run(self):
+        self._flush_now = asyncio.Event()
+        while True:
+            delay = self.interval if self._failures == 0 else min(
+                self.max_backoff, self.interval * 2 ** self._failures
+            )
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+
+            try:
+                await self.flush()
+                self._failures = 0
+            except Exception:
+                self._failures += 1
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            pass
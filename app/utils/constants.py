@@ -6,13 +6,98 @@ NIGERIA_COUNTRY_CODE = "+234"
 PHONE_NUMBER_LENGTH = 15
 
 GPS_UPDATE_INTERVAL_SECONDS = 30
+PING_INTERVAL_NEAR_SECONDS = 15
+PING_INTERVAL_MAX_SECONDS = 60
+PING_INTERVAL_IDLE_SECONDS = 60
+PING_INTERVAL_ETA_FRACTION = 0.1
+PING_IDLE_SPEED_KMH = 3
 TERMINAL_RADIUS_METERS = 100
+# Buses arrive inside the first radius and only leave beyond the second.
+TERMINAL_ARRIVAL_RADIUS_DEGREES = 0.001
+TERMINAL_DEPARTURE_RADIUS_DEGREES = 0.0015
 CLOSE_PROXIMITY_METERS = 500
 MAX_GPS_ACCURACY_METERS = 50
 
+BUS_STALE_AFTER_SECONDS = 90
+# A bus told to ping less often is only stale after missing this many of its hinted pings.
+BUS_STALE_AFTER_PING_INTERVALS = 3
+BUS_OFFLINE_AFTER_SECONDS = 300
+STALE_SWEEP_INTERVAL_SECONDS = 5
+
+PING_RATE_PER_SECOND = 1.0
+PING_BURST = 5
+RATE_LIMIT_MAX_KEYS = 50000
+OVERLOAD_HISTORY_LATENCY_MS = 50
+OVERLOAD_ANALYTICS_LATENCY_MS = 200
+OVERLOAD_MAX_IN_FLIGHT = 200
+
+INGEST_PIPELINE_ENABLED = False
+INGEST_QUEUE_SIZE = 10000
+INGEST_BATCH_SIZE = 500
+
+TRACKING_FLUSH_INTERVAL_SECONDS = 5
+TRACKING_MAX_PENDING = 20000
+TRACKING_FLUSH_MAX_BACKOFF_SECONDS = 60
+
+KINEMATIC_SMOOTHING_ENABLED = True
+KINEMATIC_ALPHA = 0.5
+KINEMATIC_BETA = 0.15
+KINEMATIC_RESET_SECONDS = 120
+KINEMATIC_MAX_JUMP_KM = 1.0
+KINEMATIC_TRUSTED_ACCURACY_METERS = 10
+
+ETA_HORIZON_MINUTES = 30
+ETA_CHANGE_THRESHOLD_MINUTES = 2
+ETA_REFRESH_INTERVAL_SECONDS = 10
+WAIT_WITH_BUS_MINUTES = 2
+WAIT_NO_BUS_MINUTES = 15
+
+REBALANCE_MIN_BUSES_PER_TERMINAL = 1
+REBALANCE_AVERAGE_SPEED_KMH = 30
+# The exact solver takes ~15 ms at 2500 cells, ~50 ms at 4000 and ~120 ms at 150x150
+# on one core; larger plans, or a solve that overruns the time limit, fall back to greedy.
+REBALANCE_MAX_TRANSPORT_CELLS = 2500
+REBALANCE_SOLVER_TIME_LIMIT_SECONDS = 0.05
+
+TRACE_DIR = "traces"
+REPORT_DIR = "reports"
+REPORT_WORKERS = 4
+REPORT_MAX_FINISHED_JOBS = 100
+REPORT_SHIFT_GAP_SECONDS = 1800
+EXPORT_BATCH_ROWS = 65536
+
+SNAPSHOT_MAX_BUSES = 20000
+SNAPSHOT_MAX_TERMINALS = 1000
+SNAPSHOT_PUBLISH_INTERVAL_SECONDS = 0.5
+SNAPSHOT_READ_RETRIES = 5
+
+CHANGE_LOG_SIZE = 200000
+
+MAP_MAX_CLUSTER_ZOOM = 15
+MAP_INDIVIDUAL_BUS_ZOOM = 16
+MAP_CELLS_PER_TILE = 4
+MAP_MAX_CELLS = 1024
+MAP_MAX_BUSES = 500
+
+MAX_LOOKUP_IDS = 200
+
+HEADWAY_BUNCHING_MINUTES = 2
+HEADWAY_MAX_OFF_ROUTE_KM = 0.5
+
+SLOW_REQUEST_THRESHOLD_MS = 500
+SLOW_REQUEST_LOG_SIZE = 200
+PROFILE_STORE_SIZE = 20
+PROFILE_TOP_FUNCTIONS = 40
+
 DEFAULT_NOTIFICATION_WINDOW = 10
+NOTIFICATION_LOG_SIZE = 1000
 MAX_SHIFT_DURATION_HOURS = 12
+ENFORCE_ACTIVE_SHIFTS = True
 TOKEN_EXPIRE_MIN = 1440
+TOKEN_CACHE_SIZE = 10000
+REQUIRE_DRIVER_AUTH = False
+PASSWORD_HASH_ITERATIONS = 200000
+PASSWORD_HASH_WORKERS = 4
 
 STATUS_ACTIVE = "active"
 STATUS_INACTIVE = "inactive"
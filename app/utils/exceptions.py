@@ -8,7 +8,7 @@ class ValidationError(BRTLiveException):
 
 class DriverNotVerifiedException(BRTLiveException):
     """ Driver hasn't been verified by admin"""
-    def __int__(self):
+    def __init__(self):
         super().__init__("Driver acct pending admin verification")
 
 class DriverAlreadyOnShiftException(BRTLiveException):
@@ -36,7 +36,17 @@ class InvalidCredentialsException(BRTLiveException):
     def __init__(self):
         super().__init__("Invalid username or password")
 
+class IngestQueueFullException(BRTLiveException):
+    """Ingest pipeline can't accept more pings right now"""
+    def __init__(self):
+        super().__init__("Location queue is full, retry shortly")
+
 class GPSAccuracyException(BRTLiveException):
     """GPS accuracy is too poor"""
     def __init__(self, accuracy: float):
-        super().__init__(f"GPS accuracy too poor: {accuracy}m (max 50m)")
\ No newline at end of file
+        super().__init__(f"GPS accuracy too poor: {accuracy}m (max 50m)")
+
+class ReadOnlyReplicaException(BRTLiveException):
+    """This worker only serves reads from the fleet snapshot"""
+    def __init__(self):
+        super().__init__("This worker is read-only; send writes to the ingest process")
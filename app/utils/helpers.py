@@ -44,7 +44,7 @@ def format_time_ago(dt:datetime) -> str:
         return "just now"
     elif seconds < 3600:
         minutes = int(seconds/60)
-        return f"{minutes} minute{"s" if minutes != 1 else ''} ago"
+        return f"{minutes} minute{'s' if minutes != 1 else ''} ago"
     elif seconds < 86400:
         hours = int(seconds / 3600)
         return f"{hours} hour{'s' if hours != 1 else ''} ago"
@@ -0,0 +1,75 @@
+"""
+Authenticated vs unauthenticated location-ping throughput.
+
+Run from the repository root:
+    python -m benchmarks.bench_auth
+"""
+import time
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from main import create_app
+from app.services.auth_service import (
+    authenticator, create_access_token, decode_access_token, hash_password, verify_password
+)
+
+REQUESTS = 2000
+
+
+def bench_token_verification(n: int = 100000):
+    token = create_access_token("1", "driver", {"driver_id": 1})
+
+    start = time.perf_counter()
+    for _ in range(n):
+        decode_access_token(token)
+    full = (time.perf_counter() - start) / n * 1e6
+
+    authenticator.cache.clear()
+    start = time.perf_counter()
+    for _ in range(n):
+        authenticator.verify(token)
+    cached = (time.perf_counter() - start) / n * 1e6
+
+    print(f"full verification:   {full:8.2f} us/token")
+    print(f"cached verification: {cached:8.2f} us/token")
+
+
+def bench_password_hash():
+    start = time.perf_counter()
+    hashed = hash_password("driver-secret")
+    verify_password("driver-secret", hashed)
+    print(f"hash + verify:       {(time.perf_counter() - start) * 1000:8.2f} ms (runs in thread pool)")
+
+
+def bench_requests(client: TestClient, headers: dict, label: str):
+    payload = {"bus_id": "BUS002", "driver_phone": "+2348012345602", "latitude": 6.5, "longitude": 3.39}
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        response = client.post("/api/buses/BUS002/location", json=payload, headers=headers)
+        assert response.status_code == 200, response.text
+    elapsed = time.perf_counter() - start
+    print(f"{label:<20} {REQUESTS / elapsed:8.0f} req/s")
+
+
+def main_bench():
+    bench_token_verification()
+    bench_password_hash()
+
+    app = create_app(Settings(dev_endpoints=True))
+    with TestClient(app) as client:
+        client.post("/api/dev/populate-sample-data")
+        # Every request pings the same bus; this measures auth, not the rate limiter.
+        app.state.tracking_service.rate_limit_enabled = False
+        shift = app.state.tracking_service.shifts.for_bus("BUS002")
+        token = create_access_token(str(shift.driver_id), "driver", {"driver_id": shift.driver_id})
+
+        authenticator.require_driver_auth = False
+        bench_requests(client, {}, "unauthenticated:")
+
+        authenticator.require_driver_auth = True
+        authenticator.cache.clear()
+        bench_requests(client, {"Authorization": f"Bearer {token}"}, "authenticated:")
+
+
+if __name__ == "__main__":
+    main_bench()
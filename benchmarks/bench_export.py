@@ -0,0 +1,84 @@
+"""
+Time and memory to export a day of GPS history from recorded traces as
+Parquet. Exits non-zero when the export takes longer than the budget or
+grows peak RSS by more than --budget-mb. Skipped, exiting 0, when the
+optional pyarrow extra is not installed.
+
+Run from the repository root:
+    python -m benchmarks.bench_export [--buses 500] [--interval 30]
+"""
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from service import BusLocation
+from service.export import PARQUET, available, export_history, trace_paths
+from service.trace import TraceRecorder
+
+DAY = datetime(2026, 1, 5)
+
+
+def write_day(directory: str, n_buses: int, interval: int) -> int:
+    """
+    One trace per hour, every bus pinging every `interval` seconds
+    """
+    rng = random.Random(11)
+    positions = [[6.4 + rng.random() * 0.25, 3.25 + rng.random() * 0.4] for _ in range(n_buses)]
+    pings = 0
+    for hour in range(24):
+        start = DAY + timedelta(hours=hour)
+        recorder = TraceRecorder(os.path.join(directory, f"trace-{start:%Y%m%d-%H%M%S}.jsonl.gz"))
+        for second in range(0, 3600, interval):
+            at = start + timedelta(seconds=second)
+            for i, position in enumerate(positions):
+                position[0] += rng.uniform(-0.001, 0.001)
+                position[1] += rng.uniform(-0.001, 0.001)
+                recorder.location(f"BUS{i:04d}", BusLocation(
+                    bus_id=f"BUS{i:04d}", driver_phone=f"+234803{i:07d}", latitude=position[0],
+                    longitude=position[1], speed=rng.uniform(0, 40), timestamp=at
+                ), applied=rng.random() > 0.01)
+                pings += 1
+        recorder.close()
+    return pings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark history export")
+    parser.add_argument("--buses", type=int, default=500)
+    parser.add_argument("--interval", type=int, default=30)
+    parser.add_argument("--budget-seconds", type=float, default=10.0)
+    parser.add_argument("--budget-mb", type=float, default=256.0)
+    args = parser.parse_args()
+
+    if not available():
+        print("SKIP: export requires the optional pyarrow extra (pip install pyarrow)")
+        raise SystemExit(0)
+    with tempfile.TemporaryDirectory() as directory:
+        pings = write_day(directory, args.buses, args.interval)
+        output = os.path.join(directory, "day.parquet")
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        paths = trace_paths(directory, DAY, DAY + timedelta(days=1))
+        with open(output, "wb") as f:
+            for chunk in export_history(paths, fmt=PARQUET, since=DAY, until=DAY + timedelta(days=1)):
+                f.write(chunk)
+        elapsed = time.perf_counter() - start
+        rss_growth_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+        size_mb = os.path.getsize(output) / 1e6
+
+    print(f"pings:      {pings}")
+    print(f"export:     {elapsed:.2f}s ({pings / elapsed:,.0f} pings/s)")
+    print(f"peak RSS:   +{rss_growth_mb:.1f} MB")
+    print(f"parquet:    {size_mb:.1f} MB")
+    failed = elapsed > args.budget_seconds or rss_growth_mb > args.budget_mb
+    if failed:
+        print(f"FAIL: over {args.budget_seconds}s or {args.budget_mb} MB budget")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
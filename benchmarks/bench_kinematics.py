@@ -0,0 +1,177 @@
+"""
+Status flapping and ETA error on a simulated fleet with noisy GPS, with raw
+pings and a single terminal radius versus the kinematic filter with
+arrival/departure hysteresis.
+
+Buses park in bays spread around each terminal, inside the arrival radius,
+then drive to another terminal. Every ping gets Gaussian position noise, and
+a share of phones always send speed=0. Flaps are status changes beyond the
+true arrivals and departures. ETA error compares the ETA to the destination
+from the bus's stored location and speed with the one from its true state.
+Exits non-zero when the filter removes less than --min-flap-reduction of the
+flaps or doesn't lower the ETA error for phones that send no speed.
+
+Run from the repository root:
+    python -m benchmarks.bench_kinematics [--buses 200] [--hours 2] [--noise-m 15]
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.utils.constants import TERMINAL_ARRIVAL_RADIUS_DEGREES
+from service import Bus, BusLocation, BusTrackingService, Terminal
+
+START = datetime(2026, 1, 5, 6, 0, 0)
+DEGREE_M = 111000
+
+
+class SimBus:
+    """
+    Parks in a bay at a terminal, drives straight to a bay at another one, and repeats
+    """
+
+    def __init__(self, bus_id: str, phone: str, terminals, rng: random.Random, sends_speed: bool):
+        self.bus_id, self.phone, self.sends_speed = bus_id, phone, sends_speed
+        self.rng = rng
+        self.terminals = terminals
+        self.legs = []  # (start, end, origin, destination, speed_kmh, terminal); origin == destination when parked
+        at = rng.choice(terminals)
+        self._extend(0.0, self._bay(at), at)
+
+    def _bay(self, terminal):
+        distance = self.rng.uniform(0, TERMINAL_ARRIVAL_RADIUS_DEGREES * 0.9)
+        angle = self.rng.uniform(0, 2 * math.pi)
+        return terminal.latitude + distance * math.cos(angle), terminal.longitude + distance * math.sin(angle)
+
+    def _extend(self, t: float, bay, at):
+        park = self.rng.uniform(300, 1200)
+        self.legs.append((t + 0.0, t + park, bay, bay, 0.0, at))
+        destination = self.rng.choice([term for term in self.terminals if term is not at])
+        target = self._bay(destination)
+        speed = self.rng.uniform(12, 35)
+        dist_km = math.hypot(target[0] - bay[0], target[1] - bay[1]) * 111
+        self.legs.append((t + park, t + park + dist_km / speed * 3600, bay, target, speed, destination))
+
+    def state(self, t: float):
+        while self.legs[-1][1] < t:
+            self._extend(self.legs[-1][1], self.legs[-1][3], self.legs[-1][5])
+        while self.legs[0][1] < t:
+            self.legs.pop(0)
+        start, end, origin, target, speed, terminal = self.legs[0]
+        f = (t - start) / (end - start) if speed else 0.0
+        lat = origin[0] + (target[0] - origin[0]) * f
+        lon = origin[1] + (target[1] - origin[1]) * f
+        return lat, lon, speed, terminal
+
+
+def simulate(n_buses: int, n_terminals: int, hours: float, noise_m: float, zero_speed_share: float,
+             interval: float, filtered: bool, seed: int = 7):
+    rng = random.Random(seed)
+    service = BusTrackingService()
+    service.enforce_shifts = False
+    service.rate_limit_enabled = False
+    service.smoothing_enabled = filtered
+    if not filtered:
+        service.departure_radius = service.arrival_radius
+    terminals = []
+    for i in range(n_terminals):
+        terminal = Terminal(terminal_id=f"TRM{i:02d}", name=f"Terminal {i}", total_capacity=30,
+                            latitude=6.4 + rng.random() * 0.25, longitude=3.25 + rng.random() * 0.4)
+        service.register_terminal(terminal)
+        terminals.append(terminal)
+    buses = []
+    for i in range(n_buses):
+        bus = SimBus(f"BUS{i:04d}", f"+234805{i:07d}", terminals, rng, rng.random() >= zero_speed_share)
+        service.register_bus(Bus(bus_id=bus.bus_id, driver_phone=bus.phone, driver_name=f"Driver {i}",
+                                 plate_number=f"LAG-{i:04d}", capacity=50))
+        buses.append(bus)
+
+    noise = noise_m / DEGREE_M
+    status = {bus.bus_id: None for bus in buses}
+    parked = {bus.bus_id: None for bus in buses}
+    changes = true_changes = pings = correct = 0
+    position_error = 0.0
+    eta_errors = {True: [], False: []}
+    elapsed = 0.0
+    t = 0.0
+    while t < hours * 3600:
+        for bus in buses:
+            at = t + rng.uniform(0, interval)
+            lat, lon, speed, terminal = bus.state(at)
+            location = BusLocation(
+                bus_id=bus.bus_id, driver_phone=bus.phone,
+                latitude=lat + rng.gauss(0, noise), longitude=lon + rng.gauss(0, noise),
+                speed=max(0.0, speed + rng.gauss(0, 1.5)) if bus.sends_speed and speed else 0.0,
+                timestamp=START + timedelta(seconds=at)
+            )
+            start = time.perf_counter()
+            service.update_bus_location(bus.bus_id, location)
+            elapsed += time.perf_counter() - start
+            pings += 1
+
+            now = service._bus_status(bus.bus_id)
+            truly_parked = speed == 0
+            if status[bus.bus_id] is not None and now != status[bus.bus_id]:
+                changes += 1
+            if parked[bus.bus_id] is not None and truly_parked != parked[bus.bus_id]:
+                true_changes += 1
+            status[bus.bus_id], parked[bus.bus_id] = now, truly_parked
+            correct += (now == "available") == truly_parked
+
+            stored = service.buses[bus.bus_id].last_location
+            position_error += math.hypot(stored.latitude - lat, stored.longitude - lon) ** 2
+            if speed:
+                true_eta = service._eta(lat, lon, speed, terminal)[0]
+                used_eta = service._eta(stored.latitude, stored.longitude, stored.speed, terminal)[0]
+                eta_errors[bus.sends_speed].append(abs(used_eta - true_eta))
+        t += interval
+
+    mean = lambda values: sum(values) / max(len(values), 1)
+    return {
+        "pings": pings,
+        "flaps": changes - true_changes,
+        "changes": changes,
+        "true_changes": true_changes,
+        "status_accuracy": correct / pings,
+        "position_rms_m": math.sqrt(position_error / pings) * DEGREE_M,
+        "eta_error_speed": mean(eta_errors[True]),
+        "eta_error_no_speed": mean(eta_errors[False]),
+        "us_per_ping": elapsed / pings * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark kinematic smoothing and terminal hysteresis")
+    parser.add_argument("--buses", type=int, default=200)
+    parser.add_argument("--terminals", type=int, default=20)
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--interval", type=float, default=10.0)
+    parser.add_argument("--noise-m", type=float, default=15.0)
+    parser.add_argument("--zero-speed-share", type=float, default=0.5)
+    parser.add_argument("--min-flap-reduction", type=float, default=0.8)
+    args = parser.parse_args()
+
+    runs = {}
+    for name, filtered in (("raw", False), ("filtered", True)):
+        runs[name] = simulate(args.buses, args.terminals, args.hours, args.noise_m, args.zero_speed_share,
+                              args.interval, filtered)
+    raw, filtered = runs["raw"], runs["filtered"]
+    print(f"{raw['pings']} pings per run, {raw['true_changes']} true arrivals and departures")
+    print(f"{'':9} {'flaps':>6} {'status ok':>10} {'pos RMS m':>10} "
+          f"{'ETA err (speed)':>16} {'ETA err (no speed)':>19} {'us/ping':>8}")
+    for name, run in runs.items():
+        print(f"{name:9} {run['flaps']:6d} {run['status_accuracy']:10.1%} {run['position_rms_m']:10.1f} "
+              f"{run['eta_error_speed']:16.2f} {run['eta_error_no_speed']:19.2f} {run['us_per_ping']:8.1f}")
+    reduction = 1 - filtered["flaps"] / raw["flaps"] if raw["flaps"] else 1.0
+    print(f"flap reduction {reduction:.1%}")
+
+    failed = reduction < args.min_flap_reduction or filtered["eta_error_no_speed"] >= raw["eta_error_no_speed"]
+    if failed:
+        print("FAIL: too little flap reduction or no ETA improvement")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Per-ping cost of arrival-notification detection with many subscriptions.
+Exits non-zero when the mean ping takes longer than the budget.
+
+Run from the repository root:
+    python -m benchmarks.bench_notifications [--subscriptions 100000] [--budget-us 500]
+"""
+import argparse
+import random
+import time
+
+from service import Bus, BusLocation, BusTrackingService, Terminal
+from service.columnar import ColumnarBusTrackingService
+from service.notifications import NotificationSink
+
+
+class CountingSink(NotificationSink):
+    def __init__(self):
+        self.count = 0
+
+    def send(self, notifications):
+        self.count += len(notifications)
+
+
+def build(service_cls, n_buses: int, n_terminals: int, n_routes: int, n_subscriptions: int):
+    rng = random.Random(5)
+    service = service_cls()
+    service.enforce_shifts = False
+    service.notifier.sink = CountingSink()
+    for i in range(n_terminals):
+        service.register_terminal(Terminal(
+            terminal_id=f"TRM{i:03d}", name=f"Terminal {i}",
+            latitude=6.35 + rng.random() * 0.35, longitude=3.2 + rng.random() * 0.5, total_capacity=20
+        ))
+    for i in range(n_buses):
+        service.register_bus(Bus(bus_id=f"BUS{i:05d}", driver_phone=f"+234801{i:07d}",
+                                 driver_name=f"Driver {i}", plate_number=f"LAG-{i:05d}", capacity=50,
+                                 route_id=f"R{i % n_routes}", status="in_transit"))
+
+    terminal_ids = list(service.terminals)
+    for _ in range(n_subscriptions):
+        route = f"R{rng.randrange(n_routes)}" if rng.random() < 0.7 else None
+        service.subscribe_arrivals(rng.choice(terminal_ids), route, rng.randint(1, 20))
+    return service
+
+
+def pings(service, n_buses: int, rounds: int):
+    """
+    Buses driving straight at a random terminal, pinging every 30 seconds
+    """
+    rng = random.Random(9)
+    terminals = list(service.terminals.values())
+    buses = []
+    for i in range(n_buses):
+        buses.append([f"BUS{i:05d}", f"+234801{i:07d}", 6.35 + rng.random() * 0.35,
+                      3.2 + rng.random() * 0.5, rng.choice(terminals), rng.uniform(15, 45)])
+    for _ in range(rounds):
+        for bus in buses:
+            bus_id, phone, lat, lon, target, speed = bus
+            step = speed / 120 / 111  # degrees covered in 30 seconds
+            dlat, dlon = target.latitude - lat, target.longitude - lon
+            dist = (dlat ** 2 + dlon ** 2) ** 0.5
+            if dist <= step:
+                bus[4] = rng.choice(terminals)
+                continue
+            bus[2], bus[3] = lat + dlat / dist * step, lon + dlon / dist * step
+            yield bus_id, BusLocation(bus_id=bus_id, driver_phone=phone,
+                                      latitude=bus[2], longitude=bus[3], speed=speed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark arrival-notification detection")
+    parser.add_argument("--buses", type=int, default=2000)
+    parser.add_argument("--terminals", type=int, default=300)
+    parser.add_argument("--routes", type=int, default=40)
+    parser.add_argument("--subscriptions", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--budget-us", type=float, default=500.0)
+    args = parser.parse_args()
+
+    failed = False
+    for label, cls in (("objects", BusTrackingService), ("columnar", ColumnarBusTrackingService)):
+        service = build(cls, args.buses, args.terminals, args.routes, args.subscriptions)
+        batch = list(pings(service, args.buses, args.rounds))
+        start = time.perf_counter()
+        for bus_id, location in batch:
+            service._notify_arrivals(bus_id, location)
+        mean_us = (time.perf_counter() - start) / len(batch) * 1e6
+        print(f"{label:<9} {mean_us:7.1f} us/ping  subscriptions={len(service.notifier)} "
+              f"notified={service.notifier.sink.count}")
+        failed = failed or mean_us > args.budget_us
+
+    if failed:
+        print(f"FAIL: over {args.budget_us} us budget")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
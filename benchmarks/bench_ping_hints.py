@@ -0,0 +1,148 @@
+"""
+Ping volume and ETA error on a simulated fleet, with phones pinging at the
+fixed GPS_UPDATE_INTERVAL_SECONDS versus following next_ping_seconds.
+
+ETA error is sampled every minute for every moving bus and every terminal
+it is within ETA_HORIZON_MINUTES of, comparing the ETA from the last
+reported position with the one from the true position. Exits non-zero when
+the adaptive schedule saves less than --min-reduction of the pings, or makes
+the mean error for ETAs inside DEFAULT_NOTIFICATION_WINDOW, the ones riders
+are notified on, worse by more than --max-eta-loss (a fraction of the fixed
+schedule's error). Longer ETAs are refreshed less often, so their error
+rises; it is printed, not gated.
+
+Run from the repository root:
+    python -m benchmarks.bench_ping_hints [--buses 300] [--hours 2]
+"""
+import argparse
+import heapq
+import random
+from datetime import datetime, timedelta
+
+from app.utils.constants import DEFAULT_NOTIFICATION_WINDOW, ETA_HORIZON_MINUTES, GPS_UPDATE_INTERVAL_SECONDS
+from service import Bus, BusLocation, BusTrackingService, Terminal
+
+START = datetime(2026, 1, 5, 6, 0, 0)
+
+
+class SimBus:
+    """
+    Parks at a terminal, drives straight to another one, and repeats
+    """
+
+    def __init__(self, bus_id: str, phone: str, terminals, rng: random.Random):
+        self.bus_id, self.phone = bus_id, phone
+        self.rng = rng
+        self.terminals = terminals
+        self.legs = []  # (start, end, origin, destination, speed_kmh); origin == destination when parked
+        self._extend(0.0, rng.choice(terminals))
+
+    def _extend(self, t: float, at):
+        park = self.rng.uniform(300, 1800)
+        self.legs.append((t, t + park, at, at, 0.0))
+        destination = self.rng.choice([term for term in self.terminals if term is not at])
+        speed = self.rng.uniform(15, 35)
+        dist_km = ((destination.latitude - at.latitude) ** 2 + (destination.longitude - at.longitude) ** 2) ** 0.5 * 111
+        self.legs.append((t + park, t + park + dist_km / speed * 3600, at, destination, speed))
+
+    def state(self, t: float):
+        while self.legs[-1][1] < t:
+            self._extend(self.legs[-1][1], self.legs[-1][3])
+        while self.legs[0][1] < t:
+            self.legs.pop(0)
+        start, end, origin, destination, speed = self.legs[0]
+        f = (t - start) / (end - start) if speed else 0.0
+        lat = origin.latitude + (destination.latitude - origin.latitude) * f
+        lon = origin.longitude + (destination.longitude - origin.longitude) * f
+        return lat, lon, speed, destination
+
+
+def simulate(n_buses: int, n_terminals: int, hours: float, adaptive: bool, seed: int = 3):
+    rng = random.Random(seed)
+    service = BusTrackingService()
+    service.enforce_shifts = False
+    service.rate_limit_enabled = False
+    terminals = []
+    for i in range(n_terminals):
+        terminal = Terminal(terminal_id=f"TRM{i:02d}", name=f"Terminal {i}", total_capacity=30,
+                            latitude=6.4 + rng.random() * 0.25, longitude=3.25 + rng.random() * 0.4)
+        service.register_terminal(terminal)
+        terminals.append(terminal)
+    for i in range(n_terminals * 20):
+        service.subscribe_arrivals(rng.choice(terminals).terminal_id, None, rng.randint(3, 12))
+
+    buses = []
+    for i in range(n_buses):
+        bus = SimBus(f"BUS{i:04d}", f"+234802{i:07d}", terminals, rng)
+        service.register_bus(Bus(bus_id=bus.bus_id, driver_phone=bus.phone, driver_name=f"Driver {i}",
+                                 plate_number=f"LAG-{i:04d}", capacity=50))
+        buses.append(bus)
+
+    horizon = hours * 3600
+    queue = [(rng.uniform(0, GPS_UPDATE_INTERVAL_SECONDS), i) for i in range(n_buses)]
+    heapq.heapify(queue)
+    reported = {}
+    pings = 0
+    errors, near_errors = [], []
+    next_sample = 60.0
+
+    while queue and queue[0][0] <= horizon:
+        t, i = heapq.heappop(queue)
+        while next_sample <= t:
+            for bus in buses:
+                lat, lon, speed, _ = bus.state(next_sample)
+                if not speed or bus.bus_id not in reported:
+                    continue
+                last_lat, last_lon, last_speed = reported[bus.bus_id]
+                for terminal in terminals:
+                    true_eta = service._eta(lat, lon, speed, terminal)[0]
+                    if true_eta >= ETA_HORIZON_MINUTES:
+                        continue
+                    error = abs(true_eta - service._eta(last_lat, last_lon, last_speed, terminal)[0])
+                    errors.append(error)
+                    if true_eta <= DEFAULT_NOTIFICATION_WINDOW:
+                        near_errors.append(error)
+            next_sample += 60
+
+        bus = buses[i]
+        lat, lon, speed, _ = bus.state(t)
+        result = service.update_bus_location(bus.bus_id, BusLocation(
+            bus_id=bus.bus_id, driver_phone=bus.phone, latitude=lat, longitude=lon, speed=speed,
+            timestamp=START + timedelta(seconds=t)
+        ))
+        reported[bus.bus_id] = (lat, lon, speed)
+        pings += 1
+        interval = result["next_ping_seconds"] if adaptive else GPS_UPDATE_INTERVAL_SECONDS
+        heapq.heappush(queue, (t + interval, i))
+
+    mean = lambda values: sum(values) / max(len(values), 1)
+    return pings, mean(errors), mean(near_errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark adaptive ping-interval hints")
+    parser.add_argument("--buses", type=int, default=300)
+    parser.add_argument("--terminals", type=int, default=30)
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--min-reduction", type=float, default=0.1)
+    parser.add_argument("--max-eta-loss", type=float, default=0.05)
+    args = parser.parse_args()
+
+    fixed_pings, fixed_error, fixed_near = simulate(args.buses, args.terminals, args.hours, adaptive=False)
+    adaptive_pings, adaptive_error, adaptive_near = simulate(args.buses, args.terminals, args.hours, adaptive=True)
+    reduction = 1 - adaptive_pings / fixed_pings
+    print(f"{'':9} {'pings':>8}  ETA error (min): all  <= {DEFAULT_NOTIFICATION_WINDOW} min")
+    print(f"fixed     {fixed_pings:8d}  {fixed_error:20.2f}  {fixed_near:9.2f}")
+    print(f"adaptive  {adaptive_pings:8d}  {adaptive_error:20.2f}  {adaptive_near:9.2f}")
+    print(f"reduction {reduction:.1%}")
+    print(f"ETA error change: all {adaptive_error - fixed_error:+.2f} min, "
+          f"<= {DEFAULT_NOTIFICATION_WINDOW} min {adaptive_near / fixed_near - 1:+.1%}")
+
+    failed = reduction < args.min_reduction or adaptive_near > fixed_near * (1 + args.max_eta_loss)
+    if failed:
+        print("FAIL: not enough reduction or ETA accuracy lost")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
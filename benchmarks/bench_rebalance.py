@@ -0,0 +1,82 @@
+"""
+Rebalancing plan latency for a large synthetic fleet, skewed towards a few
+depots and spread evenly across terminals.
+Exits non-zero when the plan takes longer than the budget.
+
+Run from the repository root:
+    python -m benchmarks.bench_rebalance [--buses 5000] [--terminals 300] [--budget-ms 100]
+"""
+import argparse
+import random
+import time
+
+from service import Bus, BusLocation, BusTrackingService, Terminal
+from service.columnar import ColumnarBusTrackingService
+from service.rebalance import plan_rebalance
+
+
+def build(service_cls, n_buses: int, n_terminals: int, scenario: str):
+    rng = random.Random(11)
+    service = service_cls()
+    service.enforce_shifts = False
+    terminals = []
+    for i in range(n_terminals):
+        terminal = Terminal(
+            terminal_id=f"TRM{i:03d}", name=f"Terminal {i}",
+            latitude=6.35 + rng.random() * 0.35, longitude=3.2 + rng.random() * 0.5,
+            total_capacity=rng.randint(5, 40)
+        )
+        service.register_terminal(terminal)
+        terminals.append(terminal)
+
+    # Skewed: a few depots hold the fleet, so there are few sources and many sinks.
+    # Balanced: buses spread at random, so about half the terminals are on each side.
+    depots = terminals[:max(1, n_terminals // 20)] if scenario == "skewed" else terminals
+    for i in range(n_buses):
+        bus_id = f"BUS{i:05d}"
+        phone = f"+234801{i:07d}"
+        service.register_bus(Bus(bus_id=bus_id, driver_phone=phone, driver_name=f"Driver {i}",
+                                 plate_number=f"LAG-{i:05d}", capacity=50, status="in_transit"))
+        if i % 4:
+            terminal = rng.choice(depots)
+            lat, lon = terminal.latitude, terminal.longitude
+        else:
+            lat, lon = 6.35 + rng.random() * 0.35, 3.2 + rng.random() * 0.5
+        service.update_bus_location(bus_id, BusLocation(
+            bus_id=bus_id, driver_phone=phone, latitude=lat, longitude=lon, speed=rng.uniform(10, 50)
+        ))
+    return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the rebalancing planner")
+    parser.add_argument("--buses", type=int, default=5000)
+    parser.add_argument("--terminals", type=int, default=300)
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    failed = False
+    for scenario, label, cls in ((scenario, label, cls) for scenario in ("skewed", "balanced")
+                                 for label, cls in (("objects", BusTrackingService),
+                                                    ("columnar", ColumnarBusTrackingService))):
+        service = build(cls, args.buses, args.terminals, scenario)
+        plan_rebalance(service)
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            plan = plan_rebalance(service)
+            timings.append((time.perf_counter() - start) * 1000)
+        best = min(timings)
+        sources = sum(1 for terminal in plan["terminals"] if terminal["surplus"])
+        sinks = sum(1 for terminal in plan["terminals"] if terminal["deficit"])
+        print(f"{scenario:<9} {label:<9} {best:7.1f} ms  {sources}x{sinks} moves={len(plan['moves'])} "
+              f"unmet={plan['unmet_demand']} solver={plan['solver']}")
+        failed = failed or best > args.budget_ms
+
+    if failed:
+        print(f"FAIL: over {args.budget_ms} ms budget")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Read throughput of the shared fleet snapshot with 1, 2 and 4 reader
+processes while a writer process republishes it as fast as it can.
+
+Before each publish the writer sets every bus's speed to the version it is
+about to publish, so a reader that ever sees mixed speeds, or speeds that
+don't match the buffer's version, has read a torn snapshot. Each reader
+loop adopts the latest version and looks up a random bus, as a read-only
+worker does per request. Exits non-zero on any torn read, when a reader
+ever finds no published version (the writer publishes before readers
+start), or when a single reader manages fewer than --min-reads lookups per
+second.
+
+Run from the repository root:
+    python -m benchmarks.bench_snapshot [--buses 5000] [--seconds 3]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from service import Bus, BusLocation, BusTrackingService, Terminal
+from service.snapshot import SnapshotBusTrackingService, SnapshotWriter
+
+
+def build_fleet(n_buses: int, n_terminals: int) -> BusTrackingService:
+    rng = random.Random(5)
+    service = BusTrackingService()
+    service.enforce_shifts = False
+    service.rate_limit_enabled = False
+    for i in range(n_terminals):
+        service.register_terminal(Terminal(terminal_id=f"TRM{i:02d}", name=f"Terminal {i}", total_capacity=30,
+                                           latitude=6.4 + rng.random() * 0.25, longitude=3.25 + rng.random() * 0.4))
+    for i in range(n_buses):
+        bus_id, phone = f"BUS{i:05d}", f"+234804{i:07d}"
+        service.register_bus(Bus(bus_id=bus_id, driver_phone=phone, driver_name=f"Driver {i}",
+                                 plate_number=f"LAG-{i:05d}", capacity=50))
+        service.update_bus_location(bus_id, BusLocation(
+            bus_id=bus_id, driver_phone=phone, latitude=6.4 + rng.random() * 0.25,
+            longitude=3.25 + rng.random() * 0.4, speed=20
+        ))
+    return service
+
+
+def write(path: str, n_buses: int, n_terminals: int, ready, stop, published):
+    service = build_fleet(n_buses, n_terminals)
+    locations = [bus.last_location for bus in service.buses.values()]
+    writer = SnapshotWriter(path, max_buses=n_buses, max_terminals=n_terminals)
+    version = 0
+    while True:
+        for location in locations:
+            location.speed = float(version + 1)
+        version = writer.publish(service)
+        if version == 1:
+            ready.set()
+        if stop.is_set():
+            break
+    published.value = version
+    writer.close()
+
+
+def read(path: str, seconds: float, results):
+    service = SnapshotBusTrackingService(path)
+    rng = random.Random(os.getpid())
+    lookups = torn = empty = 0
+    versions = set()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        snapshot = service.refresh()
+        if not snapshot.version or not snapshot.bus_ids:
+            empty += 1
+            continue
+        speeds = snapshot.buses["speed"]
+        if speeds.size and (speeds.min() != speeds.max() or speeds[0] != snapshot.version):
+            torn += 1
+        versions.add(snapshot.version)
+        service.lookup_buses([snapshot.bus_ids[rng.randrange(len(snapshot.bus_ids))]])
+        lookups += 1
+    results.put((lookups, torn, len(versions), empty))
+
+
+def run(path: str, n_readers: int, seconds: float, n_buses: int, n_terminals: int):
+    ready, stop = multiprocessing.Event(), multiprocessing.Event()
+    published = multiprocessing.Value("q", 0)
+    results = multiprocessing.Queue()
+    writer = multiprocessing.Process(target=write, args=(path, n_buses, n_terminals, ready, stop, published))
+    writer.start()
+    ready.wait()
+    readers = [multiprocessing.Process(target=read, args=(path, seconds, results)) for _ in range(n_readers)]
+    for reader in readers:
+        reader.start()
+    outcomes = [results.get(timeout=seconds + 60) for _ in readers]
+    for reader in readers:
+        reader.join()
+    stop.set()
+    writer.join()
+    lookups = sum(outcome[0] for outcome in outcomes)
+    torn = sum(outcome[1] for outcome in outcomes)
+    versions = min(outcome[2] for outcome in outcomes)
+    empty = sum(outcome[3] for outcome in outcomes)
+    return lookups / seconds, torn, versions, empty, published.value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared fleet snapshot")
+    parser.add_argument("--buses", type=int, default=5000)
+    parser.add_argument("--terminals", type=int, default=30)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--readers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--min-reads", type=float, default=200.0)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.buses} buses")
+    print(f"{'readers':>7} {'lookups/s':>10} {'torn':>5} {'empty':>6} {'versions seen':>14} {'published':>10}")
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "fleet.snapshot")
+        for n_readers in args.readers:
+            rate, torn, versions, empty, published = run(path, n_readers, args.seconds, args.buses,
+                                                         args.terminals)
+            print(f"{n_readers:7d} {rate:10,.0f} {torn:5d} {empty:6d} {versions:14d} {published:10d}")
+            failed |= torn > 0 or empty > 0 or versions == 0 or (n_readers == 1 and rate < args.min_reads)
+    if failed:
+        print("FAIL: torn reads, readers without a published version, or reads too slow")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
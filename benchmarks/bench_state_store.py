@@ -0,0 +1,79 @@
+"""
+Memory and scan time of the object and columnar fleet state stores.
+
+Run from the repository root:
+    python -m benchmarks.bench_state_store [--buses 100000]
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from service import Bus, BusLocation, BusTrackingService, Terminal
+from service.columnar import ColumnarBusTrackingService
+
+TERMINALS = 50
+
+
+def build(service_cls, n: int) -> tuple:
+    rng = random.Random(7)
+    gc.collect()
+    tracemalloc.start()
+    service = service_cls()
+    service.enforce_shifts = False
+    service.overload.allow_history = lambda: False  # measure live state, not ping history
+    for i in range(TERMINALS):
+        service.register_terminal(Terminal(
+            terminal_id=f"TRM{i:03d}", name=f"Terminal {i}",
+            latitude=6.4 + i * 0.005, longitude=3.3 + i * 0.005, total_capacity=200
+        ))
+    base = datetime.now()
+    for i in range(n):
+        bus_id = f"BUS{i:06d}"
+        service.register_bus(Bus(
+            bus_id=bus_id, db_id=i + 1, driver_phone=f"+234801{i:07d}", driver_name=f"Driver {i}",
+            plate_number=f"LAG-{i:06d}", capacity=50,
+            status="in_transit" if i % 3 else "available"
+        ))
+        service.update_bus_location(bus_id, BusLocation(
+            bus_id=bus_id, driver_phone=f"+234801{i:07d}",
+            latitude=6.4 + rng.random() * 0.3, longitude=3.3 + rng.random() * 0.3,
+            speed=rng.uniform(0, 60), timestamp=base + timedelta(seconds=i % 600)
+        ))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return service, current
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fleet state stores")
+    parser.add_argument("--buses", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{args.buses} buses, {TERMINALS} terminals")
+    print(f"{'store':<10} {'memory':>10} {'B/bus':>7} {'counts':>9} {'incoming':>9} {'filter':>9} {'lookup':>9}")
+    for label, cls in (("objects", BusTrackingService), ("columnar", ColumnarBusTrackingService)):
+        service, memory = build(cls, args.buses)
+        counts = timed(service.fleet_counts)
+        incoming = timed(lambda: service._get_incoming_buses("TRM010"))
+        filtered = timed(lambda: service.get_all_buses("available"), repeat=2)
+        lookup = timed(lambda: service.get_bus_by_phone(f"+234801{args.buses - 1:07d}"))
+        print(f"{label:<10} {memory / 2**20:8.1f}MB {memory / args.buses:7.0f} "
+              f"{counts:7.2f}ms {incoming:7.2f}ms {filtered:7.2f}ms {lookup:7.3f}ms")
+        del service
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Cold-start budget check: time to import main and to bring the app up
+(startup handlers included) in a fresh interpreter with no database.
+Exits non-zero when either is over budget, so it can gate CI.
+
+Run from the repository root:
+    python -m benchmarks.startup_budget [--import-budget 1.0] [--startup-budget 1.0]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+_PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+from main import create_app
+from app.config import Settings
+imported = time.perf_counter() - start
+
+from fastapi.testclient import TestClient
+app = create_app(Settings())
+with TestClient(app) as client:
+    ready = time.perf_counter() - start
+    status = client.get("/api/buses").status_code
+print(json.dumps({
+    "import_seconds": imported,
+    "startup_seconds": ready,
+    "status": status,
+    "sqlalchemy_loaded": "sqlalchemy" in sys.modules,
+}))
+"""
+
+
+def measure(runs: int = 3) -> dict:
+    env = dict(os.environ)
+    env.pop("DATABASE_URL", None)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", _PROBE], capture_output=True, text=True,
+                             env=env, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    best = min(samples, key=lambda s: s["startup_seconds"])
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check BRTLive cold-start time")
+    parser.add_argument("--import-budget", type=float, default=1.0, help="Seconds allowed to import main")
+    parser.add_argument("--startup-budget", type=float, default=1.0, help="Seconds allowed until the app serves")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    print(f"import main:        {result['import_seconds']:.3f}s (budget {args.import_budget}s)")
+    print(f"ready to serve:     {result['startup_seconds']:.3f}s (budget {args.startup_budget}s)")
+    print(f"sqlalchemy loaded:  {result['sqlalchemy_loaded']}")
+
+    failures = []
+    if result["status"] != 200:
+        failures.append(f"GET /api/buses returned {result['status']}")
+    if result["import_seconds"] > args.import_budget:
+        failures.append("import budget exceeded")
+    if result["startup_seconds"] > args.startup_budget:
+        failures.append("startup budget exceeded")
+    if result["sqlalchemy_loaded"]:
+        failures.append("sqlalchemy imported without a database configured")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,33 @@
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+import numpy as np
 from pydantic import BaseModel, Field
 
+from app.utils.constants import (
+    BUS_STALE_AFTER_SECONDS, BUS_OFFLINE_AFTER_SECONDS, STALE_SWEEP_INTERVAL_SECONDS,
+    ENFORCE_ACTIVE_SHIFTS, PING_RATE_PER_SECOND, PING_BURST, RATE_LIMIT_MAX_KEYS,
+    OVERLOAD_HISTORY_LATENCY_MS, OVERLOAD_ANALYTICS_LATENCY_MS, OVERLOAD_MAX_IN_FLIGHT,
+    INGEST_PIPELINE_ENABLED, INGEST_QUEUE_SIZE, INGEST_BATCH_SIZE, ETA_HORIZON_MINUTES,
+    WAIT_WITH_BUS_MINUTES, WAIT_NO_BUS_MINUTES, CHANGE_LOG_SIZE, MAP_INDIVIDUAL_BUS_ZOOM,
+    DEFAULT_NOTIFICATION_WINDOW, KINEMATIC_SMOOTHING_ENABLED, TERMINAL_ARRIVAL_RADIUS_DEGREES,
+    TERMINAL_DEPARTURE_RADIUS_DEGREES
+)
+from app.utils.exceptions import IngestQueueFullException
+from .staleness import StaleBusDetector, ONLINE
+from .shifts import ActiveShift, ShiftRegistry
+from .metrics import metrics
+from .ratelimit import TokenBucketLimiter, OverloadGuard
+from .ingest import IngestPipeline
+from .trace import TraceRecorder
+from .occupancy import TerminalOccupancy
+from .profiling import timed
+from .changelog import ChangeLog
+from .clustering import ClusterIndex
+from .notifications import ArrivalNotifier
+from .pinghints import PingIntervalAdvisor
+from .headway import HeadwayMonitor
+from .kinematics import KinematicFilter
+
 
 class BusLocation(BaseModel):
     bus_id: str
@@ -10,21 +36,31 @@ class BusLocation(BaseModel):
     longitude: float
     timestamp: datetime = Field(default_factory=datetime.now)
     speed: float = 0.0
+    accuracy_meters: Optional[float] = None
+    heading: Optional[float] = None
+    battery_level: Optional[int] = None
+    is_charging: bool = False
+    network_type: Optional[str] = None
+    signal_strength: Optional[str] = None
 
 
 class Bus(BaseModel):
     bus_id: str
+    db_id: Optional[int] = None
     driver_phone: str
     driver_name: str
     plate_number: str
     capacity: int
+    route_id: Optional[str] = None
     current_terminal: Optional[str] = None
     status: str = "available"
     last_location: Optional[BusLocation] = None
+    connection_status: str = ONLINE
 
 
 class Terminal(BaseModel):
     terminal_id: str
+    db_id: Optional[int] = None
     name: str
     latitude: float
     longitude: float
@@ -39,86 +75,516 @@ class WaitTimeEstimate(BaseModel):
     next_bus_arrival: Optional[datetime] = None
 
 
+def db_key(entity_id: str, db_id: Optional[int]) -> Optional[int]:
+    """
+    Database id for a bus or terminal: its db_id, or the id itself when it is numeric
+    """
+    if db_id is not None:
+        return db_id
+    return int(entity_id) if entity_id.isdigit() else None
+
+
 class BusTrackingService:
     def __init__(self):
         self.buses: Dict[str, Bus] = {}
         self.terminals: Dict[str, Terminal] = {}
+        self.occupancy: Dict[str, TerminalOccupancy] = {}
         self.location_history: Dict[str, List[BusLocation]] = {}
+        self.stale_detector = StaleBusDetector(
+            stale_after=BUS_STALE_AFTER_SECONDS,
+            offline_after=BUS_OFFLINE_AFTER_SECONDS,
+            on_change=self._on_connection_change
+        )
+        self.shifts = ShiftRegistry()
+        self.enforce_shifts = ENFORCE_ACTIVE_SHIFTS
+        self.metrics = metrics
+        self.bus_limiter = TokenBucketLimiter(PING_RATE_PER_SECOND, PING_BURST, RATE_LIMIT_MAX_KEYS)
+        self.phone_limiter = TokenBucketLimiter(PING_RATE_PER_SECOND, PING_BURST, RATE_LIMIT_MAX_KEYS)
+        self.overload = OverloadGuard(
+            OVERLOAD_HISTORY_LATENCY_MS, OVERLOAD_ANALYTICS_LATENCY_MS, OVERLOAD_MAX_IN_FLIGHT
+        )
+        self.pipeline_enabled = INGEST_PIPELINE_ENABLED
+        self.pipeline = IngestPipeline(self, INGEST_QUEUE_SIZE, INGEST_BATCH_SIZE)
+        self._location_listeners: List[Callable[[Bus, BusLocation], None]] = []
+        self.rate_limit_enabled = True
+        self.recorder: Optional[TraceRecorder] = None
+        self.changes = ChangeLog(CHANGE_LOG_SIZE)
+        self.map_index = ClusterIndex()
+        self.notifier = ArrivalNotifier(self.terminals)
+        self.ping_advisor = PingIntervalAdvisor(self.terminals)
+        self.headways = HeadwayMonitor()
+        self.smoothing_enabled = KINEMATIC_SMOOTHING_ENABLED
+        self.kinematics = KinematicFilter()
+        self.arrival_radius = TERMINAL_ARRIVAL_RADIUS_DEGREES
+        self.departure_radius = TERMINAL_DEPARTURE_RADIUS_DEGREES
         
     def register_bus(self, bus: Bus) -> Dict:
-        self.buses[bus.bus_id] = bus
+        self._store_bus(bus)
         self.location_history[bus.bus_id] = []
+        self.stale_detector.forget(bus.bus_id)
+        self.changes.bus(bus.bus_id)
+        self._index_position(bus.bus_id, bus.last_location)
+        self.notifier.forget(bus.bus_id)
+        self.headways.forget(bus.bus_id)
+        self.kinematics.forget(bus.bus_id)
+        if self.recorder:
+            self.recorder.bus(bus)
         return {"message": f"Bus {bus.bus_id} registered", "bus": bus}
+
+    def _store_bus(self, bus: Bus):
+        self.buses[bus.bus_id] = bus
     
     def register_terminal(self, terminal: Terminal) -> Dict:
-        self.terminals[terminal.terminal_id] = terminal
+        # Occupancy is the source of truth; buses_present is filled in on read.
+        self.occupancy[terminal.terminal_id] = TerminalOccupancy(terminal.buses_present)
+        self.terminals[terminal.terminal_id] = terminal.model_copy(update={"buses_present": []})
+        self.changes.terminal(terminal.terminal_id)
+        self.notifier.refresh_terminals()
+        self.ping_advisor.refresh_terminals()
+        if self.recorder:
+            self.recorder.terminal(terminal)
         return {"message": f"Terminal {terminal.name} registered", "terminal": terminal}
     
+    @timed("update_location")
     def update_bus_location(self, bus_id: str, location: BusLocation) -> Dict:
-        if bus_id not in self.buses:
-            return {"error": "Bus not found"}
+        error = self._validate_ping(bus_id, location)
+        if error:
+            return error
         
-        if bus_id not in self.location_history:
-            self.location_history[bus_id] = []
-        self.location_history[bus_id].append(location)
+        if self.recorder:
+            self.recorder.location(bus_id, location)
+        self._archive_locations(bus_id, [location])
+        location = self._smooth(bus_id, [location])
+        self._apply_location(bus_id, location)
         
-        if len(self.location_history[bus_id]) > 100:
-            self.location_history[bus_id] = self.location_history[bus_id][-100:]
+        return {"message": "Location updated", "bus_id": bus_id,
+                "next_ping_seconds": self.next_ping_seconds(bus_id, location)}
+    
+    @timed("submit_location")
+    def submit_location(self, bus_id: str, location: BusLocation) -> Dict:
+        error = self._validate_ping(bus_id, location)
+        if error:
+            return error
+        if not self.pipeline.submit(bus_id, location):
+            raise IngestQueueFullException()
+        return {"message": "Location accepted", "bus_id": bus_id, "queued": True,
+                "next_ping_seconds": self.next_ping_seconds(bus_id, location)}
+    
+    def next_ping_seconds(self, bus_id: str, location: BusLocation) -> int:
+        """
+        Recommended wait before the bus's next ping, returned to the phone.
+        The bus's stale window is widened to match.
+        """
+        interval = self.ping_advisor.advise(self._bus_status(bus_id), location.latitude, location.longitude,
+                                            location.speed, self.notifier.minutes_to_next_crossing(bus_id))
+        self.stale_detector.expect(bus_id, interval)
+        return interval
+    
+    def apply_location_batch(self, batch: List[Tuple[str, BusLocation]]) -> int:
+        """
+        Archive every ping in the batch but apply only the newest per bus.
+        Returns how many buses had their live state updated.
+        """
+        pending: Dict[str, List[BusLocation]] = {}
+        for bus_id, location in batch:
+            if bus_id in self.buses:
+                pending.setdefault(bus_id, []).append(location)
         
-        self.buses[bus_id].last_location = location
-        self._check_terminal_presence(bus_id, location)
+        for bus_id, locations in pending.items():
+            self._archive_locations(bus_id, locations)
+            ordered = sorted(locations, key=lambda loc: loc.timestamp)
+            latest = ordered[-1]
+            if self.recorder:
+                for location in locations:
+                    if location is not latest:
+                        self.recorder.location(bus_id, location, applied=False)
+                self.recorder.location(bus_id, latest)
+            self._apply_location(bus_id, self._smooth(bus_id, ordered))
         
-        return {"message": "Location updated", "bus_id": bus_id}
+        return len(pending)
     
-    def _check_terminal_presence(self, bus_id: str, location: BusLocation):
-        RADIUS = 0.001  
+    def _validate_ping(self, bus_id: str, location: BusLocation) -> Optional[Dict]:
+        if bus_id not in self.buses:
+            return {"error": "Bus not found"}
+        if self.enforce_shifts:
+            self.shifts.authorize(bus_id, location.driver_phone)
+        return None
+    
+    def _archive_locations(self, bus_id: str, locations: List[BusLocation]):
+        if not self.overload.allow_history():
+            return
+        history = self.location_history.setdefault(bus_id, [])
+        history.extend(locations)
         
+        if len(history) > 100:
+            self.location_history[bus_id] = history[-100:]
+    
+    def _smooth(self, bus_id: str, locations: List[BusLocation]) -> BusLocation:
+        """
+        Feed the bus's new pings, oldest first, to its kinematic filter and
+        return the last one with the filtered position, speed and heading.
+        The raw pings stay as they are in the history and trace.
+        """
+        latest = locations[-1]
+        if not self.smoothing_enabled:
+            return latest
+        for location in locations:
+            latitude, longitude, speed, heading = self.kinematics.observe(
+                bus_id, location.latitude, location.longitude, location.timestamp.timestamp(),
+                location.speed, location.heading, location.accuracy_meters
+            )
+        return latest.model_copy(update={"latitude": latitude, "longitude": longitude,
+                                         "speed": speed, "heading": heading})
+    
+    def _apply_location(self, bus_id: str, location: BusLocation):
+        bus = self.buses[bus_id]
+        bus.last_location = location
+        self.map_index.update(bus_id, location.latitude, location.longitude)
+        self.stale_detector.touch(bus_id)
+        self._check_terminal_presence(bus_id, location)
+        self._notify_arrivals(bus_id, location)
+        self._track_headway(bus_id, location)
+        self.changes.bus(bus_id)
+        for listener in self._location_listeners:
+            listener(bus, location)
+    
+    def _index_position(self, bus_id: str, location: Optional[BusLocation]):
+        if location is None:
+            self.map_index.remove(bus_id)
+        else:
+            self.map_index.update(bus_id, location.latitude, location.longitude)
+    
+    def _notify_arrivals(self, bus_id: str, location: BusLocation):
+        if not self.notifier.subscriptions:
+            return
+        if self._bus_status(bus_id) != "in_transit":
+            self.notifier.forget(bus_id)
+            return
+        self.notifier.observe(bus_id, self._bus_route(bus_id), location.latitude,
+                              location.longitude, location.speed)
+    
+    def _track_headway(self, bus_id: str, location: BusLocation):
+        if self._bus_status(bus_id) != "in_transit":
+            self.headways.forget(bus_id)
+            return
+        self.headways.observe(bus_id, self._bus_route(bus_id), location.latitude,
+                              location.longitude, location.speed, location.heading)
+    
+    def register_route(self, route_id: str, terminal_ids: List[str]) -> Dict:
+        """
+        Register a route as its terminals in stop order, for headway tracking
+        """
+        unknown = [tid for tid in terminal_ids if tid not in self.terminals]
+        if unknown:
+            return {"error": f"Terminal not found: {', '.join(unknown)}"}
+        stops = [(self.terminals[tid].latitude, self.terminals[tid].longitude) for tid in terminal_ids]
+        line = self.headways.add_route(route_id, stops)
+        return {"message": f"Route {route_id} registered", "route_id": route_id,
+                "terminal_ids": terminal_ids, "length_km": round(line.length_km, 2)}
+    
+    def subscribe_arrivals(self, terminal_id: str, route_id: Optional[str] = None,
+                           threshold_minutes: int = DEFAULT_NOTIFICATION_WINDOW) -> Dict:
+        if terminal_id not in self.terminals:
+            return {"error": "Terminal not found"}
+        subscription = self.notifier.subscribe(terminal_id, route_id, threshold_minutes)
+        return {"message": "Subscribed", "subscription": subscription}
+    
+    def add_location_listener(self, listener: Callable[[Bus, BusLocation], None]):
+        self._location_listeners.append(listener)
+    
+    def remove_location_listener(self, listener: Callable[[Bus, BusLocation], None]):
+        if listener in self._location_listeners:
+            self._location_listeners.remove(listener)
+    
+    def authorize_ping(self, bus_id: str, location: BusLocation) -> Optional[Dict]:
+        """
+        Check a ping before it is rate-limited: an error dict for an unknown
+        bus, and a BRTLiveException when shifts are enforced and the phone
+        isn't on the bus's shift
+        """
+        return self._validate_ping(bus_id, location)
+
+    def admit_ping(self, bus_id: str, phone: str, driver_id: Optional[int] = None) -> Optional[float]:
+        """
+        Apply per-bus and per-driver rate limits to an authorized ping. The
+        driver is their token's driver_id when there is one, otherwise their
+        phone. Returns None if the ping is allowed, otherwise seconds to wait
+        before retrying.
+        """
+        if not self.rate_limit_enabled:
+            return None
+        if not self.bus_limiter.allow(bus_id):
+            self.metrics.incr("ratelimit.rejected.bus")
+            return self.bus_limiter.retry_after(bus_id)
+        driver = phone if driver_id is None else f"driver:{driver_id}"
+        if not self.phone_limiter.allow(driver):
+            self.metrics.incr("ratelimit.rejected.phone")
+            return self.phone_limiter.retry_after(driver)
+        return None
+
+    def set_bus_status(self, bus_id: str, status: str) -> Dict:
+        if bus_id not in self.buses:
+            return {"error": "Bus not found"}
+        self.buses[bus_id].status = status
+        self.changes.bus(bus_id)
+        if self.recorder:
+            self.recorder.status(bus_id, status)
+        return {"message": "Status updated", "bus_id": bus_id, "new_status": status}
+
+    def start_recording(self, path: str) -> TraceRecorder:
+        self.stop_recording()
+        recorder = TraceRecorder(path)
+        recorder.fleet(self)
+        self.recorder = recorder
+        return recorder
+
+    def stop_recording(self) -> Optional[TraceRecorder]:
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close(self)
+        return recorder
+
+    def _on_connection_change(self, bus_id: str, state: str):
+        if bus_id in self.buses:
+            self.buses[bus_id].connection_status = state
+            self.changes.bus(bus_id)
+        if state != ONLINE:
+            self.headways.forget(bus_id)
+
+    def start_stale_sweeper(self, interval: float = STALE_SWEEP_INTERVAL_SECONDS):
+        return self.stale_detector.start(interval)
+
+    async def stop_stale_sweeper(self):
+        await self.stale_detector.stop()
+
+    def start_pipeline(self):
+        if self.pipeline_enabled:
+            return self.pipeline.start()
+
+    async def stop_pipeline(self):
+        await self.pipeline.stop()
+
+    def _check_terminal_presence(self, bus_id: str, location: BusLocation):
+        # Between the arrival and departure radii a bus keeps its current
+        # state, so jitter at the edge of a terminal doesn't flap its status.
         for tid, terminal in self.terminals.items():
             dist = ((location.latitude - terminal.latitude) ** 2 + 
                    (location.longitude - terminal.longitude) ** 2) ** 0.5
             
-            if dist <= RADIUS:
-                if bus_id not in terminal.buses_present:
-                    terminal.buses_present.append(bus_id)
-                    self.buses[bus_id].current_terminal = tid
-                    self.buses[bus_id].status = "available"
+            if dist <= self.arrival_radius:
+                if self.occupancy[tid].arrive(bus_id, location.timestamp):
+                    self._place_bus(bus_id, tid, "available")
+                    self.changes.terminal(tid)
+            elif dist > self.departure_radius and self.occupancy[tid].leave(bus_id):
+                self.changes.terminal(tid)
+                if self._current_terminal(bus_id) == tid:
+                    self._place_bus(bus_id, None, "in_transit")
+    
+    def _bus_status(self, bus_id: str) -> str:
+        return self.buses[bus_id].status
+    
+    def _current_terminal(self, bus_id: str) -> Optional[str]:
+        return self.buses[bus_id].current_terminal
+    
+    def _bus_route(self, bus_id: str) -> Optional[str]:
+        return self.buses[bus_id].route_id
+    
+    def _place_bus(self, bus_id: str, terminal_id: Optional[str], status: str):
+        bus = self.buses[bus_id]
+        bus.current_terminal = terminal_id
+        bus.status = status
+    
+    @timed("map_clusters")
+    def map_clusters(self, bbox: Tuple[float, float, float, float], zoom: int) -> Dict:
+        """
+        Clustered bus positions inside bbox (min_lon, min_lat, max_lon, max_lat).
+        Individual buses are listed only from MAP_INDIVIDUAL_BUS_ZOOM and when
+        few enough are in view.
+        """
+        if zoom >= MAP_INDIVIDUAL_BUS_ZOOM:
+            found = self.map_index.buses(bbox)
+            if found is not None:
+                return {
+                    "zoom": zoom,
+                    "clusters": [],
+                    "buses": [
+                        {"bus_id": bid, "latitude": lat, "longitude": lon, "status": self._bus_status(bid)}
+                        for bid, lat, lon in found
+                    ],
+                }
+        level, clusters = self.map_index.clusters(bbox, zoom)
+        return {"zoom": zoom, "level": level, "clusters": clusters, "buses": []}
+    
+    def changes_since(self, seq: int, epoch: Optional[str] = None) -> Dict:
+        """
+        Buses and terminals changed after seq. When the change log can't
+        answer (seq evicted, or epoch from before a restart) the full state
+        is returned with full_reload set.
+        """
+        changed = self.changes.since(seq, epoch)
+        if changed is None:
+            bus_ids, terminal_ids, full_reload = list(self.buses), list(self.terminals), True
+        else:
+            (bus_ids, terminal_ids), full_reload = changed, False
+        return {
+            "seq": self.changes.seq,
+            "epoch": self.changes.epoch,
+            "full_reload": full_reload,
+            "buses": [self.buses[bid] for bid in bus_ids if bid in self.buses],
+            "terminals": [self.get_terminal(tid) for tid in terminal_ids if tid in self.terminals],
+        }
+    
+    def lookup_buses(self, bus_ids: List[str]) -> Dict:
+        buses, missing = [], []
+        for bus_id in dict.fromkeys(bus_ids):
+            if bus_id in self.buses:
+                buses.append(self.buses[bus_id])
             else:
-                if bus_id in terminal.buses_present:
-                    terminal.buses_present.remove(bus_id)
-                    if self.buses[bus_id].current_terminal == tid:
-                        self.buses[bus_id].current_terminal = None
-                        self.buses[bus_id].status = "in_transit"
+                missing.append(bus_id)
+        return {"buses": buses, "missing": missing}
     
-    def get_terminal_dashboard(self, terminal_id: str) -> Dict:
+    def lookup_terminals(self, terminal_ids: List[str]) -> Dict:
+        terminals, missing = [], []
+        for terminal_id in dict.fromkeys(terminal_ids):
+            terminal = self.get_terminal(terminal_id)
+            if terminal is not None:
+                terminals.append(terminal)
+            else:
+                missing.append(terminal_id)
+        return {"terminals": terminals, "missing": missing}
+    
+    def get_terminal(self, terminal_id: str) -> Optional[Terminal]:
+        terminal = self.terminals.get(terminal_id)
+        if terminal is None:
+            return None
+        return terminal.model_copy(update={"buses_present": self.buses_at(terminal_id)})
+    
+    def get_all_terminals(self) -> List[Terminal]:
+        return [self.get_terminal(tid) for tid in self.terminals]
+    
+    def buses_at(self, terminal_id: str) -> List[str]:
+        """
+        Buses at the terminal in dispatch order (first arrived first)
+        """
+        return self.occupancy[terminal_id].queue()
+    
+    def next_departure(self, terminal_id: str) -> Dict:
         if terminal_id not in self.terminals:
             return {"error": "Terminal not found"}
         
-        terminal = self.terminals[terminal_id]
+        occupancy = self.occupancy[terminal_id]
+        bus_id = self._departure_candidate(terminal_id)
+        return {
+            "terminal_id": terminal_id,
+            "bus": self.buses[bus_id] if bus_id else None,
+            "arrived_at": occupancy.arrived_at(bus_id) if bus_id else None,
+            "queue_length": len(occupancy)
+        }
+    
+    @timed("dispatch")
+    def dispatch(self, terminal_id: str, bus_id: Optional[str] = None) -> Dict:
+        """
+        Send a bus out of the terminal: the first one in the queue that is
+        available, or the given bus if it is at the terminal
+        """
+        if terminal_id not in self.terminals:
+            return {"error": "Terminal not found"}
+        
+        bus_id = bus_id or self._departure_candidate(terminal_id)
+        if bus_id is None:
+            return {"error": "No bus available for departure"}
+        if not self.occupancy[terminal_id].dispatch(bus_id):
+            return {"error": f"Bus {bus_id} is not at this terminal"}
+        
+        if self._current_terminal(bus_id) == terminal_id:
+            self._place_bus(bus_id, None, "in_transit")
+        self.changes.terminal(terminal_id)
+        self.changes.bus(bus_id)
+        if self.recorder:
+            self.recorder.dispatch(terminal_id, bus_id)
+        return {"message": "Bus dispatched", "terminal_id": terminal_id, "bus_id": bus_id}
+    
+    def _departure_candidate(self, terminal_id: str) -> Optional[str]:
+        for bus_id in self.occupancy[terminal_id]:
+            if bus_id in self.buses and not self.stale_detector.is_stale(bus_id) \
+                    and self._bus_status(bus_id) == "available":
+                return bus_id
+        return None
+    
+    @timed("terminal_dashboard")
+    def get_terminal_dashboard(self, terminal_id: str) -> Dict:
+        if terminal_id not in self.terminals:
+            return {"error": "Terminal not found"}
+        return self._terminal_dashboard(terminal_id, self._calc_wait_time(terminal_id))
+    
+    def _terminal_dashboard(self, terminal_id: str, wait: WaitTimeEstimate) -> Dict:
+        terminal = self.get_terminal(terminal_id)
         buses = [self.buses[bid] for bid in terminal.buses_present if bid in self.buses]
-        wait = self._calc_wait_time(terminal_id)
         
         return {
             "terminal": terminal,
             "buses_available": len(buses),
             "buses": buses,
+            "next_departure": self._departure_candidate(terminal_id),
             "wait_estimate": wait,
-            "capacity_utilization": len(buses) / terminal.total_capacity * 100
+            "capacity_utilization": len(self.occupancy[terminal_id]) / terminal.total_capacity * 100
         }
     
     def get_all_terminals_dashboard(self) -> List[Dict]:
-        return [self.get_terminal_dashboard(tid) for tid in self.terminals.keys()]
+        waits = self.wait_times(list(self.terminals))["wait_times"]
+        return [self._terminal_dashboard(wait.terminal_id, wait) for wait in waits]
     
+    @timed("wait_time")
     def _calc_wait_time(self, terminal_id: str) -> WaitTimeEstimate:
-        terminal = self.terminals[terminal_id]
-        available = len(terminal.buses_present)
+        available = self._available_count(terminal_id)
+        next_eta = None
+        if not available:
+            incoming = self._get_incoming_buses(terminal_id)
+            next_eta = incoming[0]["eta"] if incoming else None
+        return self._wait_estimate(terminal_id, available, next_eta)
+    
+    @timed("wait_times")
+    def wait_times(self, terminal_ids: List[str]) -> Dict:
+        """
+        Wait estimates for several terminals, matching _calc_wait_time for
+        each. Fleet positions are read once and the ETAs from every bus in
+        transit to every terminal without a bus are computed in one pass.
+        """
+        found, missing = [], []
+        for terminal_id in dict.fromkeys(terminal_ids):
+            (found if terminal_id in self.terminals else missing).append(terminal_id)
+        
+        available = {tid: self._available_count(tid) for tid in found}
+        empty = [tid for tid in found if not available[tid]]
+        next_eta: Dict[str, int] = {}
+        if empty:
+            _, lats, lons, speeds = self.transit_positions()
+            if lats:
+                # Same arithmetic as _eta, one row per terminal
+                speed = np.array(speeds)
+                speed = np.where(speed > 0, speed, 30)
+                terminal_lat = np.array([self.terminals[tid].latitude for tid in empty])[:, None]
+                terminal_lon = np.array([self.terminals[tid].longitude for tid in empty])[:, None]
+                dist = ((np.array(lats) - terminal_lat) ** 2 + (np.array(lons) - terminal_lon) ** 2) ** 0.5
+                soonest = ((dist * 111 / speed) * 60).astype(np.int64).min(axis=1)
+                next_eta = {tid: int(eta) for tid, eta in zip(empty, soonest) if eta < ETA_HORIZON_MINUTES}
         
+        return {
+            "wait_times": [self._wait_estimate(tid, available[tid], next_eta.get(tid)) for tid in found],
+            "missing": missing,
+        }
+    
+    def _available_count(self, terminal_id: str) -> int:
+        return len([bid for bid in self.occupancy[terminal_id] if not self.stale_detector.is_stale(bid)])
+    
+    @staticmethod
+    def _wait_estimate(terminal_id: str, available: int, next_eta: Optional[int]) -> WaitTimeEstimate:
         if available > 0:
-            wait = 2
+            wait = WAIT_WITH_BUS_MINUTES
         else:
-            incoming = self._get_incoming_buses(terminal_id)
-            wait = min([b['eta'] for b in incoming]) if incoming else 15
+            wait = next_eta if next_eta is not None else WAIT_NO_BUS_MINUTES
         
-        next_time = datetime.now() + timedelta(minutes=wait) if wait > 2 else None
+        next_time = datetime.now() + timedelta(minutes=wait) if wait > WAIT_WITH_BUS_MINUTES else None
         
         return WaitTimeEstimate(
             terminal_id=terminal_id,
@@ -127,31 +593,98 @@ class BusTrackingService:
             next_bus_arrival=next_time
         )
     
+    @timed("incoming_buses")
     def _get_incoming_buses(self, terminal_id: str) -> List[Dict]:
         incoming = []
         terminal = self.terminals[terminal_id]
         
         for bid, bus in self.buses.items():
-            if bus.status == "in_transit" and bus.last_location:
-                dist = ((bus.last_location.latitude - terminal.latitude) ** 2 + 
-                       (bus.last_location.longitude - terminal.longitude) ** 2) ** 0.5
-                dist_km = dist * 111
-                speed = bus.last_location.speed if bus.last_location.speed > 0 else 30
-                eta = int((dist_km / speed) * 60)
+            if bus.status == "in_transit" and bus.last_location and bus.connection_status == ONLINE:
+                eta, dist_km = self.estimate_eta(bus, terminal)
                 
-                if eta < 30:
+                if eta < ETA_HORIZON_MINUTES:
                     incoming.append({"bus_id": bid, "eta": eta, "distance_km": round(dist_km, 2)})
         
         return sorted(incoming, key=lambda x: x['eta'])
     
+    def transit_positions(self) -> Tuple[List[str], List[float], List[float], List[float]]:
+        """
+        Ids, latitudes, longitudes and speeds of online in-transit buses with a known position
+        """
+        ids, lats, lons, speeds = [], [], [], []
+        for bid, bus in self.buses.items():
+            if bus.status == "in_transit" and bus.last_location and bus.connection_status == ONLINE:
+                ids.append(bid)
+                lats.append(bus.last_location.latitude)
+                lons.append(bus.last_location.longitude)
+                speeds.append(bus.last_location.speed)
+        return ids, lats, lons, speeds
+    
+    def estimate_eta(self, bus: Bus, terminal: Terminal) -> Tuple[int, float]:
+        """
+        Minutes and kilometres from the bus's last location to the terminal
+        """
+        location = bus.last_location
+        return self._eta(location.latitude, location.longitude, location.speed, terminal)
+    
+    @staticmethod
+    def _eta(latitude: float, longitude: float, speed: float, terminal: Terminal) -> Tuple[int, float]:
+        dist = ((latitude - terminal.latitude) ** 2 + 
+               (longitude - terminal.longitude) ** 2) ** 0.5
+        dist_km = dist * 111
+        speed = speed if speed > 0 else 30
+        return int((dist_km / speed) * 60), dist_km
+    
+    def resolve_bus_key(self, db_id: int) -> str:
+        for bus in self.buses.values():
+            if bus.db_id == db_id:
+                return bus.bus_id
+        return str(db_id)
+
     def get_bus_by_phone(self, phone: str) -> Optional[Bus]:
         for bus in self.buses.values():
             if bus.driver_phone == phone:
                 return bus
         return None
     
-    def get_all_buses(self) -> List[Bus]:
+    @timed("list_buses")
+    def get_all_buses(self, status: Optional[str] = None) -> List[Bus]:
+        if status:
+            return [bus for bus in self.buses.values() if bus.status == status]
         return list(self.buses.values())
+    
+    def fleet_columns(self) -> Dict[str, list]:
+        """
+        The fleet as one list per field, for bulk export. Position, speed and
+        last_seen (epoch seconds) are NaN for buses that haven't pinged.
+        """
+        buses = list(self.buses.values())
+        locations = [bus.last_location for bus in buses]
+        nan = float("nan")
+        return {
+            "bus_id": [bus.bus_id for bus in buses],
+            "db_id": [bus.db_id for bus in buses],
+            "driver_phone": [bus.driver_phone for bus in buses],
+            "driver_name": [bus.driver_name for bus in buses],
+            "plate_number": [bus.plate_number for bus in buses],
+            "route_id": [bus.route_id for bus in buses],
+            "capacity": [bus.capacity for bus in buses],
+            "status": [bus.status for bus in buses],
+            "connection_status": [bus.connection_status for bus in buses],
+            "current_terminal": [bus.current_terminal for bus in buses],
+            "latitude": [loc.latitude if loc else nan for loc in locations],
+            "longitude": [loc.longitude if loc else nan for loc in locations],
+            "speed": [loc.speed if loc else nan for loc in locations],
+            "last_seen": [loc.timestamp.timestamp() if loc else nan for loc in locations],
+        }
+    
+    @timed("fleet_counts")
+    def fleet_counts(self) -> Dict[str, int]:
+        buses = self.buses.values()
+        return {
+            "total": len(self.buses),
+            "available": len([b for b in buses if b.status == "available"]),
+            "in_transit": len([b for b in buses if b.status == "in_transit"]),
+            "stale": len([b for b in buses if b.connection_status != ONLINE]),
+        }
 
-
-bus_tracking_service = BusTrackingService()
\ No newline at end of file
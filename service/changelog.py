@@ -0,0 +1,59 @@
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+BUS = "bus"
+TERMINAL = "terminal"
+
+
+class ChangeLog:
+    """
+    Sequence-numbered record of which buses and terminals changed.
+
+    Each mutation takes the next sequence number. Only the latest change per
+    entity is kept, in sequence order, so reading the changes since a point
+    costs O(entities changed since then). The log holds at most max_entries
+    entities; a reader asking for changes older than the oldest one evicted
+    has fallen behind and must reload in full.
+
+    Sequence numbers restart with the process, so each log has a random
+    epoch; readers pass it back with their seq and a mismatch means reload.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.epoch = uuid.uuid4().hex
+        self.seq = 0
+        self.floor = 0
+        self._entries: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+
+    def record(self, kind: str, entity_id: str) -> int:
+        self.seq += 1
+        key = (kind, entity_id)
+        self._entries[key] = self.seq
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            _, self.floor = self._entries.popitem(last=False)
+        return self.seq
+
+    def bus(self, bus_id: str) -> int:
+        return self.record(BUS, bus_id)
+
+    def terminal(self, terminal_id: str) -> int:
+        return self.record(TERMINAL, terminal_id)
+
+    def since(self, seq: int, epoch: Optional[str]) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        Bus and terminal ids changed after seq, or None if seq is too old or
+        from another epoch (a restart, another process) to answer from the log
+        """
+        if epoch != self.epoch or seq < self.floor or seq > self.seq:
+            return None
+        buses, terminals = [], []
+        for (kind, entity_id), entry_seq in reversed(self._entries.items()):
+            if entry_seq <= seq:
+                break
+            (buses if kind == BUS else terminals).append(entity_id)
+        buses.reverse()
+        terminals.reverse()
+        return buses, terminals
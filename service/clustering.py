@@ -0,0 +1,152 @@
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.utils.constants import (
+    MAP_MAX_CLUSTER_ZOOM, MAP_CELLS_PER_TILE, MAP_MAX_CELLS, MAP_MAX_BUSES
+)
+
+Cell = Tuple[int, int]
+BBox = Tuple[float, float, float, float]  # min_lon, min_lat, max_lon, max_lat
+
+
+class ClusterIndex:
+    """
+    Bus counts and coordinate sums per grid cell for every zoom level
+    0..max_level, updated in place on each position change.
+
+    A level-z cell is 1/cells_per_tile of a level-z map tile. Cells nest, so
+    a bus's cell at each coarser level is its finest cell shifted right by
+    the level difference. Bus ids are only kept for the finest level, which
+    is what individual-bus queries read.
+    """
+
+    def __init__(self, max_level: int = MAP_MAX_CLUSTER_ZOOM, cells_per_tile: int = MAP_CELLS_PER_TILE):
+        self.max_level = max_level
+        self._scale = (2 ** max_level) * cells_per_tile / 360
+        # level -> cell -> [count, sum_lat, sum_lon]
+        self._levels: List[Dict[Cell, List[float]]] = [{} for _ in range(max_level + 1)]
+        self._members: Dict[Cell, Set[str]] = {}
+        self._positions: Dict[str, Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return int((lon + 180) * self._scale), int((lat + 90) * self._scale)
+
+    def update(self, bus_id: str, lat: float, lon: float):
+        old = self._positions.get(bus_id)
+        self._positions[bus_id] = (lat, lon)
+        nx, ny = new = self._cell(lat, lon)
+        if old is not None:
+            old_lat, old_lon = old
+            ox, oy = self._cell(old_lat, old_lon)
+            if (ox, oy) != new:
+                self._leave_members(bus_id, (ox, oy))
+                self._members.setdefault(new, set()).add(bus_id)
+        else:
+            self._members.setdefault(new, set()).add(bus_id)
+
+        for level in range(self.max_level, -1, -1):
+            shift = self.max_level - level
+            cells = self._levels[level]
+            key = (nx >> shift, ny >> shift)
+            if old is not None:
+                old_key = (ox >> shift, oy >> shift)
+                if old_key == key:
+                    agg = cells[key]
+                    agg[1] += lat - old_lat
+                    agg[2] += lon - old_lon
+                    continue
+                self._subtract(cells, old_key, old_lat, old_lon)
+            agg = cells.get(key)
+            if agg is None:
+                agg = cells[key] = [0, 0.0, 0.0]
+            agg[0] += 1
+            agg[1] += lat
+            agg[2] += lon
+
+    def remove(self, bus_id: str):
+        old = self._positions.pop(bus_id, None)
+        if old is None:
+            return
+        ox, oy = self._cell(*old)
+        self._leave_members(bus_id, (ox, oy))
+        for level in range(self.max_level, -1, -1):
+            shift = self.max_level - level
+            self._subtract(self._levels[level], (ox >> shift, oy >> shift), *old)
+
+    def _leave_members(self, bus_id: str, cell: Cell):
+        members = self._members[cell]
+        members.discard(bus_id)
+        if not members:
+            del self._members[cell]
+
+    @staticmethod
+    def _subtract(cells: Dict[Cell, List[float]], key: Cell, lat: float, lon: float):
+        agg = cells[key]
+        agg[0] -= 1
+        if agg[0] == 0:
+            # Dropping empty cells also discards accumulated rounding error.
+            del cells[key]
+        else:
+            agg[1] -= lat
+            agg[2] -= lon
+
+    def _cell_range(self, bbox: BBox, shift: int) -> Tuple[int, int, int, int]:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        x0, y0 = self._cell(min_lat, min_lon)
+        x1, y1 = self._cell(max_lat, max_lon)
+        return x0 >> shift, y0 >> shift, x1 >> shift, y1 >> shift
+
+    @staticmethod
+    def _in_range(cells: Dict, x0: int, y0: int, x1: int, y1: int):
+        # Walk whichever is smaller: the cells covering the box or the non-empty cells.
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= len(cells):
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    value = cells.get((x, y))
+                    if value is not None:
+                        yield (x, y), value
+        else:
+            for key, value in cells.items():
+                if x0 <= key[0] <= x1 and y0 <= key[1] <= y1:
+                    yield key, value
+
+    def clusters(self, bbox: BBox, zoom: int, max_cells: int = MAP_MAX_CELLS) -> Tuple[int, List[Dict]]:
+        """
+        Clusters for the cells overlapping bbox at the given zoom. The level is
+        lowered until the box spans at most max_cells cells, which bounds the
+        response size. Returns (level used, clusters).
+        """
+        level = max(0, min(zoom, self.max_level))
+        while True:
+            x0, y0, x1, y1 = self._cell_range(bbox, self.max_level - level)
+            if level == 0 or (x1 - x0 + 1) * (y1 - y0 + 1) <= max_cells:
+                break
+            level -= 1
+
+        clusters = [
+            {
+                "cell": f"{level}/{x}/{y}",
+                "count": int(count),
+                "latitude": round(sum_lat / count, 6),
+                "longitude": round(sum_lon / count, 6),
+            }
+            for (x, y), (count, sum_lat, sum_lon) in self._in_range(self._levels[level], x0, y0, x1, y1)
+        ]
+        return level, clusters
+
+    def buses(self, bbox: BBox, limit: int = MAP_MAX_BUSES) -> Optional[List[Tuple[str, float, float]]]:
+        """
+        Buses inside bbox, or None if there are more than limit
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox
+        found = []
+        for _, members in self._in_range(self._members, *self._cell_range(bbox, 0)):
+            for bus_id in members:
+                lat, lon = self._positions[bus_id]
+                if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                    found.append((bus_id, lat, lon))
+                    if len(found) > limit:
+                        return None
+        return found
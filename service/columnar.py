@@ -0,0 +1,291 @@
+import math
+from array import array
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.constants import ETA_HORIZON_MINUTES
+from . import Bus, BusLocation, BusTrackingService
+from .staleness import ONLINE, STALE, OFFLINE
+from .profiling import timed
+
+NO_TERMINAL = -1
+NO_DB_ID = -1
+NO_TIMESTAMP = math.nan
+
+
+class _Codes:
+    """
+    Interns short strings (bus status, connection state, terminal id) as small ints
+    """
+
+    def __init__(self, *names: str):
+        self.names: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for name in names:
+            self.code(name)
+
+    def code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def find(self, name: str) -> int:
+        return self._codes.get(name, -1)
+
+
+class BusColumnsView(Mapping):
+    """
+    Read-only dict-like view of the fleet. Each lookup builds a fresh Bus,
+    so changes must go through the service rather than the returned object.
+    """
+
+    def __init__(self, service: "ColumnarBusTrackingService"):
+        self._service = service
+
+    def __getitem__(self, bus_id: str) -> Bus:
+        return self._service._materialize(self._service._rows[bus_id])
+
+    def __contains__(self, bus_id) -> bool:
+        return bus_id in self._service._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._service._rows)
+
+    def __len__(self) -> int:
+        return len(self._service._rows)
+
+
+class ColumnarBusTrackingService(BusTrackingService):
+    """
+    BusTrackingService that keeps the fleet as struct-of-arrays: one typed
+    array per field plus a bus id -> row map. Bus and BusLocation objects are
+    only built when a caller reads them.
+
+    Only the fields in Bus and the core of the last ping (position, speed,
+    timestamp) are kept; timestamps are stored as epoch seconds and come back
+    as naive local time.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._rows: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._phones: List[str] = []
+        self._names: List[str] = []
+        self._plates: List[str] = []
+        self._routes: List[Optional[str]] = []
+        self._by_phone: Dict[str, int] = {}
+        self._db_ids = array("q")
+        self._capacity = array("i")
+        self._lat = array("d")
+        self._lon = array("d")
+        self._speed = array("d")
+        self._ts = array("d")
+        # Statuses are free text, so leave room for more than a handful.
+        self._status = array("h")
+        self._connection = array("h")
+        self._terminal = array("i")
+        self._statuses = _Codes("available", "in_transit", "maintenance")
+        self._connections = _Codes(ONLINE, STALE, OFFLINE)
+        self._terminal_ids = _Codes()
+        self.buses = BusColumnsView(self)
+
+    def _store_bus(self, bus: Bus):
+        row = self._rows.get(bus.bus_id)
+        if row is None:
+            row = self._append_row(bus.bus_id)
+        elif self._by_phone.get(self._phones[row]) == row:
+            del self._by_phone[self._phones[row]]
+
+        self._db_ids[row] = bus.db_id if bus.db_id is not None else NO_DB_ID
+        self._phones[row] = bus.driver_phone
+        self._names[row] = bus.driver_name
+        self._plates[row] = bus.plate_number
+        self._routes[row] = bus.route_id
+        self._capacity[row] = bus.capacity
+        self._status[row] = self._statuses.code(bus.status)
+        self._connection[row] = self._connections.code(bus.connection_status)
+        self._terminal[row] = (self._terminal_ids.code(bus.current_terminal)
+                               if bus.current_terminal is not None else NO_TERMINAL)
+        if bus.last_location is not None:
+            self._store_location(row, bus.last_location)
+        else:
+            self._ts[row] = NO_TIMESTAMP
+        self._by_phone.setdefault(bus.driver_phone, row)
+
+    def _append_row(self, bus_id: str) -> int:
+        row = len(self._ids)
+        self._rows[bus_id] = row
+        self._ids.append(bus_id)
+        for column in (self._phones, self._names, self._plates):
+            column.append("")
+        self._routes.append(None)
+        for column in (self._db_ids, self._capacity, self._status, self._connection):
+            column.append(0)
+        for column in (self._lat, self._lon, self._speed, self._ts):
+            column.append(0.0)
+        self._terminal.append(NO_TERMINAL)
+        return row
+
+    def _store_location(self, row: int, location: BusLocation):
+        self._lat[row] = location.latitude
+        self._lon[row] = location.longitude
+        self._speed[row] = location.speed
+        self._ts[row] = location.timestamp.timestamp()
+
+    def _materialize(self, row: int) -> Bus:
+        bus_id = self._ids[row]
+        ts = self._ts[row]
+        location = None
+        if not math.isnan(ts):
+            location = BusLocation(
+                bus_id=bus_id, driver_phone=self._phones[row],
+                latitude=self._lat[row], longitude=self._lon[row],
+                speed=self._speed[row], timestamp=datetime.fromtimestamp(ts)
+            )
+        terminal = self._terminal[row]
+        db_id = self._db_ids[row]
+        return Bus(
+            bus_id=bus_id,
+            db_id=db_id if db_id != NO_DB_ID else None,
+            driver_phone=self._phones[row],
+            driver_name=self._names[row],
+            plate_number=self._plates[row],
+            capacity=self._capacity[row],
+            route_id=self._routes[row],
+            current_terminal=self._terminal_ids.names[terminal] if terminal != NO_TERMINAL else None,
+            status=self._statuses.names[self._status[row]],
+            last_location=location,
+            connection_status=self._connections.names[self._connection[row]],
+        )
+
+    def _apply_location(self, bus_id: str, location: BusLocation):
+        row = self._rows[bus_id]
+        self._store_location(row, location)
+        self.map_index.update(bus_id, location.latitude, location.longitude)
+        self.stale_detector.touch(bus_id)
+        self._check_terminal_presence(bus_id, location)
+        self._notify_arrivals(bus_id, location)
+        self._track_headway(bus_id, location)
+        self.changes.bus(bus_id)
+        if self._location_listeners:
+            bus = self._materialize(row)
+            for listener in self._location_listeners:
+                listener(bus, location)
+
+    def set_bus_status(self, bus_id: str, status: str) -> Dict:
+        row = self._rows.get(bus_id)
+        if row is None:
+            return {"error": "Bus not found"}
+        self._status[row] = self._statuses.code(status)
+        self.changes.bus(bus_id)
+        if self.recorder:
+            self.recorder.status(bus_id, status)
+        return {"message": "Status updated", "bus_id": bus_id, "new_status": status}
+
+    def _on_connection_change(self, bus_id: str, state: str):
+        row = self._rows.get(bus_id)
+        if row is not None:
+            self._connection[row] = self._connections.code(state)
+            self.changes.bus(bus_id)
+        if state != ONLINE:
+            self.headways.forget(bus_id)
+
+    def _bus_status(self, bus_id: str) -> str:
+        return self._statuses.names[self._status[self._rows[bus_id]]]
+
+    def _current_terminal(self, bus_id: str) -> Optional[str]:
+        terminal = self._terminal[self._rows[bus_id]]
+        return self._terminal_ids.names[terminal] if terminal != NO_TERMINAL else None
+
+    def _bus_route(self, bus_id: str) -> Optional[str]:
+        return self._routes[self._rows[bus_id]]
+
+    def _place_bus(self, bus_id: str, terminal_id: Optional[str], status: str):
+        row = self._rows[bus_id]
+        self._terminal[row] = self._terminal_ids.code(terminal_id) if terminal_id is not None else NO_TERMINAL
+        self._status[row] = self._statuses.code(status)
+
+    def _column(self, values: array) -> np.ndarray:
+        # A view over the live array; drop it before the next append, which
+        # fails while a buffer is exported.
+        return np.frombuffer(values, dtype=values.typecode)
+
+    def _transit_rows(self) -> np.ndarray:
+        return np.flatnonzero((self._column(self._status) == self._statuses.find("in_transit"))
+                              & (self._column(self._connection) == self._connections.find(ONLINE))
+                              & ~np.isnan(self._column(self._ts)))
+
+    @timed("incoming_buses")
+    def _get_incoming_buses(self, terminal_id: str) -> List[Dict]:
+        terminal = self.terminals[terminal_id]
+        rows = self._transit_rows()
+        # Same arithmetic as _eta, over every bus in transit at once.
+        dist_km = ((self._column(self._lat)[rows] - terminal.latitude) ** 2
+                   + (self._column(self._lon)[rows] - terminal.longitude) ** 2) ** 0.5 * 111
+        speed = self._column(self._speed)[rows]
+        eta = (dist_km / np.where(speed > 0, speed, 30) * 60).astype(np.int64)
+        near = np.flatnonzero(eta < ETA_HORIZON_MINUTES)
+        near = near[np.argsort(eta[near], kind="stable")]
+        return [{"bus_id": self._ids[row], "eta": minutes, "distance_km": round(km, 2)}
+                for row, minutes, km in zip(rows[near].tolist(), eta[near].tolist(), dist_km[near].tolist())]
+
+    def transit_positions(self) -> Tuple[List[str], List[float], List[float], List[float]]:
+        rows = self._transit_rows()
+        return ([self._ids[row] for row in rows.tolist()], self._column(self._lat)[rows].tolist(),
+                self._column(self._lon)[rows].tolist(), self._column(self._speed)[rows].tolist())
+
+    def resolve_bus_key(self, db_id: int) -> str:
+        try:
+            return self._ids[self._db_ids.index(db_id)]
+        except ValueError:
+            return str(db_id)
+
+    def get_bus_by_phone(self, phone: str) -> Optional[Bus]:
+        row = self._by_phone.get(phone)
+        if row is None and phone in self._phones:
+            row = self._by_phone[phone] = self._phones.index(phone)
+        return self._materialize(row) if row is not None else None
+
+    @timed("list_buses")
+    def get_all_buses(self, status: Optional[str] = None) -> List[Bus]:
+        if not status:
+            return [self._materialize(row) for row in range(len(self._ids))]
+        code = self._statuses.find(status)
+        if code < 0:
+            return []
+        return [self._materialize(row) for row in np.flatnonzero(self._column(self._status) == code).tolist()]
+
+    def fleet_columns(self) -> Dict:
+        # Copies, so an export can stream them while pings keep landing.
+        # Coded fields come back as (codes, names), -1 meaning none.
+        return {
+            "bus_id": list(self._ids),
+            "db_id": array("q", self._db_ids),
+            "driver_phone": list(self._phones),
+            "driver_name": list(self._names),
+            "plate_number": list(self._plates),
+            "route_id": list(self._routes),
+            "capacity": array("i", self._capacity),
+            "status": (array("h", self._status), list(self._statuses.names)),
+            "connection_status": (array("h", self._connection), list(self._connections.names)),
+            "current_terminal": (array("i", self._terminal), list(self._terminal_ids.names)),
+            "latitude": array("d", self._lat),
+            "longitude": array("d", self._lon),
+            "speed": array("d", self._speed),
+            "last_seen": array("d", self._ts),
+        }
+
+    @timed("fleet_counts")
+    def fleet_counts(self) -> Dict[str, int]:
+        return {
+            "total": len(self._ids),
+            "available": self._status.count(self._statuses.find("available")),
+            "in_transit": self._status.count(self._statuses.find("in_transit")),
+            "stale": len(self._ids) - self._connection.count(self._connections.find(ONLINE)),
+        }
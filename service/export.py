@@ -0,0 +1,365 @@
+"""
+Arrow IPC and Parquet export of fleet state, terminal occupancy and GPS
+history, written in record batches.
+
+Fleet state comes from BusTrackingService.fleet_columns(), which the
+columnar backend answers with copies of its typed arrays, so no Bus objects
+are built. History is read from recorded traces in TRACE_DIR.
+
+pyarrow is an optional extra (pip install pyarrow). Without it available()
+is False, the export endpoints answer 503 and the CLI exits with a message.
+
+Usage (from the repository root):
+    python -m service.export history --since 2026-01-05 --until 2026-01-06 -o day.parquet
+    python -m service.export buses --trace traces/trace-20260105-060000.jsonl.gz -o buses.arrow
+"""
+import argparse
+import glob
+import gzip
+import os
+import re
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from app.utils.constants import EXPORT_BATCH_ROWS, TRACE_DIR
+from .trace import ARCHIVED, LOCATION
+
+ARROW = "arrow"
+PARQUET = "parquet"
+FORMATS = (ARROW, PARQUET)
+MEDIA_TYPES = {ARROW: "application/vnd.apache.arrow.stream", PARQUET: "application/vnd.apache.parquet"}
+
+BUS_COLUMNS = ("bus_id", "driver_phone", "driver_name", "plate_number", "route_id", "capacity", "status",
+               "connection_status", "current_terminal", "latitude", "longitude", "speed", "last_seen")
+OCCUPANCY_COLUMNS = ("terminal_id", "terminal_name", "position", "bus_id", "arrived_at")
+HISTORY_COLUMNS = ("bus_id", "driver_phone", "latitude", "longitude", "speed", "timestamp", "accuracy_meters",
+                   "heading", "applied")
+_CATEGORICAL = {"route_id", "status", "connection_status", "current_terminal"}
+_LOCATION = {"latitude", "longitude", "speed", "last_seen"}
+# Trace location events are [ms, kind, bus_id, phone, lat, lon, speed, timestamp, accuracy, heading];
+# ms is dropped. Traces recorded before accuracy and heading were added end at the timestamp.
+_TRACE_FIELDS = ("kind", "bus_id", "driver_phone", "latitude", "longitude", "speed", "timestamp",
+                 "accuracy_meters", "heading")
+_LEGACY_TRACE_FIELDS = _TRACE_FIELDS[:-2]
+_LOCATION_LINE = re.compile(f'^\\[[^,\\n]*,("[{LOCATION}{ARCHIVED}]",[^\\n]*)\\]$'.encode(), re.M)
+_READ_BYTES = 1 << 22
+_HISTORY_TYPES = {"bus_id": pa.string(), "driver_phone": pa.string(), "latitude": pa.float64(),
+                  "longitude": pa.float64(), "speed": pa.float64(), "timestamp": pa.timestamp("us"),
+                  "accuracy_meters": pa.float64(), "heading": pa.float64(),
+                  "applied": pa.bool_()} if pa is not None else {}
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def select_columns(columns: Optional[Sequence[str]], allowed: Sequence[str]) -> List[str]:
+    if not columns:
+        return list(allowed)
+    unknown = [name for name in columns if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}. Choose from: {', '.join(allowed)}")
+    return list(dict.fromkeys(columns))
+
+
+def _array(values, name: str, missing: Optional[np.ndarray]) -> "pa.Array":
+    if name in _CATEGORICAL:
+        if isinstance(values, tuple):
+            codes, names = values
+            indices = np.frombuffer(codes, dtype=codes.typecode).astype(np.int32)
+            return pa.DictionaryArray.from_arrays(pa.array(indices, mask=indices < 0),
+                                                  pa.array(names, pa.string()))
+        return pa.array(values, pa.string()).dictionary_encode()
+    if isinstance(values, array):
+        values = np.frombuffer(values, dtype=values.typecode)
+    if name == "last_seen":
+        micros = np.nan_to_num(np.asarray(values, dtype=np.float64) * 1e6).astype(np.int64)
+        return pa.array(micros, pa.timestamp("us", tz="UTC"), mask=missing)
+    if name in _LOCATION:
+        return pa.array(np.asarray(values, dtype=np.float64), mask=missing)
+    if name == "capacity":
+        return pa.array(np.asarray(values, dtype=np.int32))
+    return pa.array(values, pa.string())
+
+
+def fleet_batches(columns: Dict, selected: Sequence[str],
+                  batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator["pa.RecordBatch"]:
+    """
+    Record batches from a fleet_columns() snapshot
+    """
+    missing = np.isnan(np.asarray(columns["last_seen"], dtype=np.float64))
+    table = pa.table({name: _array(columns[name], name, missing) for name in selected})
+    yield from table.to_batches(max_chunksize=batch_rows) or [pa.RecordBatch.from_pylist([], table.schema)]
+
+
+def occupancy_batches(service, selected: Sequence[str]) -> Iterator["pa.RecordBatch"]:
+    rows = {name: [] for name in OCCUPANCY_COLUMNS}
+    for terminal_id, occupancy in service.occupancy.items():
+        name = service.terminals[terminal_id].name
+        for position, bus_id in enumerate(occupancy, 1):
+            rows["terminal_id"].append(terminal_id)
+            rows["terminal_name"].append(name)
+            rows["position"].append(position)
+            rows["bus_id"].append(bus_id)
+            rows["arrived_at"].append(occupancy.arrived_at(bus_id))
+    types = {"position": pa.int32(), "arrived_at": pa.timestamp("us")}
+    yield pa.record_batch([pa.array(rows[name], types.get(name, pa.string())) for name in selected],
+                          names=list(selected))
+
+
+def _trace_start(path: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(os.path.basename(path)[len("trace-"):][:15], "%Y%m%d-%H%M%S")
+    except ValueError:
+        return None
+
+
+def trace_paths(trace_dir: str = TRACE_DIR, since: Optional[datetime] = None,
+                until: Optional[datetime] = None) -> List[str]:
+    """
+    Traces that can hold pings in [since, until). A trace runs from the time
+    in its name until the next one starts.
+    """
+    paths = sorted(glob.glob(os.path.join(trace_dir, "trace-*.jsonl.gz")))
+    starts = [_trace_start(path) for path in paths]
+    keep = []
+    for i, path in enumerate(paths):
+        start = starts[i]
+        end = starts[i + 1] if i + 1 < len(paths) else None
+        if start is not None and until is not None and start >= until:
+            continue
+        if end is not None and since is not None and end <= since:
+            continue
+        keep.append(path)
+    return keep
+
+
+def _read_locations(paths: Sequence[str]) -> Iterator[bytes]:
+    """
+    Blocks of location events, one per line without the enclosing brackets
+    and leading timestamp, ready for the CSV reader. Lines are picked out by
+    a regex over each decompressed block rather than one at a time. A trace
+    still being written ends mid-stream; the blocks read before that point
+    are kept.
+    """
+    for path in paths:
+        with gzip.open(path, "rb") as f:
+            rest = b""
+            while True:
+                try:
+                    chunk = f.read(_READ_BYTES)
+                except EOFError:
+                    break
+                if not chunk:
+                    break
+                data = rest + chunk
+                cut = data.rfind(b"\n") + 1
+                data, rest = data[:cut], data[cut:]
+                rows = _LOCATION_LINE.findall(data)
+                if rows:
+                    yield b"\n".join(rows)
+
+
+def _parse_timestamps(values: "pa.Array") -> "pa.Array":
+    try:
+        return pc.cast(values, pa.timestamp("us"))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        # Offsets in some timestamps: bring them to naive local time like the columnar backend.
+        parsed = []
+        for value in values.to_pylist():
+            at = datetime.fromisoformat(value)
+            parsed.append(at.astimezone().replace(tzinfo=None) if at.tzinfo else at)
+        return pa.array(parsed, pa.timestamp("us"))
+
+
+def history_batches(paths: Sequence[str], selected: Sequence[str], since: Optional[datetime] = None,
+                    until: Optional[datetime] = None,
+                    batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator["pa.RecordBatch"]:
+    """
+    Recorded pings as record batches, parsed by Arrow's CSV reader rather than
+    line by line. applied is False for pings that were archived but not
+    applied (late or out of order).
+    """
+    needed = set(selected) | ({"timestamp"} if since or until else set())
+    include = [name for name in _TRACE_FIELDS if name in needed or (name == "kind" and "applied" in needed)]
+    types = {"bus_id": pa.string(), "driver_phone": pa.string(), "kind": pa.string(), "timestamp": pa.string(),
+             "latitude": pa.float64(), "longitude": pa.float64(), "speed": pa.float64(),
+             "accuracy_meters": pa.float64(), "heading": pa.float64()}
+    parse_options = pa_csv.ParseOptions(escape_char="\\")
+    options = {}
+    for fields in (_TRACE_FIELDS, _LEGACY_TRACE_FIELDS):
+        columns = [name for name in include if name in fields]
+        options[fields] = (
+            pa_csv.ReadOptions(column_names=list(fields)),
+            pa_csv.ConvertOptions(column_types={name: types[name] for name in columns}, include_columns=columns),
+        )
+    schema = history_schema(selected)
+    for block in _read_locations(paths):
+        # A block comes from a single trace, so its lines all have the same layout.
+        fields = _LEGACY_TRACE_FIELDS if block.endswith(b'"') else _TRACE_FIELDS
+        read_options, convert_options = options[fields]
+        table = pa_csv.read_csv(pa.py_buffer(block), read_options=read_options,
+                                parse_options=parse_options, convert_options=convert_options)
+        for name in include:
+            if name not in fields:
+                table = table.append_column(name, pa.nulls(table.num_rows, types[name]))
+        if "timestamp" in needed:
+            table = table.set_column(table.schema.get_field_index("timestamp"), "timestamp",
+                                     _parse_timestamps(table["timestamp"].combine_chunks()))
+        if since is not None or until is not None:
+            mask = None
+            if since is not None:
+                mask = pc.greater_equal(table["timestamp"], pa.scalar(since, pa.timestamp("us")))
+            if until is not None:
+                before = pc.less(table["timestamp"], pa.scalar(until, pa.timestamp("us")))
+                mask = before if mask is None else pc.and_(mask, before)
+            table = table.filter(mask)
+        if "applied" in needed:
+            table = table.append_column("applied", pc.equal(table["kind"], LOCATION))
+        if table.num_rows:
+            yield from table.select(list(selected)).cast(schema).to_batches(max_chunksize=batch_rows)
+
+
+
+def history_schema(selected: Sequence[str]) -> "pa.Schema":
+    return pa.schema([(name, _HISTORY_TYPES[name]) for name in selected])
+
+
+class _Chunks:
+    """
+    Write-only file object whose contents are handed out between batches
+    """
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def stream(batches: Iterator["pa.RecordBatch"], schema: "pa.Schema", fmt: str = ARROW) -> Iterator[bytes]:
+    """
+    Encode batches as an Arrow IPC stream or a Parquet file (one row group
+    per batch), yielding bytes as each batch is written
+    """
+    sink = _Chunks()
+    out = pa.PythonFile(sink, mode="w")
+    writer = pq.ParquetWriter(out, schema) if fmt == PARQUET else pa.ipc.new_stream(out, schema)
+    try:
+        for batch in batches:
+            writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _first_batch_schema(batches: Iterator["pa.RecordBatch"]):
+    batches = iter(batches)
+    first = next(batches)
+    return first.schema, _chain(first, batches)
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def export_fleet(service, columns: Optional[Sequence[str]] = None, fmt: str = ARROW) -> Iterator[bytes]:
+    batches = fleet_batches(service.fleet_columns(), select_columns(columns, BUS_COLUMNS))
+    schema, batches = _first_batch_schema(batches)
+    return stream(batches, schema, fmt)
+
+
+def export_occupancy(service, columns: Optional[Sequence[str]] = None, fmt: str = ARROW) -> Iterator[bytes]:
+    schema, batches = _first_batch_schema(occupancy_batches(service, select_columns(columns, OCCUPANCY_COLUMNS)))
+    return stream(batches, schema, fmt)
+
+
+def export_history(paths: Sequence[str], columns: Optional[Sequence[str]] = None, fmt: str = ARROW,
+                   since: Optional[datetime] = None, until: Optional[datetime] = None) -> Iterator[bytes]:
+    selected = select_columns(columns, HISTORY_COLUMNS)
+    return stream(history_batches(paths, selected, since, until), history_schema(selected), fmt)
+
+
+def _replayed_service(trace: str):
+    from .columnar import ColumnarBusTrackingService
+    from .replay import ServiceTarget, configure_replay
+    from .trace import FINAL, read_config, read_trace
+
+    service = ColumnarBusTrackingService()
+    service.enforce_shifts = False
+    service.rate_limit_enabled = False
+    configure_replay(service, read_config(trace))
+    target = ServiceTarget(service)
+    for event in read_trace(trace):
+        if event[1] != FINAL:
+            target.apply(event)
+    return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export BRTLive fleet data as Arrow or Parquet")
+    parser.add_argument("dataset", choices=["buses", "occupancy", "history"])
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--format", choices=FORMATS, help="Defaults to the output file extension")
+    parser.add_argument("--columns", help="Comma-separated columns to export")
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    parser.add_argument("--trace-dir", default=TRACE_DIR)
+    parser.add_argument("--trace", help="For buses and occupancy: the trace to rebuild fleet state from")
+    args = parser.parse_args()
+
+    if not available():
+        raise SystemExit("Export requires pyarrow")
+    fmt = args.format or (PARQUET if args.output.endswith(".parquet") else ARROW)
+    columns = args.columns.split(",") if args.columns else None
+    if args.dataset == "history":
+        chunks = export_history(trace_paths(args.trace_dir, args.since, args.until), columns, fmt,
+                                args.since, args.until)
+    else:
+        if not args.trace:
+            parser.error(f"{args.dataset} needs --trace to rebuild fleet state from")
+        service = _replayed_service(args.trace)
+        exporter = export_fleet if args.dataset == "buses" else export_occupancy
+        chunks = exporter(service, columns, fmt)
+
+    with open(args.output, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import math
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.constants import HEADWAY_BUNCHING_MINUTES, HEADWAY_MAX_OFF_ROUTE_KM
+
+DEGREE_KM = 111
+DEFAULT_SPEED_KMH = 30
+OUTBOUND = 1
+INBOUND = -1
+DIRECTION_NAMES = {OUTBOUND: "outbound", INBOUND: "inbound"}
+# Chainage change below which a ping says nothing about direction
+DIRECTION_EPSILON_KM = 0.02
+
+
+class RouteLine:
+    """
+    A route as a polyline through its stops in order, with the distance
+    along it (chainage) at each stop
+    """
+
+    def __init__(self, route_id: str, stops: List[Tuple[float, float]]):
+        self.route_id = route_id
+        self.stops = stops
+        self.chainage = [0.0]
+        for (lat1, lon1), (lat2, lon2) in zip(stops, stops[1:]):
+            self.chainage.append(self.chainage[-1] + math.hypot(lat2 - lat1, lon2 - lon1) * DEGREE_KM)
+
+    @property
+    def length_km(self) -> float:
+        return self.chainage[-1]
+
+    def project(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        """
+        Chainage of the closest point on the line and the distance to it, in km
+        """
+        best_offset, best_chainage = math.inf, 0.0
+        for i, ((lat1, lon1), (lat2, lon2)) in enumerate(zip(self.stops, self.stops[1:])):
+            dlat, dlon = lat2 - lat1, lon2 - lon1
+            length = dlat * dlat + dlon * dlon
+            t = ((latitude - lat1) * dlat + (longitude - lon1) * dlon) / length if length else 0.0
+            t = min(1.0, max(0.0, t))
+            offset = math.hypot(latitude - lat1 - t * dlat, longitude - lon1 - t * dlon) * DEGREE_KM
+            if offset < best_offset:
+                best_offset = offset
+                best_chainage = self.chainage[i] + t * (self.chainage[i + 1] - self.chainage[i])
+        return best_chainage, best_offset
+
+    def direction(self, chainage: float, heading: float) -> int:
+        """
+        Direction of travel for a compass heading at a point on the line
+        """
+        i = min(max(bisect_right(self.chainage, chainage) - 1, 0), len(self.stops) - 2)
+        (lat1, lon1), (lat2, lon2) = self.stops[i], self.stops[i + 1]
+        bearing = math.atan2(lon2 - lon1, lat2 - lat1)
+        return OUTBOUND if math.cos(math.radians(heading) - bearing) >= 0 else INBOUND
+
+
+class _Lane:
+    """
+    Buses on one route heading one way, sorted by chainage. The bus ahead
+    of the one at index i is at i + direction.
+
+    headways, bunched and the headway total are kept up to date as buses
+    move, so reading them never walks the lane.
+    """
+
+    def __init__(self, direction: int):
+        self.direction = direction
+        self.chainage: List[float] = []
+        self.ids: List[str] = []
+        # follower -> (bus ahead, minutes behind it)
+        self.headways: Dict[str, Tuple[str, float]] = {}
+        # followers whose headway is under HEADWAY_BUNCHING_MINUTES
+        self.bunched: Dict[str, Tuple[str, float]] = {}
+        self.total_minutes = 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def index(self, bus_id: str, chainage: float) -> int:
+        start = bisect_left(self.chainage, chainage)
+        return self.ids.index(bus_id, start, bisect_right(self.chainage, chainage))
+
+    def neighbour(self, index: int, step: int) -> Optional[int]:
+        index += step
+        return index if 0 <= index < len(self.ids) else None
+
+
+class HeadwayMonitor:
+    """
+    Headways and bunching for every registered route.
+
+    Each in-transit bus on a registered route is projected onto the route
+    line and kept in a lane per direction of travel, sorted by chainage. A
+    ping moves one bus, so only its own headway and those of the buses
+    behind its old and new places change. A bus is bunched when it is less
+    than HEADWAY_BUNCHING_MINUTES behind the bus ahead at its current speed.
+
+    A bus only joins a lane once its direction is known: from the heading
+    its phone reports, or else once it has moved DIRECTION_EPSILON_KM along
+    the route from where it was first seen.
+    """
+
+    def __init__(self, bunching_minutes: float = HEADWAY_BUNCHING_MINUTES,
+                 max_off_route_km: float = HEADWAY_MAX_OFF_ROUTE_KM):
+        self.bunching_minutes = bunching_minutes
+        self.max_off_route_km = max_off_route_km
+        self.routes: Dict[str, RouteLine] = {}
+        self._lanes: Dict[str, Dict[int, _Lane]] = {}
+        # bus -> (route, direction, chainage, speed)
+        self._where: Dict[str, Tuple[str, int, float, float]] = {}
+        # bus -> (route, chainage) where it was first seen, until its direction is known
+        self._pending: Dict[str, Tuple[str, float]] = {}
+
+    def add_route(self, route_id: str, stops: List[Tuple[float, float]]) -> RouteLine:
+        for bus_id in [bid for bid, where in self._where.items() if where[0] == route_id]:
+            self.forget(bus_id)
+        for bus_id in [bid for bid, pending in self._pending.items() if pending[0] == route_id]:
+            del self._pending[bus_id]
+        line = self.routes[route_id] = RouteLine(route_id, stops)
+        self._lanes[route_id] = {OUTBOUND: _Lane(OUTBOUND), INBOUND: _Lane(INBOUND)}
+        return line
+
+    def observe(self, bus_id: str, route_id: Optional[str], latitude: float, longitude: float, speed: float,
+                heading: Optional[float] = None):
+        line = self.routes.get(route_id)
+        if line is None:
+            self.forget(bus_id)
+            return
+        chainage, offset = line.project(latitude, longitude)
+        if offset > self.max_off_route_km:
+            self.forget(bus_id)
+            return
+
+        where = self._where.get(bus_id)
+        if where is not None and where[0] != route_id:
+            where = None
+        first_seen = self._pending.get(bus_id)
+        if first_seen is not None and first_seen[0] != route_id:
+            first_seen = None
+        last = where[2] if where is not None else first_seen[1] if first_seen is not None else None
+
+        direction = None
+        if heading is not None and speed > 0:
+            direction = line.direction(chainage, heading)
+        elif last is not None and abs(chainage - last) >= DIRECTION_EPSILON_KM:
+            direction = OUTBOUND if chainage > last else INBOUND
+        elif where is not None:
+            direction = where[1]
+        self.forget(bus_id)
+        if direction is None:
+            self._pending[bus_id] = first_seen or (route_id, chainage)
+            return
+
+        lane = self._lanes[route_id][direction]
+        self._where[bus_id] = (route_id, direction, chainage, speed)
+        index = bisect_right(lane.chainage, chainage)
+        lane.chainage.insert(index, chainage)
+        lane.ids.insert(index, bus_id)
+        ahead = lane.neighbour(index, direction)
+        behind = lane.neighbour(index, -direction)
+        self._link(lane, bus_id, lane.ids[ahead] if ahead is not None else None)
+        if behind is not None:
+            self._link(lane, lane.ids[behind], bus_id)
+
+    def forget(self, bus_id: str):
+        self._pending.pop(bus_id, None)
+        where = self._where.pop(bus_id, None)
+        if where is None:
+            return
+        route_id, direction, chainage, _ = where
+        lane = self._lanes[route_id][direction]
+        index = lane.index(bus_id, chainage)
+        ahead = lane.neighbour(index, direction)
+        behind = lane.neighbour(index, -direction)
+        ahead_id = lane.ids[ahead] if ahead is not None else None
+        behind_id = lane.ids[behind] if behind is not None else None
+        del lane.chainage[index]
+        del lane.ids[index]
+        self._link(lane, bus_id, None)
+        if behind_id is not None:
+            self._link(lane, behind_id, ahead_id)
+        if not lane.headways:
+            lane.total_minutes = 0.0
+
+    def _link(self, lane: _Lane, follower: str, leader: Optional[str]):
+        previous = lane.headways.pop(follower, None)
+        if previous is not None:
+            lane.total_minutes -= previous[1]
+        lane.bunched.pop(follower, None)
+        if leader is None:
+            return
+        _, _, chainage, speed = self._where[follower]
+        gap_km = abs(self._where[leader][2] - chainage)
+        minutes = gap_km / (speed if speed > 0 else DEFAULT_SPEED_KMH) * 60
+        lane.headways[follower] = (leader, minutes)
+        lane.total_minutes += minutes
+        if minutes < self.bunching_minutes:
+            lane.bunched[follower] = (leader, minutes)
+
+    def bunched(self, route_id: str) -> List[Dict]:
+        lanes = self._lanes.get(route_id, {})
+        return [
+            {"bus_id": bus_id, "ahead": ahead, "headway_minutes": round(minutes, 1),
+             "direction": DIRECTION_NAMES[direction]}
+            for direction, lane in lanes.items() for bus_id, (ahead, minutes) in lane.bunched.items()
+        ]
+
+    def summary(self, route_id: str) -> Optional[Dict]:
+        line = self.routes.get(route_id)
+        if line is None:
+            return None
+        directions = {}
+        for direction, lane in self._lanes[route_id].items():
+            pairs = len(lane.headways)
+            directions[DIRECTION_NAMES[direction]] = {
+                "buses": len(lane),
+                "mean_headway_minutes": round(lane.total_minutes / pairs, 1) if pairs else None,
+                "headways": {bus_id: {"ahead": ahead, "minutes": round(minutes, 1)}
+                             for bus_id, (ahead, minutes) in lane.headways.items()},
+            }
+        return {
+            "route_id": route_id,
+            "length_km": round(line.length_km, 2),
+            "directions": directions,
+            "bunched": self.bunched(route_id),
+        }
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from .metrics import Metrics, metrics as default_metrics
+
+logger = logging.getLogger("brtlive.ingest")
+
+
+class IngestPipeline:
+    """
+    Queue between the location endpoint and the tracking state.
+
+    The handler only validates and enqueues. A single worker drains the queue
+    in batches and hands them to the service, which archives every ping but
+    applies only the newest one per bus.
+    """
+
+    def __init__(self, service, max_queue: int, batch_size: int,
+                 metrics: Optional[Metrics] = None):
+        self.service = service
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.metrics = metrics or default_metrics
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        return self._queue
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, bus_id: str, location) -> bool:
+        try:
+            self.queue.put_nowait((bus_id, location, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.metrics.incr("ingest.rejected_queue_full")
+            return False
+        self.metrics.set_gauge("ingest.queue_depth", self.depth)
+        return True
+
+    def process_batch(self, batch: List[Tuple[str, object, float]]):
+        applied = self.service.apply_location_batch([(bus_id, location) for bus_id, location, _ in batch])
+
+        now = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            self.metrics.observe("ingest.lag", (now - enqueued_at) * 1000)
+        self.metrics.incr("ingest.pings", len(batch))
+        self.metrics.incr("ingest.coalesced", len(batch) - applied)
+        self.metrics.set_gauge("ingest.queue_depth", self.depth)
+
+    async def run(self):
+        queue = self.queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                self.process_batch(batch)
+            except Exception:
+                # Pings were already acked, so the worker must outlive a bad batch.
+                logger.exception("Failed to apply a batch of %d pings", len(batch))
+                self.metrics.incr("ingest.batch_errors")
+                self.metrics.incr("ingest.dropped", len(batch))
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def drain(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            await self.drain()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
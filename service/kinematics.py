@@ -0,0 +1,118 @@
+import math
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.utils.constants import (
+    KINEMATIC_ALPHA, KINEMATIC_BETA, KINEMATIC_MAX_JUMP_KM, KINEMATIC_RESET_SECONDS,
+    KINEMATIC_TRUSTED_ACCURACY_METERS, PING_IDLE_SPEED_KMH
+)
+
+DEGREE_KM = 111
+
+
+class _Track:
+    """
+    Filtered state of one bus, in km north and east with velocity in km/h
+    """
+
+    __slots__ = ("north", "east", "v_north", "v_east", "at", "speed", "heading")
+
+    def __init__(self, north: float, east: float, at: float, speed: float, heading: Optional[float]):
+        self.north, self.east, self.at = north, east, at
+        self.speed, self.heading = speed, heading
+        if speed > 0 and heading is not None:
+            self.v_north = speed * math.cos(math.radians(heading))
+            self.v_east = speed * math.sin(math.radians(heading))
+        else:
+            self.v_north = self.v_east = 0.0
+
+    def estimate(self) -> Tuple[float, float, float, Optional[float]]:
+        return self.north / DEGREE_KM, self.east / DEGREE_KM, self.speed, self.heading
+
+
+class KinematicFilter:
+    """
+    Position, speed and heading for every bus from its consecutive pings.
+
+    Each bus has an alpha-beta filter: the last estimate is moved forward by
+    its velocity to the new ping's time, then pulled towards the ping by
+    alpha while the velocity is corrected by beta. A ping costs O(1) and
+    only the latest state is kept. Pings with a poor accuracy_meters pull
+    less. After a gap longer than reset_seconds, or a jump further than
+    max_jump_km from the prediction, the bus starts again from the ping.
+
+    Speed and heading from the phone are passed through when it sends them;
+    otherwise the filtered velocity is used, with anything under
+    PING_IDLE_SPEED_KMH reported as stopped.
+    """
+
+    def __init__(self, alpha: float = KINEMATIC_ALPHA, beta: float = KINEMATIC_BETA,
+                 reset_seconds: float = KINEMATIC_RESET_SECONDS, max_jump_km: float = KINEMATIC_MAX_JUMP_KM):
+        self.alpha = alpha
+        self.beta = beta
+        self.reset_seconds = reset_seconds
+        self.max_jump_km = max_jump_km
+        self._tracks: Dict[str, _Track] = {}
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def forget(self, bus_id: str):
+        self._tracks.pop(bus_id, None)
+
+    def states(self) -> Iterator[Tuple[str, List]]:
+        """
+        Each bus's filter state as a plain list, for restore()
+        """
+        for bus_id, track in self._tracks.items():
+            yield bus_id, [getattr(track, name) for name in _Track.__slots__]
+
+    def restore(self, bus_id: str, state: List):
+        track = self._tracks[bus_id] = _Track.__new__(_Track)
+        for name, value in zip(_Track.__slots__, state):
+            setattr(track, name, value)
+
+    def observe(self, bus_id: str, latitude: float, longitude: float, at: float, speed: float,
+                heading: Optional[float] = None,
+                accuracy_meters: Optional[float] = None) -> Tuple[float, float, float, Optional[float]]:
+        """
+        Feed one ping (at in epoch seconds) and return the new estimate as
+        (latitude, longitude, speed_kmh, heading)
+        """
+        north, east = latitude * DEGREE_KM, longitude * DEGREE_KM
+        track = self._tracks.get(bus_id)
+        if track is None or at - track.at > self.reset_seconds:
+            track = self._tracks[bus_id] = _Track(north, east, at, speed, heading)
+            return track.estimate()
+        dt = at - track.at
+        if dt <= 0:
+            # Out of order or repeated; it says nothing about motion.
+            return track.estimate()
+
+        hours = dt / 3600
+        predicted_north = track.north + track.v_north * hours
+        predicted_east = track.east + track.v_east * hours
+        residual_north, residual_east = north - predicted_north, east - predicted_east
+        if math.hypot(residual_north, residual_east) > self.max_jump_km:
+            track = self._tracks[bus_id] = _Track(north, east, at, speed, heading)
+            return track.estimate()
+
+        gain = 1.0
+        if accuracy_meters and accuracy_meters > KINEMATIC_TRUSTED_ACCURACY_METERS:
+            gain = KINEMATIC_TRUSTED_ACCURACY_METERS / accuracy_meters
+        alpha, beta = self.alpha * gain, self.beta * gain
+        track.north = predicted_north + alpha * residual_north
+        track.east = predicted_east + alpha * residual_east
+        track.v_north += beta * residual_north / hours
+        track.v_east += beta * residual_east / hours
+        track.at = at
+
+        moving = math.hypot(track.v_north, track.v_east)
+        if speed > 0:
+            track.speed = speed
+        else:
+            track.speed = moving if moving >= PING_IDLE_SPEED_KMH else 0.0
+        if heading is not None:
+            track.heading = heading
+        elif moving >= PING_IDLE_SPEED_KMH:
+            track.heading = math.degrees(math.atan2(track.v_east, track.v_north)) % 360
+        return track.estimate()
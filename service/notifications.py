@@ -0,0 +1,260 @@
+import itertools
+import logging
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from app.utils.constants import DEFAULT_NOTIFICATION_WINDOW, NOTIFICATION_LOG_SIZE
+from .metrics import metrics
+
+logger = logging.getLogger("brtlive.notifications")
+
+DEGREE_KM = 111
+DEFAULT_SPEED_KMH = 30
+
+
+class Subscription(BaseModel):
+    subscription_id: int
+    terminal_id: str
+    route_id: Optional[str] = None
+    threshold_minutes: int = DEFAULT_NOTIFICATION_WINDOW
+    created_at: datetime = Field(default_factory=datetime.now)
+
+
+class ArrivalNotification(BaseModel):
+    subscription_id: int
+    terminal_id: str
+    route_id: Optional[str] = None
+    bus_id: str
+    eta_minutes: int
+    threshold_minutes: int
+    sent_at: datetime = Field(default_factory=datetime.now)
+
+
+class NotificationSink(ABC):
+    """
+    Delivers arrival notifications. Subclass and implement send() for push,
+    SMS or a message queue.
+    """
+
+    @abstractmethod
+    def send(self, notifications: List[ArrivalNotification]):
+        ...
+
+
+class InMemorySink(NotificationSink):
+    """
+    Keeps the most recent notifications in process, for tests and development
+    """
+
+    def __init__(self, max_size: int = NOTIFICATION_LOG_SIZE):
+        self.sent: deque = deque(maxlen=max_size)
+
+    def send(self, notifications: List[ArrivalNotification]):
+        self.sent.extend(notifications)
+
+
+class _ThresholdList:
+    """
+    Subscription ids sorted by threshold, with parallel lists so bisect can
+    find every threshold in a range
+    """
+
+    def __init__(self):
+        self.thresholds: List[int] = []
+        self.ids: List[int] = []
+
+    def add(self, threshold: int, subscription_id: int):
+        index = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(index, threshold)
+        self.ids.insert(index, subscription_id)
+
+    def remove(self, threshold: int, subscription_id: int):
+        index = bisect_left(self.thresholds, threshold)
+        index = self.ids.index(subscription_id, index, bisect_right(self.thresholds, threshold))
+        del self.thresholds[index]
+        del self.ids[index]
+
+    def crossed(self, previous: int, current: int) -> List[int]:
+        """
+        Ids whose threshold t satisfies current <= t < previous
+        """
+        return self.ids[bisect_left(self.thresholds, current):bisect_left(self.thresholds, previous)]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def below(self, minutes: int) -> Optional[int]:
+        """
+        Largest threshold under minutes, if any
+        """
+        index = bisect_left(self.thresholds, minutes)
+        return self.thresholds[index - 1] if index else None
+
+    @property
+    def largest(self) -> int:
+        return self.thresholds[-1]
+
+
+class ArrivalNotifier:
+    """
+    Rider subscriptions of the form "tell me when a bus (on this route) is
+    within N minutes of this terminal".
+
+    Subscriptions are grouped by terminal and route and sorted by threshold.
+    On each ping the bus's ETA to every terminal it could trigger is computed
+    in one vectorised pass, and only terminals within their largest threshold
+    are kept. A bus's ETA falling from `previous` to `current` notifies
+    exactly the subscriptions with current <= threshold < previous. The first
+    ping seen for a bus only sets its baseline, so a bus leaving a terminal
+    does not notify that terminal's subscribers.
+    """
+
+    def __init__(self, terminals: Dict, sink: Optional[NotificationSink] = None):
+        self.terminals = terminals
+        self.sink = sink or InMemorySink()
+        self.subscriptions: Dict[int, Subscription] = {}
+        # terminal -> route (None for any route) -> thresholds
+        self._lists: Dict[str, Dict[Optional[str], _ThresholdList]] = {}
+        # route -> terminals with at least one subscription for it
+        self._terminals: Dict[Optional[str], Set[str]] = {}
+        # bus route -> (terminal ids, latitudes, longitudes, largest threshold), rebuilt on change
+        self._targets: Dict[Optional[str], Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]] = {}
+        # bus -> terminal -> last ETA in minutes, only for terminals within their largest threshold
+        self._etas: Dict[str, Dict[str, int]] = {}
+        # bus -> minutes its ETA must still fall before it can cross any threshold
+        self._lead: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self.subscriptions)
+
+    def subscribe(self, terminal_id: str, route_id: Optional[str] = None,
+                  threshold_minutes: int = DEFAULT_NOTIFICATION_WINDOW) -> Subscription:
+        subscription = Subscription(subscription_id=next(self._ids), terminal_id=terminal_id,
+                                    route_id=route_id, threshold_minutes=threshold_minutes)
+        by_route = self._lists.setdefault(terminal_id, {})
+        by_route.setdefault(route_id, _ThresholdList()).add(threshold_minutes, subscription.subscription_id)
+        self._terminals.setdefault(route_id, set()).add(terminal_id)
+        self.subscriptions[subscription.subscription_id] = subscription
+        self._targets.clear()
+        return subscription
+
+    def unsubscribe(self, subscription_id: int) -> Optional[Subscription]:
+        subscription = self.subscriptions.pop(subscription_id, None)
+        if subscription is None:
+            return None
+        terminal_id, route_id = subscription.terminal_id, subscription.route_id
+        by_route = self._lists[terminal_id]
+        thresholds = by_route[route_id]
+        thresholds.remove(subscription.threshold_minutes, subscription_id)
+        if not thresholds:
+            del by_route[route_id]
+            self._terminals[route_id].discard(terminal_id)
+            if not self._terminals[route_id]:
+                del self._terminals[route_id]
+            if not by_route:
+                del self._lists[terminal_id]
+        self._targets.clear()
+        return subscription
+
+    def refresh_terminals(self):
+        """
+        Pick up terminals that were added or moved since the last ping
+        """
+        self._targets.clear()
+
+    def _build_targets(self, route_id: Optional[str]) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        terminal_ids = set(self._terminals.get(None, ()))
+        if route_id is not None:
+            terminal_ids.update(self._terminals.get(route_id, ()))
+        ids = [tid for tid in terminal_ids if tid in self.terminals]
+        reach = [max(self._lists[tid][key].largest for key in (None, route_id) if key in self._lists[tid])
+                 for tid in ids]
+        targets = self._targets[route_id] = (
+            ids,
+            np.fromiter((self.terminals[tid].latitude for tid in ids), float, len(ids)),
+            np.fromiter((self.terminals[tid].longitude for tid in ids), float, len(ids)),
+            np.array(reach, dtype=np.int64),
+        )
+        return targets
+
+    def observe(self, bus_id: str, route_id: Optional[str], latitude: float, longitude: float,
+                speed: float) -> int:
+        """
+        Update the bus's ETAs from a new position and notify the
+        subscriptions it crossed. Returns how many were notified.
+        """
+        targets = self._targets.get(route_id)
+        if targets is None:
+            targets = self._build_targets(route_id)
+        ids, lat, lon, reach = targets
+
+        # Same flat-earth ETA as BusTrackingService.estimate_eta.
+        speed = speed if speed > 0 else DEFAULT_SPEED_KMH
+        eta = (np.hypot(lat - latitude, lon - longitude) * (DEGREE_KM * 60 / speed)).astype(np.int64)
+        within = eta <= reach
+        near = {ids[i]: int(eta[i]) for i in np.flatnonzero(within)}
+        last = self._etas.get(bus_id)
+        self._etas[bus_id] = near
+        self._lead[bus_id] = self._next_crossing(route_id, near, (eta - reach)[~within])
+        if last is None:
+            return 0
+
+        sent = []
+        for terminal_id, current in near.items():
+            # A terminal missing from last was beyond all of its thresholds.
+            previous = last.get(terminal_id, math.inf)
+            if current >= previous:
+                continue
+            by_route = self._lists[terminal_id]
+            for key in (None, route_id) if route_id is not None else (None,):
+                thresholds = by_route.get(key)
+                if thresholds is None:
+                    continue
+                for subscription_id in thresholds.crossed(previous, current):
+                    subscription = self.subscriptions[subscription_id]
+                    sent.append(ArrivalNotification(
+                        subscription_id=subscription_id, terminal_id=terminal_id, route_id=key,
+                        bus_id=bus_id, eta_minutes=current, threshold_minutes=subscription.threshold_minutes
+                    ))
+
+        if sent:
+            # Runs inline with the ping, so a failing sink must not fail it.
+            try:
+                self.sink.send(sent)
+            except Exception:
+                logger.exception("Notification sink failed to send %d notifications", len(sent))
+                metrics.incr("notifications.failed", len(sent))
+            else:
+                metrics.incr("notifications.sent", len(sent))
+        return len(sent)
+
+    def _next_crossing(self, route_id: Optional[str], near: Dict[str, int], beyond: np.ndarray) -> Optional[int]:
+        lead = int(beyond.min()) if len(beyond) else None
+        keys = (None, route_id) if route_id is not None else (None,)
+        for terminal_id, current in near.items():
+            by_route = self._lists[terminal_id]
+            for key in keys:
+                thresholds = by_route.get(key)
+                below = thresholds.below(current) if thresholds is not None else None
+                if below is not None and (lead is None or current - below < lead):
+                    lead = current - below
+        return lead
+
+    def minutes_to_next_crossing(self, bus_id: str) -> Optional[int]:
+        """
+        How many minutes the bus's ETA must fall, as of its last ping, before
+        it crosses some subscriber's threshold. None if it can't.
+        """
+        return self._lead.get(bus_id)
+
+    def forget(self, bus_id: str):
+        self._etas.pop(bus_id, None)
+        self._lead.pop(bus_id, None)
@@ -0,0 +1,57 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Set
+
+
+class TerminalOccupancy:
+    """
+    Buses currently at one terminal, in arrival order.
+
+    Membership, arrival and departure are O(1); iteration yields the
+    dispatch queue (first bus in first). Buses dispatched while still inside
+    the terminal radius are held back from re-joining until they leave it.
+    """
+
+    def __init__(self, bus_ids: Iterable[str] = ()):
+        self._queue: "OrderedDict[str, datetime]" = OrderedDict()
+        self._departing: Set[str] = set()
+        now = datetime.now()
+        for bus_id in bus_ids:
+            self._queue[bus_id] = now
+
+    def __contains__(self, bus_id: str) -> bool:
+        return bus_id in self._queue
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._queue)
+
+    def arrive(self, bus_id: str, at: Optional[datetime] = None) -> bool:
+        """
+        Returns True if the bus joined the queue
+        """
+        if bus_id in self._queue or bus_id in self._departing:
+            return False
+        self._queue[bus_id] = at or datetime.now()
+        return True
+
+    def leave(self, bus_id: str) -> bool:
+        """
+        The bus moved out of the terminal radius. Returns True if it was queued.
+        """
+        self._departing.discard(bus_id)
+        return self._queue.pop(bus_id, None) is not None
+
+    def dispatch(self, bus_id: str) -> bool:
+        if self._queue.pop(bus_id, None) is None:
+            return False
+        self._departing.add(bus_id)
+        return True
+
+    def arrived_at(self, bus_id: str) -> Optional[datetime]:
+        return self._queue.get(bus_id)
+
+    def queue(self) -> List[str]:
+        return list(self._queue)
@@ -0,0 +1,67 @@
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.utils.constants import (
+    CLOSE_PROXIMITY_METERS, GPS_UPDATE_INTERVAL_SECONDS, PING_INTERVAL_NEAR_SECONDS,
+    PING_INTERVAL_MAX_SECONDS, PING_INTERVAL_IDLE_SECONDS, PING_INTERVAL_ETA_FRACTION, PING_IDLE_SPEED_KMH
+)
+
+DEGREE_KM = 111
+
+
+class PingIntervalAdvisor:
+    """
+    Recommends how long a driver's phone should wait before its next ping.
+
+    Buses parked at a terminal or in maintenance ping rarely, and buses within
+    CLOSE_PROXIMITY_METERS of a terminal ping often so arrivals are caught
+    promptly. Elsewhere the interval is a fixed fraction of the time to the
+    nearest terminal, so the age of the last position stays small relative
+    to the ETA built from it. When riders have subscribed, the next ping is
+    also due no later than the bus's ETA can reach one of their thresholds.
+    """
+
+    def __init__(self, terminals: Dict):
+        self.terminals = terminals
+        self._coords: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def refresh_terminals(self):
+        self._coords = None
+
+    def nearest_terminal_km(self, latitude: float, longitude: float) -> float:
+        if self._coords is None:
+            terminals = list(self.terminals.values())
+            self._coords = (
+                np.fromiter((t.latitude for t in terminals), float, len(terminals)),
+                np.fromiter((t.longitude for t in terminals), float, len(terminals)),
+            )
+        lat, lon = self._coords
+        if not len(lat):
+            return math.inf
+        # Same flat-earth distance as BusTrackingService._eta
+        return float(np.hypot(lat - latitude, lon - longitude).min()) * DEGREE_KM
+
+    def advise(self, status: str, latitude: float, longitude: float, speed: float,
+               crossing_minutes: Optional[int] = None) -> int:
+        """
+        crossing_minutes is how far the bus's ETA must fall before some
+        subscribed rider is notified (ArrivalNotifier.minutes_to_next_crossing)
+        """
+        if status == "maintenance":
+            return PING_INTERVAL_IDLE_SECONDS
+        moving = speed >= PING_IDLE_SPEED_KMH
+        if status == "available" and not moving:
+            return PING_INTERVAL_IDLE_SECONDS
+
+        dist_km = self.nearest_terminal_km(latitude, longitude)
+        if dist_km * 1000 <= CLOSE_PROXIMITY_METERS:
+            return PING_INTERVAL_NEAR_SECONDS
+        if not moving:
+            return GPS_UPDATE_INTERVAL_SECONDS
+        eta_seconds = dist_km / speed * 3600
+        interval = min(PING_INTERVAL_MAX_SECONDS, max(PING_INTERVAL_NEAR_SECONDS, eta_seconds * PING_INTERVAL_ETA_FRACTION))
+        if crossing_minutes is not None:
+            interval = min(interval, max(PING_INTERVAL_NEAR_SECONDS, crossing_minutes * 60))
+        return int(interval)
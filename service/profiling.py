@@ -0,0 +1,196 @@
+import cProfile
+import functools
+import heapq
+import itertools
+import json
+import logging
+import pstats
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.utils.constants import (
+    PROFILE_STORE_SIZE, PROFILE_TOP_FUNCTIONS, SLOW_REQUEST_THRESHOLD_MS, SLOW_REQUEST_LOG_SIZE
+)
+
+slow_request_logger = logging.getLogger("brtlive.slow_requests")
+
+# Per-request service call timings: name -> [total_ms, calls]
+_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("service_timings", default=None)
+
+
+def timed(name: str) -> Callable:
+    """
+    Add the call's duration to the current request's service timings.
+    Costs two clock reads when a request is being timed and nothing otherwise.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timings = _timings.get()
+            if timings is None:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                entry = timings.get(name)
+                if entry is None:
+                    entry = timings[name] = [0.0, 0]
+                entry[0] += (time.perf_counter() - start) * 1000
+                entry[1] += 1
+        return wrapper
+    return decorator
+
+
+def _top_functions(profile: cProfile.Profile, limit: int) -> List[Dict]:
+    stats = pstats.Stats(profile).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{filename}:{line}({func})",
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, line, func), (_, calls, total, cumulative, _) in rows
+    ]
+
+
+class RequestProfiler:
+    """
+    Admin-controlled request profiling and slow-request logging.
+
+    While enabled, a sample of requests to the chosen route templates runs
+    under cProfile and the slowest max_profiles are kept. Only one request is
+    profiled at a time; because the event loop is shared, a profile can also
+    include work from requests that ran concurrently with it.
+
+    Every request slower than slow_threshold_ms is logged as one JSON line with
+    its service call timings, and kept in a bounded in-memory log.
+    """
+
+    def __init__(self, max_profiles: int = PROFILE_STORE_SIZE,
+                 slow_threshold_ms: float = SLOW_REQUEST_THRESHOLD_MS,
+                 slow_log_size: int = SLOW_REQUEST_LOG_SIZE,
+                 top_functions: int = PROFILE_TOP_FUNCTIONS):
+        self.max_profiles = max_profiles
+        self.slow_threshold_ms = slow_threshold_ms
+        self.top_functions = top_functions
+        self.routes: frozenset = frozenset()
+        self._patterns: List[Tuple[str, "re.Pattern"]] = []
+        self.sample_rate = 1.0
+        self.slow_requests: deque = deque(maxlen=slow_log_size)
+        self._profiles: List = []  # min-heap of (duration_ms, id, profile)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._busy = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.routes)
+
+    def enable(self, routes: Iterable[str], sample_rate: float = 1.0):
+        """
+        routes are path templates as declared on the routers, e.g.
+        /api/terminals/{terminal_id}/dashboard
+        """
+        self.routes = frozenset(routes)
+        self._patterns = [
+            (route, re.compile("[^/]+".join(map(re.escape, re.split(r"\{[^/}]+\}", route))) + "$"))
+            for route in self.routes
+        ]
+        self.sample_rate = sample_rate
+
+    def disable(self):
+        self.routes = frozenset()
+        self._patterns = []
+
+    def match_route(self, path: str) -> Optional[str]:
+        for route, pattern in self._patterns:
+            if pattern.match(path):
+                return route
+        return None
+
+    def begin(self) -> object:
+        return _timings.set({})
+
+    def start_profile(self, route: Optional[str]) -> Optional[cProfile.Profile]:
+        if route not in self.routes or random.random() >= self.sample_rate:
+            return None
+        with self._lock:
+            if self._busy:
+                return None
+            self._busy = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, token, method: str, route: str, status: int, duration_ms: float,
+               profile: Optional[cProfile.Profile] = None):
+        timings = _timings.get() or {}
+        _timings.reset(token)
+
+        if profile is not None:
+            profile.disable()
+            self._store(route, method, duration_ms, timings, profile)
+            with self._lock:
+                self._busy = False
+
+        if duration_ms >= self.slow_threshold_ms:
+            entry = {
+                "at": datetime.now().isoformat(),
+                "method": method,
+                "route": route,
+                "status": status,
+                "duration_ms": round(duration_ms, 2),
+                "service_ms": {name: round(total, 3) for name, (total, _) in timings.items()},
+                "service_calls": {name: int(calls) for name, (_, calls) in timings.items()},
+            }
+            self.slow_requests.append(entry)
+            slow_request_logger.warning(json.dumps(entry, separators=(",", ":")))
+
+    def _store(self, route: str, method: str, duration_ms: float, timings: Dict, profile: cProfile.Profile):
+        with self._lock:
+            if len(self._profiles) >= self.max_profiles and duration_ms <= self._profiles[0][0]:
+                return
+        record = {
+            "id": next(self._ids),
+            "at": datetime.now().isoformat(),
+            "method": method,
+            "route": route,
+            "duration_ms": round(duration_ms, 2),
+            "service_ms": {name: round(total, 3) for name, (total, _) in timings.items()},
+            "functions": _top_functions(profile, self.top_functions),
+        }
+        with self._lock:
+            item = (duration_ms, record["id"], record)
+            if len(self._profiles) < self.max_profiles:
+                heapq.heappush(self._profiles, item)
+            else:
+                heapq.heappushpop(self._profiles, item)
+
+    def profiles(self) -> List[Dict]:
+        """
+        Stored profiles, slowest first, without the function breakdown
+        """
+        with self._lock:
+            records = [record for _, _, record in sorted(self._profiles, reverse=True)]
+        return [{k: v for k, v in record.items() if k != "functions"} for record in records]
+
+    def get_profile(self, profile_id: int) -> Optional[Dict]:
+        with self._lock:
+            for _, _, record in self._profiles:
+                if record["id"] == profile_id:
+                    return record
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+        self.slow_requests.clear()
@@ -0,0 +1,111 @@
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from .metrics import Metrics, metrics as default_metrics
+
+
+SHED_NONE = 0
+SHED_HISTORY = 1
+SHED_ANALYTICS = 2
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket per key (bus id, phone number, ...).
+    Buckets are kept in an LRU capped at max_keys so memory stays bounded;
+    an evicted key simply starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def allow(self, key: str, now: Optional[float] = None) -> bool:
+        now = self.clock() if now is None else now
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+            bucket = self._buckets[key] = [self.burst, now]
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True
+        return False
+
+    def retry_after(self, key: str) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket[0] >= 1:
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+
+class OverloadGuard:
+    """
+    Tracks in-flight requests and a smoothed ingest latency and turns them
+    into a shed level. Work is dropped lowest priority first:
+    history appends, then analytics. Position updates are never shed.
+    """
+
+    def __init__(self, history_latency_ms: float, analytics_latency_ms: float,
+                 max_in_flight: int, smoothing: float = 0.2,
+                 metrics: Optional[Metrics] = None):
+        self.history_latency_ms = history_latency_ms
+        self.analytics_latency_ms = analytics_latency_ms
+        self.max_in_flight = max_in_flight
+        self.smoothing = smoothing
+        self.metrics = metrics or default_metrics
+        self.in_flight = 0
+        self.latency_ms = 0.0
+        self.level = SHED_NONE
+
+    def enter(self):
+        self.in_flight += 1
+        self._update_level()
+
+    def exit(self):
+        self.in_flight -= 1
+        self._update_level()
+
+    def record_ingest(self, duration_ms: float):
+        self.latency_ms += self.smoothing * (duration_ms - self.latency_ms)
+        self.metrics.observe("ingest", duration_ms)
+        self._update_level()
+
+    def allow_history(self) -> bool:
+        if self.level >= SHED_HISTORY:
+            self.metrics.incr("shed.history")
+            return False
+        return True
+
+    def allow_analytics(self) -> bool:
+        if self.level >= SHED_ANALYTICS:
+            self.metrics.incr("shed.analytics")
+            return False
+        return True
+
+    def _update_level(self):
+        if self.latency_ms >= self.analytics_latency_ms or self.in_flight >= self.max_in_flight:
+            level = SHED_ANALYTICS
+        elif self.latency_ms >= self.history_latency_ms or self.in_flight >= self.max_in_flight // 2:
+            level = SHED_HISTORY
+        else:
+            level = SHED_NONE
+
+        if level != self.level:
+            self.level = level
+            self.metrics.set_gauge("overload.level", level)
+        self.metrics.set_gauge("overload.in_flight", self.in_flight)
@@ -0,0 +1,192 @@
+"""
+Terminal-to-terminal rebalancing plans.
+
+SciPy is an optional extra (pip install scipy) used for the exact transport
+solver; without it every plan is filled greedily, cheapest move first.
+"""
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from scipy import sparse
+    from scipy.optimize import linprog
+except ImportError:
+    sparse = linprog = None
+
+from app.utils.constants import (
+    ETA_HORIZON_MINUTES, WAIT_WITH_BUS_MINUTES, WAIT_NO_BUS_MINUTES,
+    REBALANCE_MIN_BUSES_PER_TERMINAL, REBALANCE_AVERAGE_SPEED_KMH, REBALANCE_MAX_TRANSPORT_CELLS,
+    REBALANCE_SOLVER_TIME_LIMIT_SECONDS
+)
+from .profiling import timed
+
+EARTH_RADIUS_KM = 6371
+DEGREE_KM = 111
+
+
+def haversine_matrix(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distance in km between every point in 1 and every point in 2
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    dlat = lat2[None, :] - lat1[:, None]
+    dlon = lon2[None, :] - lon1[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def solve_transport(cost: np.ndarray, supply: np.ndarray, demand: np.ndarray) -> Tuple[List[Tuple[int, int, int]], str]:
+    """
+    Move min(sum(supply), sum(demand)) units at minimum total cost.
+    Returns [(row, column, units)] and the solver used.
+
+    With SciPy the terminal-to-terminal transport problem is solved exactly
+    as a linear program, one variable per (row, column) cell; otherwise, past
+    REBALANCE_MAX_TRANSPORT_CELLS, or when the solver runs out of
+    REBALANCE_SOLVER_TIME_LIMIT_SECONDS, cells are filled cheapest first.
+    """
+    if linprog is not None and cost.size <= REBALANCE_MAX_TRANSPORT_CELLS:
+        flows = _solve_transport_lp(cost, supply, demand)
+        if flows is not None:
+            return flows, "transport"
+    return _solve_transport_greedy(cost, supply, demand), "greedy"
+
+
+def _solve_transport_lp(cost: np.ndarray, supply: np.ndarray, demand: np.ndarray) -> Optional[List[Tuple[int, int, int]]]:
+    """
+    The smaller side is moved in full and the larger one is an upper bound,
+    which keeps the constraint matrix totally unimodular, so the simplex
+    vertex is integral. None if the solver fails or runs out of time.
+    """
+    n_rows, n_cols = cost.shape
+    cells = np.arange(n_rows * n_cols)
+    by_row = sparse.csr_matrix((np.ones(cells.size), (cells // n_cols, cells)), shape=(n_rows, cells.size))
+    by_col = sparse.csr_matrix((np.ones(cells.size), (cells % n_cols, cells)), shape=(n_cols, cells.size))
+    if supply.sum() <= demand.sum():
+        bounds = dict(A_eq=by_row, b_eq=supply, A_ub=by_col, b_ub=demand)
+    else:
+        bounds = dict(A_eq=by_col, b_eq=demand, A_ub=by_row, b_ub=supply)
+    result = linprog(cost.ravel(), bounds=(0, None), method="highs-ds",
+                     options={"time_limit": REBALANCE_SOLVER_TIME_LIMIT_SECONDS}, **bounds)
+    if result.status != 0:
+        return None
+    units = np.rint(result.x).astype(np.int64)
+    return [(int(cell // n_cols), int(cell % n_cols), int(units[cell])) for cell in np.flatnonzero(units)]
+
+
+def _solve_transport_greedy(cost: np.ndarray, supply: np.ndarray, demand: np.ndarray) -> List[Tuple[int, int, int]]:
+    supply, demand = supply.copy(), demand.copy()
+    remaining = min(int(supply.sum()), int(demand.sum()))
+    flows = []
+    n_cols = cost.shape[1]
+    for cell in np.argsort(cost, axis=None, kind="stable"):
+        if remaining == 0:
+            break
+        i, j = divmod(int(cell), n_cols)
+        units = min(supply[i], demand[j])
+        if units:
+            flows.append((i, j, int(units)))
+            supply[i] -= units
+            demand[j] -= units
+            remaining -= units
+    return flows
+
+
+@timed("rebalance")
+def plan_rebalance(service, min_buses: int = REBALANCE_MIN_BUSES_PER_TERMINAL,
+                   speed_kmh: float = REBALANCE_AVERAGE_SPEED_KMH) -> Dict:
+    """
+    Propose bus moves from terminals with a surplus to terminals short of buses.
+
+    Each terminal's target is its share of the fleet in proportion to
+    total_capacity (at least min_buses). Available, non-stale buses above
+    the target are surplus; in-transit buses count towards the terminal they
+    will reach first. Moves minimise travel time minus the wait relieved at
+    the destination, so the longest waits are served first when there are
+    not enough spare buses.
+    """
+    started = time.perf_counter()
+    terminal_ids = list(service.terminals)
+    terminals = [service.terminals[tid] for tid in terminal_ids]
+    n = len(terminals)
+    if n == 0:
+        return {"generated_at": datetime.now(), "moves": [], "terminals": [], "unmet_demand": 0,
+                "solver": None, "compute_ms": 0.0}
+
+    lat = np.fromiter((t.latitude for t in terminals), float, n)
+    lon = np.fromiter((t.longitude for t in terminals), float, n)
+    capacity = np.fromiter((t.total_capacity for t in terminals), float, n)
+
+    stale = service.stale_detector.is_stale
+    spare: List[List[str]] = [
+        [bid for bid in service.occupancy[tid]
+         if bid in service.buses and not stale(bid) and service._bus_status(bid) == "available"]
+        for tid in terminal_ids
+    ]
+    available = np.fromiter((len(buses) for buses in spare), np.int64, n)
+
+    # Same flat-earth ETA as BusTrackingService.estimate_eta, for every bus and terminal at once.
+    _, bus_lat, bus_lon, bus_speed = service.transit_positions()
+    bus_lat, bus_lon, bus_speed = (np.asarray(column, dtype=float) for column in (bus_lat, bus_lon, bus_speed))
+    incoming = np.zeros(n, np.int64)
+    first_eta = np.full(n, np.inf)
+    if len(bus_lat):
+        dist_km = np.hypot(bus_lat[:, None] - lat[None, :], bus_lon[:, None] - lon[None, :]) * DEGREE_KM
+        speed = np.where(bus_speed > 0, bus_speed, 30)
+        eta = np.floor(dist_km / speed[:, None] * 60)
+        nearest = eta.argmin(axis=1)
+        reachable = eta[np.arange(len(nearest)), nearest] < ETA_HORIZON_MINUTES
+        incoming = np.bincount(nearest[reachable], minlength=n)
+        first_eta = eta.min(axis=0)
+
+    wait = np.where(available > 0, WAIT_WITH_BUS_MINUTES,
+                    np.where(first_eta < ETA_HORIZON_MINUTES, first_eta, WAIT_NO_BUS_MINUTES))
+
+    pool = int(available.sum() + incoming.sum())
+    target = np.maximum(min_buses, np.floor(capacity * pool / max(capacity.sum(), 1))).astype(np.int64)
+    surplus = np.clip(available - target, 0, None)
+    deficit = np.clip(target - available - incoming, 0, None)
+
+    sources = np.flatnonzero(surplus)
+    sinks = np.flatnonzero(deficit)
+    moves = []
+    solver = None
+    if len(sources) and len(sinks):
+        travel = haversine_matrix(lat[sources], lon[sources], lat[sinks], lon[sinks]) / speed_kmh * 60
+        flows, solver = solve_transport(travel - wait[sinks][None, :], surplus[sources], deficit[sinks])
+        for i, j, units in flows:
+            origin, destination = sources[i], sinks[j]
+            # Leave the front of the origin's dispatch queue alone.
+            for _ in range(units):
+                moves.append({
+                    "bus_id": spare[origin].pop(),
+                    "from_terminal": terminal_ids[origin],
+                    "to_terminal": terminal_ids[destination],
+                    "travel_minutes": round(float(travel[i, j]), 1),
+                    "destination_wait_minutes": int(wait[destination]),
+                })
+
+    moves.sort(key=lambda move: (-move["destination_wait_minutes"], move["travel_minutes"]))
+    short = np.flatnonzero(surplus | deficit)
+    return {
+        "generated_at": datetime.now(),
+        "moves": moves,
+        "terminals": [
+            {
+                "terminal_id": terminal_ids[k],
+                "available": int(available[k]),
+                "incoming": int(incoming[k]),
+                "target": int(target[k]),
+                "surplus": int(surplus[k]),
+                "deficit": int(deficit[k]),
+                "wait_minutes": int(wait[k]),
+            }
+            for k in short
+        ],
+        "unmet_demand": int(deficit.sum()) - len(moves),
+        "solver": solver,
+        "compute_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -0,0 +1,354 @@
+import asyncio
+import glob
+import gzip
+import json
+import math
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.utils.constants import (
+    REPORT_DIR, REPORT_MAX_FINISHED_JOBS, REPORT_SHIFT_GAP_SECONDS, REPORT_WORKERS, TRACE_DIR,
+    TERMINAL_ARRIVAL_RADIUS_DEGREES
+)
+from app.utils.helpers import generate_shift_summary
+from .metrics import metrics
+from .trace import LOCATION, ARCHIVED, TERMINAL
+
+EARTH_RADIUS_KM = 6371
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class _TerminalGrid:
+    """
+    Terminals bucketed by presence radius so each ping checks at most nine cells
+    """
+
+    def __init__(self, radius: float = TERMINAL_ARRIVAL_RADIUS_DEGREES):
+        self.radius = radius
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float]]] = {}
+
+    def add(self, latitude: float, longitude: float):
+        key = (math.floor(latitude / self.radius), math.floor(longitude / self.radius))
+        self._cells.setdefault(key, []).append((latitude, longitude))
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        x, y = math.floor(latitude / self.radius), math.floor(longitude / self.radius)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for lat, lon in self._cells.get((x + dx, y + dy), ()):
+                    if ((latitude - lat) ** 2 + (longitude - lon) ** 2) ** 0.5 <= self.radius:
+                        return True
+        return False
+
+
+class _Shift:
+    __slots__ = ("bus_id", "driver_phone", "start", "end", "first_lat", "first_lon", "lat", "lon", "at_terminal",
+                 "distance_km", "terminal_seconds", "transit_seconds", "pings")
+
+    def __init__(self, bus_id: str, driver_phone: str, at: datetime, lat: float, lon: float, at_terminal: bool):
+        self.bus_id = bus_id
+        self.driver_phone = driver_phone
+        self.start = self.end = at
+        self.first_lat, self.first_lon = lat, lon
+        self.lat, self.lon = lat, lon
+        self.at_terminal = at_terminal
+        self.distance_km = 0.0
+        self.terminal_seconds = 0.0
+        self.transit_seconds = 0.0
+        self.pings = 1
+
+    def add(self, at: datetime, lat: float, lon: float, at_terminal: bool):
+        seconds = (at - self.end).total_seconds()
+        # Time between two pings counts where the bus was at the first one.
+        if self.at_terminal:
+            self.terminal_seconds += seconds
+        else:
+            self.transit_seconds += seconds
+        self.distance_km += haversine_km(self.lat, self.lon, lat, lon)
+        self.end, self.lat, self.lon, self.at_terminal = at, lat, lon, at_terminal
+        self.pings += 1
+
+    def continues(self, other: "_Shift", gap_seconds: float) -> bool:
+        """
+        Whether other, from a later trace file, is the same shift carried on
+        """
+        return (other.driver_phone == self.driver_phone and other.start >= self.end
+                and (other.start - self.end).total_seconds() <= gap_seconds)
+
+    def join(self, other: "_Shift"):
+        seconds = (other.start - self.end).total_seconds()
+        if self.at_terminal:
+            self.terminal_seconds += seconds
+        else:
+            self.transit_seconds += seconds
+        self.distance_km += haversine_km(self.lat, self.lon, other.first_lat, other.first_lon) + other.distance_km
+        self.terminal_seconds += other.terminal_seconds
+        self.transit_seconds += other.transit_seconds
+        self.end, self.lat, self.lon, self.at_terminal = other.end, other.lat, other.lon, other.at_terminal
+        self.pings += other.pings
+
+    def summary(self) -> Dict:
+        summary = generate_shift_summary(self.start, self.end)
+        summary.update({
+            "bus_id": self.bus_id,
+            "driver_phone": self.driver_phone,
+            "distance_km": round(self.distance_km, 3),
+            "terminal_minutes": round(self.terminal_seconds / 60, 1),
+            "transit_minutes": round(self.transit_seconds / 60, 1),
+            "pings": self.pings,
+        })
+        return summary
+
+
+def split_traces(paths: List[str], parts: int) -> List[List[str]]:
+    """
+    Split time-ordered trace files into at most `parts` contiguous runs of
+    about the same compressed size, so each file is read by one worker
+    """
+    sizes = [os.path.getsize(path) for path in paths]
+    share = sum(sizes) / max(parts, 1)
+    runs: List[List[str]] = [[]]
+    filled = 0.0
+    for path, size in zip(paths, sizes):
+        if runs[-1] and filled >= share * len(runs) and len(runs) < parts:
+            runs.append([])
+        runs[-1].append(path)
+        filled += size
+    return [run for run in runs if run]
+
+
+def summarize_traces(paths: List[str], day: Optional[str] = None,
+                     gap_seconds: float = REPORT_SHIFT_GAP_SECONDS) -> List[_Shift]:
+    """
+    Shifts found in a contiguous run of trace files, streamed line by line.
+
+    Runs in a worker process. A shift is a run of pings from one phone on
+    one bus with no gap longer than gap_seconds. Shifts still open at the
+    end of the run are returned as they are; merge_shifts joins them with
+    their continuation in the next run.
+    """
+    terminals = _TerminalGrid()
+    open_shifts: Dict[str, _Shift] = {}
+    closed: List[_Shift] = []
+
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                head = line.split(",", 3)
+                if len(head) < 4:
+                    continue
+                kind = head[1].strip('"')
+                if kind == TERMINAL:
+                    terminal = json.loads(line)[2]
+                    terminals.add(terminal["latitude"], terminal["longitude"])
+                    continue
+                if kind not in (LOCATION, ARCHIVED):
+                    continue
+
+                bus_id, phone, lat, lon, _, ts = json.loads(line)[2:8]
+                if day is not None and not ts.startswith(day):
+                    continue
+                at = datetime.fromisoformat(ts)
+                at_terminal = terminals.contains(lat, lon)
+                shift = open_shifts.get(bus_id)
+                if shift is not None:
+                    if at < shift.end:
+                        continue
+                    if shift.driver_phone == phone and (at - shift.end).total_seconds() <= gap_seconds:
+                        shift.add(at, lat, lon, at_terminal)
+                        continue
+                    closed.append(shift)
+                open_shifts[bus_id] = _Shift(bus_id, phone, at, lat, lon, at_terminal)
+
+    closed.extend(open_shifts.values())
+    return closed
+
+
+def merge_shifts(runs: List[List[_Shift]], gap_seconds: float = REPORT_SHIFT_GAP_SECONDS) -> List[Dict]:
+    """
+    Summaries of the shifts from consecutive runs, joining a shift cut at
+    a run boundary with its continuation
+    """
+    by_bus: Dict[str, List[_Shift]] = {}
+    for run in runs:
+        for shift in run:
+            by_bus.setdefault(shift.bus_id, []).append(shift)
+    summaries = []
+    for shifts in by_bus.values():
+        shifts.sort(key=lambda shift: shift.start)
+        current = shifts[0]
+        for shift in shifts[1:]:
+            if current.continues(shift, gap_seconds):
+                current.join(shift)
+            else:
+                summaries.append(current.summary())
+                current = shift
+        summaries.append(current.summary())
+    return summaries
+
+
+def _totals(shifts: Iterable[Dict], key: str) -> List[Dict]:
+    totals: Dict[str, Dict] = {}
+    for shift in shifts:
+        entry = totals.get(shift[key])
+        if entry is None:
+            entry = totals[shift[key]] = {key: shift[key], "shifts": 0, "distance_km": 0.0, "hours": 0.0,
+                                          "terminal_minutes": 0.0, "transit_minutes": 0.0}
+        entry["shifts"] += 1
+        entry["distance_km"] += shift["distance_km"]
+        entry["hours"] += shift["duration_hours"]
+        entry["terminal_minutes"] += shift["terminal_minutes"]
+        entry["transit_minutes"] += shift["transit_minutes"]
+    for entry in totals.values():
+        for field in ("distance_km", "hours", "terminal_minutes", "transit_minutes"):
+            entry[field] = round(entry[field], 2)
+    return sorted(totals.values(), key=lambda entry: entry[key])
+
+
+class ReportStore:
+    """
+    Finished reports as JSON files, one per job
+    """
+
+    def __init__(self, directory: str = REPORT_DIR):
+        self.directory = directory
+
+    def path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"report-{job_id}.json")
+
+    def save(self, job_id: str, report: Dict) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(job_id)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, default=str)
+        return path
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        try:
+            with open(self.path(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+
+class ReportEngine:
+    """
+    Runs shift and distance reports over archived traces in a process pool.
+
+    submit() returns a job id straight away. The trace files are split into
+    one contiguous run per worker, so each file is decompressed once; the
+    event loop only waits on the workers and joins shifts that cross a run
+    boundary, so report requests never hold up live traffic.
+    """
+
+    def __init__(self, store: Optional[ReportStore] = None, workers: int = REPORT_WORKERS,
+                 trace_dir: str = TRACE_DIR):
+        self.store = store or ReportStore()
+        self.workers = workers
+        self.trace_dir = trace_dir
+        self.jobs: Dict[str, Dict] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned workers don't inherit the server's threads, sockets or event loop.
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def archived_traces(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.trace_dir, "trace-*.jsonl.gz")))
+
+    def submit(self, day: Optional[date] = None, paths: Optional[List[str]] = None,
+               recording: Optional[str] = None) -> Dict:
+        """
+        Queue a report over paths (default: every archived trace). recording,
+        the trace still being written, is left out and listed as skipped:
+        its gzip stream isn't finished, so it can't be read yet.
+        """
+        paths = paths if paths is not None else self.archived_traces()
+        skipped = []
+        if recording is not None:
+            active = os.path.abspath(recording)
+            skipped = [path for path in paths if os.path.abspath(path) == active]
+            paths = [path for path in paths if os.path.abspath(path) != active]
+        job_id = uuid.uuid4().hex[:12]
+        job = self.jobs[job_id] = {
+            "job_id": job_id,
+            "status": QUEUED,
+            "day": day.isoformat() if day else None,
+            "traces": len(paths),
+            "skipped_traces": skipped,
+            "submitted_at": datetime.now(),
+            "finished_at": None,
+            "error": None,
+        }
+        self._tasks[job_id] = asyncio.get_running_loop().create_task(self._run(job, paths))
+        return job
+
+    async def _run(self, job: Dict, paths: List[str]):
+        job["status"] = RUNNING
+        try:
+            pool = self._executor()
+            futures = [
+                asyncio.wrap_future(pool.submit(summarize_traces, run, job["day"]))
+                for run in split_traces(paths, self.workers)
+            ]
+            shifts = merge_shifts(await asyncio.gather(*futures))
+            shifts.sort(key=lambda shift: (shift["bus_id"], shift["start_time"]))
+            report = {
+                "job_id": job["job_id"],
+                "generated_at": datetime.now(),
+                "day": job["day"],
+                "traces": paths,
+                "shifts": shifts,
+                "buses": _totals(shifts, "bus_id"),
+                "drivers": _totals(shifts, "driver_phone"),
+            }
+            await asyncio.get_running_loop().run_in_executor(None, self.store.save, job["job_id"], report)
+            job["status"] = DONE
+            metrics.incr("reports.completed")
+        except Exception as exc:
+            job["status"] = FAILED
+            job["error"] = str(exc)
+            metrics.incr("reports.failed")
+        finally:
+            job["finished_at"] = datetime.now()
+            self._tasks.pop(job["job_id"], None)
+            self._evict()
+
+    def _evict(self):
+        # Forget the oldest finished jobs; their reports stay in the store.
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in (DONE, FAILED)]
+        for job_id in finished[:max(0, len(finished) - REPORT_MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job["status"] != DONE:
+            return dict(job)
+        return dict(job, report=await asyncio.to_thread(self.store.load, job_id))
+
+    async def stop(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,102 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+from pydantic import BaseModel, Field
+
+from app.utils.exceptions import (
+    BusNotAvailableException, DriverAlreadyOnShiftException,
+    NoActiveShiftException, PhoneNumberMismatchException
+)
+from app.utils.validators import sanitize_phone_number
+
+
+class ActiveShift(BaseModel):
+    bus_id: str
+    driver_id: int
+    driver_phone: str
+    assignment_id: Optional[int] = None
+    started_at: datetime = Field(default_factory=datetime.now)
+
+
+class ShiftRegistry:
+    """
+    In-memory index of active shifts by bus, driver and phone.
+    Every lookup is a dict access so pings can be authorized without the database.
+    A bus and driver can be reserved while their shift is being written, so
+    a concurrent start for either is refused before it reaches the database.
+    """
+
+    def __init__(self):
+        self._by_bus: Dict[str, ActiveShift] = {}
+        self._by_driver: Dict[int, ActiveShift] = {}
+        self._by_phone: Dict[str, ActiveShift] = {}
+        self._reserved_buses: Set[str] = set()
+        self._reserved_drivers: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._by_bus)
+
+    def load(self, shifts: Iterable[ActiveShift]):
+        self._by_bus.clear()
+        self._by_driver.clear()
+        self._by_phone.clear()
+        for shift in shifts:
+            self._index(shift)
+
+    def check_can_start(self, bus_id: str, driver_id: int):
+        if driver_id in self._by_driver or driver_id in self._reserved_drivers:
+            raise DriverAlreadyOnShiftException()
+        if bus_id in self._by_bus or bus_id in self._reserved_buses:
+            raise BusNotAvailableException(bus_id)
+
+    def reserve(self, bus_id: str, driver_id: int):
+        self.check_can_start(bus_id, driver_id)
+        self._reserved_buses.add(bus_id)
+        self._reserved_drivers.add(driver_id)
+
+    def release(self, bus_id: str, driver_id: int):
+        self._reserved_buses.discard(bus_id)
+        self._reserved_drivers.discard(driver_id)
+
+    def start(self, shift: ActiveShift) -> ActiveShift:
+        """
+        Index the shift, taking over its reservation if there is one
+        """
+        self.release(shift.bus_id, shift.driver_id)
+        self.check_can_start(shift.bus_id, shift.driver_id)
+        self._index(shift)
+        return shift
+
+    def end(self, bus_id: str) -> ActiveShift:
+        shift = self._by_bus.pop(bus_id, None)
+        if shift is None:
+            raise NoActiveShiftException()
+        self._by_driver.pop(shift.driver_id, None)
+        self._by_phone.pop(shift.driver_phone, None)
+        return shift
+
+    def authorize(self, bus_id: str, phone: str) -> ActiveShift:
+        shift = self._by_bus.get(bus_id)
+        if shift is None:
+            raise NoActiveShiftException()
+        # Registered phones are stored sanitized, so only normalize on a miss.
+        if phone != shift.driver_phone and sanitize_phone_number(phone) != shift.driver_phone:
+            raise PhoneNumberMismatchException()
+        return shift
+
+    def for_bus(self, bus_id: str) -> Optional[ActiveShift]:
+        return self._by_bus.get(bus_id)
+
+    def for_driver(self, driver_id: int) -> Optional[ActiveShift]:
+        return self._by_driver.get(driver_id)
+
+    def for_phone(self, phone: str) -> Optional[ActiveShift]:
+        return self._by_phone.get(phone) or self._by_phone.get(sanitize_phone_number(phone))
+
+    def all(self) -> List[ActiveShift]:
+        return list(self._by_bus.values())
+
+    def _index(self, shift: ActiveShift):
+        shift.driver_phone = sanitize_phone_number(shift.driver_phone)
+        self._by_bus[shift.bus_id] = shift
+        self._by_driver[shift.driver_id] = shift
+        self._by_phone[shift.driver_phone] = shift
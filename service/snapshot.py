@@ -0,0 +1,545 @@
+"""
+Fleet snapshot shared between one writer process and many read-only workers.
+
+The writer (the process that ingests GPS pings) publishes the fleet into a
+memory-mapped file with a fixed layout: a file header followed by two
+buffers, each holding a buffer header and fixed-width bus, terminal and
+occupancy records. Each publish fills the buffer readers are not using and
+then flips the file header's active index, so readers are never blocked.
+
+Each buffer header carries a seqlock counter that is odd while the buffer
+is being written, plus a CRC of the records. A reader copies the active
+buffer's records, then checks that the counter didn't move and that the CRC
+matches, and retries otherwise, so it never keeps a torn version. The copy
+is a memcpy of the used records, done once per published version per worker.
+"""
+import asyncio
+import mmap
+import os
+import zlib
+from array import array
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.constants import (
+    ETA_HORIZON_MINUTES, SNAPSHOT_MAX_BUSES, SNAPSHOT_MAX_TERMINALS, SNAPSHOT_PUBLISH_INTERVAL_SECONDS,
+    SNAPSHOT_READ_RETRIES
+)
+from app.utils.exceptions import ReadOnlyReplicaException
+from . import Bus, BusLocation, BusTrackingService, Terminal
+from .clustering import ClusterIndex
+from .metrics import metrics
+from .occupancy import TerminalOccupancy
+from .profiling import timed
+from .staleness import ONLINE, STALE, OFFLINE
+
+MAGIC = b"BRTSNAP1"
+LAYOUT_VERSION = 1
+STATUSES = ("available", "in_transit", "maintenance")
+CONNECTIONS = (ONLINE, STALE, OFFLINE)
+NONE = -1
+
+FILE_HEADER = np.dtype([
+    ("magic", "S8"), ("layout", "<u4"), ("active", "<u4"), ("published", "<u8"),
+    ("max_buses", "<u4"), ("max_terminals", "<u4"),
+], align=True)
+BUFFER_HEADER = np.dtype([
+    ("seq", "<u8"), ("version", "<u8"), ("change_seq", "<u8"), ("published_at", "<f8"),
+    ("buses", "<u4"), ("terminals", "<u4"), ("occupancy", "<u4"), ("checksum", "<u4"),
+], align=True)
+BUS_RECORD = np.dtype([
+    ("bus_id", "S32"), ("driver_phone", "S20"), ("driver_name", "S64"), ("plate_number", "S16"),
+    ("route_id", "S32"), ("db_id", "<i8"), ("capacity", "<i4"), ("terminal", "<i4"),
+    ("status", "i1"), ("connection", "i1"),
+    ("latitude", "<f8"), ("longitude", "<f8"), ("speed", "<f8"), ("timestamp", "<f8"),
+], align=True)
+TERMINAL_RECORD = np.dtype([
+    ("terminal_id", "S32"), ("name", "S64"), ("db_id", "<i8"),
+    ("latitude", "<f8"), ("longitude", "<f8"), ("total_capacity", "<i4"),
+], align=True)
+OCCUPANCY_RECORD = np.dtype([("terminal", "<i4"), ("bus", "<i4"), ("arrived_at", "<f8")], align=True)
+# Longer values are rejected rather than cut, except names, which are display-only.
+_TRUNCATED = {"driver_name", "name"}
+_HEADER_BYTES = 64
+
+
+class _Layout:
+    def __init__(self, max_buses: int, max_terminals: int):
+        self.max_buses = max_buses
+        self.max_terminals = max_terminals
+        self.buses_offset = _HEADER_BYTES
+        self.terminals_offset = self.buses_offset + BUS_RECORD.itemsize * max_buses
+        self.occupancy_offset = self.terminals_offset + TERMINAL_RECORD.itemsize * max_terminals
+        self.buffer_size = self.occupancy_offset + OCCUPANCY_RECORD.itemsize * max_buses
+        self.size = _HEADER_BYTES + 2 * self.buffer_size
+
+    def buffer(self, mm, index: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        base = _HEADER_BYTES + index * self.buffer_size
+        return (
+            np.frombuffer(mm, BUFFER_HEADER, 1, base),
+            np.frombuffer(mm, BUS_RECORD, self.max_buses, base + self.buses_offset),
+            np.frombuffer(mm, TERMINAL_RECORD, self.max_terminals, base + self.terminals_offset),
+            np.frombuffer(mm, OCCUPANCY_RECORD, self.max_buses, base + self.occupancy_offset),
+        )
+
+    def copy(self, mm, index: int, head: np.void) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Byte copies of the buffer's used bus, terminal and occupancy records.
+        The checksum covers the padding of the aligned dtypes, which
+        ndarray.copy() doesn't carry over, so the raw bytes are copied instead.
+        """
+        base = _HEADER_BYTES + index * self.buffer_size
+        copies = []
+        for offset, dtype, count, limit in (
+            (self.buses_offset, BUS_RECORD, head["buses"], self.max_buses),
+            (self.terminals_offset, TERMINAL_RECORD, head["terminals"], self.max_terminals),
+            (self.occupancy_offset, OCCUPANCY_RECORD, head["occupancy"], self.max_buses),
+        ):
+            start = base + offset
+            copies.append(np.frombuffer(mm[start:start + dtype.itemsize * min(int(count), limit)], dtype))
+        return tuple(copies)
+
+
+def _checksum(buses: np.ndarray, terminals: np.ndarray, occupancy: np.ndarray) -> int:
+    crc = 0
+    for records in (buses, terminals, occupancy):
+        crc = zlib.crc32(records.view(np.uint8), crc)
+    return crc
+
+
+def _codes(values, table: Tuple[str, ...]) -> np.ndarray:
+    """
+    Codes into table for a fleet_columns() field: a list of names, or
+    (codes, names) from the columnar backend. Unknown or missing is NONE.
+    """
+    index = {name: code for code, name in enumerate(table)}
+    if isinstance(values, tuple):
+        codes, names = values
+        lookup = np.array([index.get(name, NONE) for name in names] + [NONE], dtype=np.int32)
+        return lookup[np.frombuffer(codes, dtype=codes.typecode)]
+    return np.fromiter((index.get(value, NONE) for value in values), np.int32, len(values))
+
+
+def _numbers(values) -> np.ndarray:
+    if isinstance(values, array):
+        return np.frombuffer(values, dtype=values.typecode)
+    return np.array([NONE if value is None else value for value in values])
+
+
+class SnapshotWriter:
+    """
+    Creates the snapshot file and publishes the fleet into it. Only one
+    process may write a given file.
+    """
+
+    def __init__(self, path: str, max_buses: int = SNAPSHOT_MAX_BUSES,
+                 max_terminals: int = SNAPSHOT_MAX_TERMINALS):
+        self.path = path
+        self.layout = _Layout(max_buses, max_terminals)
+        # Built beside the target and renamed into place, so readers never map a half-made file.
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.truncate(self.layout.size)
+        with open(tmp, "r+b") as f:
+            self._mm = mmap.mmap(f.fileno(), self.layout.size)
+        self._header = np.frombuffer(self._mm, FILE_HEADER, 1, 0)
+        self._header["magic"] = MAGIC
+        self._header["layout"] = LAYOUT_VERSION
+        self._header["max_buses"] = max_buses
+        self._header["max_terminals"] = max_terminals
+        self._buffers = [self.layout.buffer(self._mm, 0), self.layout.buffer(self._mm, 1)]
+        os.replace(tmp, path)
+        # field -> (values, encoded) from the last publish; ids and names rarely change
+        self._encoded: Dict[str, Tuple[List, np.ndarray]] = {}
+
+    def _encode(self, field: str, values: List[Optional[str]], size: int) -> np.ndarray:
+        cached = self._encoded.get(field)
+        if cached is not None and cached[0] == values:
+            return cached[1]
+        encoded = [value.encode() if value else b"" for value in values]
+        if field in _TRUNCATED:
+            encoded = [value[:size] for value in encoded]
+        elif encoded and max(map(len, encoded)) > size:
+            raise ValueError(f"{field} longer than {size} bytes cannot go in the fleet snapshot")
+        records = np.array(encoded, dtype=f"S{size}")
+        self._encoded[field] = (list(values), records)
+        return records
+
+    @timed("snapshot_publish")
+    def publish(self, service: BusTrackingService) -> int:
+        """
+        Write the service's fleet into the inactive buffer and make it active.
+        Returns the new version.
+        """
+        columns = service.fleet_columns()
+        bus_ids = columns["bus_id"]
+        terminal_ids = list(service.terminals)
+        if len(bus_ids) > self.layout.max_buses or len(terminal_ids) > self.layout.max_terminals:
+            raise ValueError(f"Fleet exceeds snapshot capacity of {self.layout.max_buses} buses "
+                             f"and {self.layout.max_terminals} terminals")
+        n_buses, n_terminals = len(bus_ids), len(terminal_ids)
+        terminal_index = {tid: i for i, tid in enumerate(terminal_ids)}
+        rows = {bid: i for i, bid in enumerate(bus_ids)}
+        occupancy = [(terminal_index[tid], rows[bid], service.occupancy[tid].arrived_at(bid).timestamp())
+                     for tid in terminal_ids for bid in service.occupancy[tid] if bid in rows]
+
+        index = 1 - int(self._header["active"][0])
+        header, bus_records, terminal_records, occupancy_records = self._buffers[index]
+        header["seq"] += 1
+
+        buses = bus_records[:n_buses]
+        for field in ("bus_id", "driver_phone", "driver_name", "plate_number", "route_id"):
+            buses[field] = self._encode(field, columns[field], BUS_RECORD[field].itemsize)
+        for field in ("capacity", "latitude", "longitude", "speed", "db_id"):
+            buses[field] = _numbers(columns[field])
+        buses["timestamp"] = _numbers(columns["last_seen"])
+        buses["status"] = _codes(columns["status"], STATUSES)
+        buses["connection"] = _codes(columns["connection_status"], CONNECTIONS)
+        buses["terminal"] = _codes(columns["current_terminal"], tuple(terminal_ids))
+
+        terminals = terminal_records[:n_terminals]
+        records = [service.terminals[tid] for tid in terminal_ids]
+        terminals["terminal_id"] = self._encode("terminal_id", terminal_ids,
+                                                TERMINAL_RECORD["terminal_id"].itemsize)
+        terminals["name"] = self._encode("name", [t.name for t in records], TERMINAL_RECORD["name"].itemsize)
+        terminals["db_id"] = [t.db_id if t.db_id is not None else NONE for t in records]
+        terminals["latitude"] = [t.latitude for t in records]
+        terminals["longitude"] = [t.longitude for t in records]
+        terminals["total_capacity"] = [t.total_capacity for t in records]
+
+        queued = occupancy_records[:len(occupancy)]
+        if occupancy:
+            queued[:] = np.array(occupancy, dtype=OCCUPANCY_RECORD)
+
+        version = int(self._header["published"][0]) + 1
+        header["version"] = version
+        header["change_seq"] = service.changes.seq
+        header["published_at"] = datetime.now().timestamp()
+        header["buses"], header["terminals"], header["occupancy"] = n_buses, n_terminals, len(occupancy)
+        header["checksum"] = _checksum(buses, terminals, queued)
+        header["seq"] += 1
+        self._header["active"] = index
+        self._header["published"] = version
+        return version
+
+    def close(self):
+        self._buffers = []
+        self._header = None
+        self._mm.close()
+
+
+class SnapshotPublisher:
+    """
+    Publishes the writer's fleet whenever its change log has moved, at most
+    once per interval
+    """
+
+    def __init__(self, service: BusTrackingService, path: str,
+                 interval: float = SNAPSHOT_PUBLISH_INTERVAL_SECONDS):
+        self.service = service
+        self.writer = SnapshotWriter(path)
+        self.interval = interval
+        self._published_seq: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def publish_if_changed(self) -> bool:
+        if self._published_seq == self.service.changes.seq:
+            return False
+        seq = self.service.changes.seq
+        self.writer.publish(self.service)
+        self._published_seq = seq
+        metrics.incr("snapshot.published")
+        return True
+
+    async def run(self):
+        while True:
+            try:
+                self.publish_if_changed()
+            except ValueError:
+                metrics.incr("snapshot.failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.writer.close()
+
+
+class FleetSnapshot:
+    """
+    One published version, copied out of the shared file
+    """
+
+    def __init__(self, header: np.ndarray, buses: np.ndarray, terminals: np.ndarray, occupancy: np.ndarray,
+                 previous: Optional["FleetSnapshot"] = None):
+        self.version = int(header["version"])
+        self.change_seq = int(header["change_seq"])
+        self.published_at = datetime.fromtimestamp(float(header["published_at"]))
+        self.buses = buses
+        self.terminals = terminals
+        self.occupancy = occupancy
+        # Decoded ids are reused while the id column is unchanged.
+        if previous is not None and np.array_equal(previous.buses["bus_id"], buses["bus_id"]):
+            self.bus_ids, self.rows = previous.bus_ids, previous.rows
+        else:
+            self.bus_ids = [value.decode() for value in buses["bus_id"]]
+            self.rows = {bus_id: row for row, bus_id in enumerate(self.bus_ids)}
+        if previous is not None and np.array_equal(previous.terminals, terminals):
+            self.terminal_ids = previous.terminal_ids
+        else:
+            self.terminal_ids = [value.decode() for value in terminals["terminal_id"]]
+
+
+class SnapshotReader:
+    """
+    Maps the snapshot file read-only and hands out the latest complete version
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._header: Optional[np.ndarray] = None
+        self._inode: Optional[int] = None
+        self._cached: Optional[FleetSnapshot] = None
+
+    def _open(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if stat.st_ino == self._inode:
+            return True
+        # First open, or the writer restarted and replaced the file.
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = np.frombuffer(mm, FILE_HEADER, 1, 0)
+        if header["magic"][0] != MAGIC or header["layout"][0] != LAYOUT_VERSION:
+            raise ValueError(f"{self.path} is not a fleet snapshot this version can read")
+        self._mm, self._inode, self._cached = mm, stat.st_ino, None
+        self._header = header
+        self._layout = _Layout(int(header["max_buses"][0]), int(header["max_terminals"][0]))
+        self._buffers = [self._layout.buffer(mm, 0), self._layout.buffer(mm, 1)]
+        return True
+
+    def load(self) -> Optional[FleetSnapshot]:
+        """
+        The latest version, or the last good one if the writer kept
+        overwriting it through every retry. None before the first publish.
+        """
+        if not self._open():
+            return self._cached
+        published = int(self._header["published"][0])
+        if published == 0 or (self._cached is not None and self._cached.version == published):
+            return self._cached
+        for _ in range(SNAPSHOT_READ_RETRIES):
+            index = int(self._header["active"][0])
+            header = self._buffers[index][0]
+            seq = int(header["seq"][0])
+            if seq % 2:
+                continue
+            head = header[0].copy()
+            buses, terminals, occupancy = self._layout.copy(self._mm, index, head)
+            if int(header["seq"][0]) != seq or _checksum(buses, terminals, occupancy) != head["checksum"]:
+                metrics.incr("snapshot.read_retries")
+                continue
+            self._cached = FleetSnapshot(head, buses, terminals, occupancy, self._cached)
+            return self._cached
+        metrics.incr("snapshot.read_stale")
+        return self._cached
+
+
+def _empty_snapshot() -> FleetSnapshot:
+    header = np.zeros((), BUFFER_HEADER)
+    return FleetSnapshot(header, np.zeros(0, BUS_RECORD), np.zeros(0, TERMINAL_RECORD),
+                         np.zeros(0, OCCUPANCY_RECORD))
+
+
+class SnapshotBusesView(Mapping):
+    """
+    Read-only dict-like view of the snapshot's buses, building a Bus per lookup
+    """
+
+    def __init__(self, service: "SnapshotBusTrackingService"):
+        self._service = service
+
+    def __getitem__(self, bus_id: str) -> Bus:
+        return self._service._materialize(self._service.snapshot.rows[bus_id])
+
+    def __contains__(self, bus_id) -> bool:
+        return bus_id in self._service.snapshot.rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._service.snapshot.bus_ids)
+
+    def __len__(self) -> int:
+        return len(self._service.snapshot.bus_ids)
+
+
+class SnapshotBusTrackingService(BusTrackingService):
+    """
+    Read-only BusTrackingService for worker processes, serving the fleet
+    snapshot published by the ingest process.
+
+    refresh() adopts the latest complete version; call it once per request so
+    every read in that request sees the same version. Anything that changes
+    state raises ReadOnlyReplicaException.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.reader = SnapshotReader(path)
+        self.snapshot = _empty_snapshot()
+        self.buses = SnapshotBusesView(self)
+        self._map_version: Optional[int] = None
+
+    def refresh(self) -> FleetSnapshot:
+        snapshot = self.reader.load()
+        if snapshot is None or snapshot is self.snapshot:
+            return self.snapshot
+        previous, self.snapshot = self.snapshot, snapshot
+        if snapshot.terminal_ids is not previous.terminal_ids:
+            # Cleared in place: the notifier and ping advisor hold this dict.
+            self.terminals.clear()
+            for terminal_id, record in zip(snapshot.terminal_ids, snapshot.terminals):
+                self.terminals[terminal_id] = Terminal(
+                    terminal_id=terminal_id, name=record["name"].decode(errors="ignore"),
+                    db_id=int(record["db_id"]) if record["db_id"] != NONE else None,
+                    latitude=float(record["latitude"]), longitude=float(record["longitude"]),
+                    total_capacity=int(record["total_capacity"])
+                )
+        occupancy = {terminal_id: TerminalOccupancy() for terminal_id in snapshot.terminal_ids}
+        for terminal, bus, arrived_at in snapshot.occupancy.tolist():
+            occupancy[snapshot.terminal_ids[terminal]].arrive(snapshot.bus_ids[bus],
+                                                              datetime.fromtimestamp(arrived_at))
+        self.occupancy = occupancy
+        connection = snapshot.buses["connection"]
+        self.stale_detector.state = {snapshot.bus_ids[row]: CONNECTIONS[connection[row]]
+                                     for row in np.flatnonzero(connection != CONNECTIONS.index(ONLINE))}
+        return snapshot
+
+    def _materialize(self, row: int) -> Bus:
+        snapshot = self.snapshot
+        record = snapshot.buses[row]
+        bus_id = snapshot.bus_ids[row]
+        ts = float(record["timestamp"])
+        location = None
+        if not np.isnan(ts):
+            location = BusLocation(
+                bus_id=bus_id, driver_phone=record["driver_phone"].decode(),
+                latitude=float(record["latitude"]), longitude=float(record["longitude"]),
+                speed=float(record["speed"]), timestamp=datetime.fromtimestamp(ts)
+            )
+        terminal = int(record["terminal"])
+        return Bus(
+            bus_id=bus_id,
+            db_id=int(record["db_id"]) if record["db_id"] != NONE else None,
+            driver_phone=record["driver_phone"].decode(),
+            driver_name=record["driver_name"].decode(errors="ignore"),
+            plate_number=record["plate_number"].decode(),
+            capacity=int(record["capacity"]),
+            route_id=record["route_id"].decode() or None,
+            current_terminal=snapshot.terminal_ids[terminal] if terminal != NONE else None,
+            status=STATUSES[record["status"]],
+            last_location=location,
+            connection_status=CONNECTIONS[record["connection"]],
+        )
+
+    def _read_only(self, *args, **kwargs):
+        raise ReadOnlyReplicaException()
+
+    register_bus = register_terminal = register_route = _read_only
+    update_bus_location = submit_location = apply_location_batch = authorize_ping = _read_only
+    set_bus_status = dispatch = subscribe_arrivals = _read_only
+
+    def _bus_status(self, bus_id: str) -> str:
+        return STATUSES[self.snapshot.buses["status"][self.snapshot.rows[bus_id]]]
+
+    def _current_terminal(self, bus_id: str) -> Optional[str]:
+        terminal = int(self.snapshot.buses["terminal"][self.snapshot.rows[bus_id]])
+        return self.snapshot.terminal_ids[terminal] if terminal != NONE else None
+
+    def _bus_route(self, bus_id: str) -> Optional[str]:
+        return self.snapshot.buses["route_id"][self.snapshot.rows[bus_id]].decode() or None
+
+    def _transit_rows(self) -> np.ndarray:
+        buses = self.snapshot.buses
+        return np.flatnonzero((buses["status"] == STATUSES.index("in_transit"))
+                              & (buses["connection"] == CONNECTIONS.index(ONLINE))
+                              & ~np.isnan(buses["timestamp"]))
+
+    def transit_positions(self) -> Tuple[List[str], List[float], List[float], List[float]]:
+        rows = self._transit_rows()
+        buses = self.snapshot.buses[rows]
+        return ([self.snapshot.bus_ids[row] for row in rows], buses["latitude"].tolist(),
+                buses["longitude"].tolist(), buses["speed"].tolist())
+
+    @timed("incoming_buses")
+    def _get_incoming_buses(self, terminal_id: str) -> List[Dict]:
+        incoming = []
+        terminal = self.terminals[terminal_id]
+        ids, lats, lons, speeds = self.transit_positions()
+        for bus_id, lat, lon, speed in zip(ids, lats, lons, speeds):
+            eta, dist_km = self._eta(lat, lon, speed, terminal)
+            if eta < ETA_HORIZON_MINUTES:
+                incoming.append({"bus_id": bus_id, "eta": eta, "distance_km": round(dist_km, 2)})
+        return sorted(incoming, key=lambda x: x['eta'])
+
+    def resolve_bus_key(self, db_id: int) -> str:
+        rows = np.flatnonzero(self.snapshot.buses["db_id"] == db_id)
+        return self.snapshot.bus_ids[rows[0]] if len(rows) else str(db_id)
+
+    def get_bus_by_phone(self, phone: str) -> Optional[Bus]:
+        rows = np.flatnonzero(self.snapshot.buses["driver_phone"] == phone.encode())
+        return self._materialize(int(rows[0])) if len(rows) else None
+
+    @timed("list_buses")
+    def get_all_buses(self, status: Optional[str] = None) -> List[Bus]:
+        if not status:
+            return [self._materialize(row) for row in range(len(self.snapshot.bus_ids))]
+        if status not in STATUSES:
+            return []
+        rows = np.flatnonzero(self.snapshot.buses["status"] == STATUSES.index(status))
+        return [self._materialize(int(row)) for row in rows]
+
+    @timed("fleet_counts")
+    def fleet_counts(self) -> Dict[str, int]:
+        buses = self.snapshot.buses
+        return {
+            "total": len(buses),
+            "available": int(np.count_nonzero(buses["status"] == STATUSES.index("available"))),
+            "in_transit": int(np.count_nonzero(buses["status"] == STATUSES.index("in_transit"))),
+            "stale": int(np.count_nonzero(buses["connection"] != CONNECTIONS.index(ONLINE))),
+        }
+
+    def map_clusters(self, bbox: Tuple[float, float, float, float], zoom: int) -> Dict:
+        if self._map_version != self.snapshot.version:
+            index = ClusterIndex()
+            buses = self.snapshot.buses
+            for row in np.flatnonzero(~np.isnan(buses["timestamp"])):
+                index.update(self.snapshot.bus_ids[row], float(buses["latitude"][row]),
+                             float(buses["longitude"][row]))
+            self.map_index, self._map_version = index, self.snapshot.version
+        return super().map_clusters(bbox, zoom)
+
+    def changes_since(self, seq: int, epoch: Optional[str] = None) -> Dict:
+        # Readers have no change log, only the snapshot: always a full reload.
+        return {
+            "seq": self.snapshot.change_seq,
+            "epoch": None,
+            "full_reload": True,
+            "buses": self.get_all_buses(),
+            "terminals": self.get_all_terminals(),
+        }
@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.utils.constants import BUS_STALE_AFTER_PING_INTERVALS
+
+
+ONLINE = "online"
+STALE = "stale"
+OFFLINE = "offline"
+
+
+class StaleBusDetector:
+    """
+    Tracks when each bus was last heard from and flags buses that go silent.
+
+    Deadlines live in a min-heap, so a sweep only pops the buses whose
+    deadline has passed instead of scanning the whole fleet. Each bus has at
+    most one live heap entry; superseded entries are skipped when popped.
+
+    A bus told to ping less often than usual (expect) gets a stale window of
+    missed_pings of its interval, if that is longer than stale_after.
+    """
+
+    def __init__(
+        self,
+        stale_after: float,
+        offline_after: float,
+        missed_pings: float = BUS_STALE_AFTER_PING_INTERVALS,
+        on_change: Optional[Callable[[str, str], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.stale_after = stale_after
+        self.offline_after = max(offline_after, stale_after)
+        self.missed_pings = missed_pings
+        self.on_change = on_change
+        self.clock = clock
+        self.last_seen: Dict[str, float] = {}
+        self.state: Dict[str, str] = {}
+        self._deadline: Dict[str, float] = {}
+        self._window: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, bus_id: str, now: Optional[float] = None):
+        now = self.clock() if now is None else now
+        self.last_seen[bus_id] = now
+
+        previous = self.state.get(bus_id)
+        if previous == ONLINE:
+            # The pending deadline is re-checked against last_seen when it pops.
+            return
+
+        self.state[bus_id] = ONLINE
+        self._schedule(bus_id, now + self._stale_after(bus_id))
+        if previous is not None:
+            self._notify(bus_id, ONLINE)
+
+    def expect(self, bus_id: str, interval: float):
+        """
+        Record the interval the bus was told to wait before its next ping
+        """
+        window = max(self.stale_after, interval * self.missed_pings)
+        previous = self._window.get(bus_id, self.stale_after)
+        if window == self.stale_after:
+            self._window.pop(bus_id, None)
+        else:
+            self._window[bus_id] = window
+        if window < previous and self.state.get(bus_id) == ONLINE and bus_id in self.last_seen:
+            # The pending deadline is now too late; a longer window is handled when it pops.
+            self._schedule(bus_id, self.last_seen[bus_id] + window)
+
+    def forget(self, bus_id: str):
+        self.last_seen.pop(bus_id, None)
+        self.state.pop(bus_id, None)
+        self._deadline.pop(bus_id, None)
+        self._window.pop(bus_id, None)
+
+    def status(self, bus_id: str) -> str:
+        return self.state.get(bus_id, ONLINE)
+
+    def is_stale(self, bus_id: str) -> bool:
+        return self.state.get(bus_id, ONLINE) != ONLINE
+
+    def sweep(self, now: Optional[float] = None) -> List[str]:
+        now = self.clock() if now is None else now
+        changed = []
+
+        while self._heap and self._heap[0][0] <= now:
+            deadline, bus_id = heapq.heappop(self._heap)
+            if self._deadline.get(bus_id) != deadline:
+                continue
+            del self._deadline[bus_id]
+
+            silence = now - self.last_seen[bus_id]
+            stale_after = self._stale_after(bus_id)
+            offline_after = max(self.offline_after, stale_after)
+            if silence >= offline_after:
+                new_state = OFFLINE
+            elif silence >= stale_after:
+                new_state = STALE
+                self._schedule(bus_id, self.last_seen[bus_id] + offline_after)
+            else:
+                self._schedule(bus_id, self.last_seen[bus_id] + stale_after)
+                continue
+
+            if self.state.get(bus_id) != new_state:
+                self.state[bus_id] = new_state
+                changed.append(bus_id)
+                self._notify(bus_id, new_state)
+
+        return changed
+
+    async def run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    def start(self, interval: float) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run(interval))
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _stale_after(self, bus_id: str) -> float:
+        return self._window.get(bus_id, self.stale_after)
+
+    def _schedule(self, bus_id: str, deadline: float):
+        self._deadline[bus_id] = deadline
+        heapq.heappush(self._heap, (deadline, bus_id))
+
+    def _notify(self, bus_id: str, state: str):
+        if self.on_change is not None:
+            self.on_change(bus_id, state)
@@ -0,0 +1,133 @@
+import gzip
+import json
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+# Event kinds. Each trace line is a JSON array: [ms_since_start, kind, ...]
+CONFIG = "C"
+BUS = "B"
+TERMINAL = "T"
+LOCATION = "L"
+KINEMATICS = "K"
+ARCHIVED = "A"
+STATUS = "S"
+DISPATCH = "D"
+FINAL = "F"
+
+
+def snapshot_state(service) -> Dict:
+    """
+    The part of the tracking state a replay must reproduce exactly
+    """
+    buses = {}
+    for bus in service.get_all_buses():
+        loc = bus.last_location
+        buses[bus.bus_id] = [
+            bus.status,
+            bus.current_terminal,
+            [loc.latitude, loc.longitude, loc.speed, loc.timestamp.isoformat()] if loc else None
+        ]
+    terminals = {tid: service.buses_at(tid) for tid in service.terminals}
+    return {"buses": buses, "terminals": terminals}
+
+
+def recorded_settings(service) -> Dict:
+    """
+    Service flags that change how pings are applied, so a replay must match them
+    """
+    return {"smoothing_enabled": service.smoothing_enabled, "pipeline_enabled": service.pipeline_enabled}
+
+
+class TraceRecorder:
+    """
+    Appends accepted location updates and status changes to a gzipped
+    JSON-lines trace. The service's settings and the fleet as it stands
+    when recording starts, last known positions and kinematic filter state
+    included, are written first so a replay can rebuild it from nothing.
+    """
+
+    def __init__(self, path: str, compresslevel: int = 1):
+        self.path = path
+        self._file = gzip.open(path, "wt", compresslevel=compresslevel, encoding="utf-8")
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.events = 0
+
+    def _write(self, kind: str, *fields):
+        line = json.dumps([round((time.perf_counter() - self._start) * 1000, 3), kind, *fields],
+                          separators=(",", ":"))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.write("\n")
+            self.events += 1
+
+    def fleet(self, service):
+        self._write(CONFIG, recorded_settings(service))
+        for terminal in service.get_all_terminals():
+            self.terminal(terminal)
+        for bus in service.get_all_buses():
+            self.bus(bus)
+        # After the buses: registering a bus resets its filter.
+        for bus_id, state in service.kinematics.states():
+            self._write(KINEMATICS, bus_id, state)
+
+    def bus(self, bus):
+        self._write(BUS, bus.model_dump(mode="json"))
+
+    def terminal(self, terminal):
+        self._write(TERMINAL, terminal.model_dump(mode="json"))
+
+    def location(self, bus_id: str, location, applied: bool = True):
+        self._write(
+            LOCATION if applied else ARCHIVED,
+            bus_id, location.driver_phone, location.latitude, location.longitude,
+            location.speed, location.timestamp.isoformat(), location.accuracy_meters, location.heading
+        )
+
+    def status(self, bus_id: str, status: str):
+        self._write(STATUS, bus_id, status)
+
+    def dispatch(self, terminal_id: str, bus_id: str):
+        self._write(DISPATCH, terminal_id, bus_id)
+
+    def close(self, service=None):
+        if service is not None:
+            self._write(FINAL, snapshot_state(service))
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_trace(path: str) -> Iterator[List]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_config(path: str) -> Dict:
+    """
+    The settings recorded at the start of the trace; empty for traces
+    recorded before they were
+    """
+    for event in read_trace(path):
+        return event[2] if event[1] == CONFIG else {}
+    return {}
+
+
+def diff_states(expected: Dict, actual: Dict, limit: int = 10) -> List[str]:
+    differences = []
+    for section in ("buses", "terminals"):
+        keys = set(expected.get(section, {})) | set(actual.get(section, {}))
+        for key in sorted(keys):
+            want = expected.get(section, {}).get(key)
+            got = actual.get(section, {}).get(key)
+            if want != got:
+                differences.append(f"{section}[{key}]: expected {want}, got {got}")
+                if len(differences) >= limit:
+                    return differences
+    return differences
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models import load_all_models
+from app.services.tracking_service import TrackingWriteBehind
+from service import Bus, BusLocation
+
+BUSES = 2500
+# SQLite builds differ in their limit; the writer must stay under the lowest it assumes.
+MAX_PARAMETERS = 32766
+
+
+def _bus(i: int) -> Bus:
+    return Bus(bus_id=f"BUS{i:05d}", db_id=i, driver_phone=f"+234803{i:07d}", driver_name=f"Driver {i}",
+               plate_number=f"LAG-{i:05d}", capacity=50)
+
+
+def _location(bus: Bus, speed: float) -> BusLocation:
+    return BusLocation(bus_id=bus.bus_id, driver_phone=bus.driver_phone, latitude=6.45, longitude=3.39,
+                       speed=speed)
+
+
+def test_flush_splits_large_upserts(tmp_path):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tracking.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(load_all_models().metadata.create_all)
+        statements = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT INTO trackings"):
+                statements.append(len(parameters))
+
+        writer = TrackingWriteBehind(async_sessionmaker(engine, expire_on_commit=False), max_pending=BUSES)
+        buses = [_bus(i) for i in range(1, BUSES + 1)]
+        for bus in buses:
+            writer.record(bus, _location(bus, 10.0))
+        first = await writer.flush()
+        for bus in buses:
+            writer.record(bus, _location(bus, 20.0))
+        second = await writer.flush()
+
+        async with engine.connect() as conn:
+            table = load_all_models().metadata.tables["trackings"]
+            rows = (await conn.execute(select(func.count(), func.min(table.c.speed_km)).select_from(table))).one()
+        await engine.dispose()
+        return first, second, statements, rows
+
+    first, second, statements, (count, min_speed) = asyncio.run(run())
+    assert first == second == BUSES
+    assert len(statements) >= 4
+    assert max(statements) <= MAX_PARAMETERS
+    assert count == BUSES
+    assert min_speed == 20.0
+
+
+def test_failed_flush_keeps_pending_within_cap():
+    writer = None
+
+    class FailingSession:
+        async def __aenter__(self):
+            # New buses ping while the flush is in flight, filling the freed space.
+            for i in range(100, 110):
+                writer.record(_bus(i), _location(_bus(i), 5.0))
+            raise ConnectionError("database unavailable")
+
+        async def __aexit__(self, *exc):
+            return False
+
+    writer = TrackingWriteBehind(FailingSession, max_pending=10)
+    for i in range(1, 11):
+        writer.record(_bus(i), _location(_bus(i), 5.0))
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(writer.flush())
+    assert writer.pending == 10